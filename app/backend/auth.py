@@ -1,19 +1,36 @@
+import os
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from database import get_db, User
+from database import User, run_in_session
+from services.cache import LRUCache
+from services.metrics import Counter
+from services.passwords import password_hasher, pwd_context
 
 # Configuration
 SECRET_KEY = "your-secret-key-here"  # In production, use a secure random key
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# get_current_user caches token -> username (until the token expires) and
+# username -> User for USER_CACHE_TTL seconds. Changes made through update_user
+# are seen immediately; changes from other processes within USER_CACHE_TTL.
+# Cached Users are detached from their session (expire_on_commit=False) and
+# shared between requests, so they are read-only: write through update_user.
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+
+USER_CACHE_HITS = Counter("user_cache_hits_total", "Authenticated requests resolved from the user cache")
+USER_CACHE_MISSES = Counter("user_cache_misses_total", "Authenticated requests that loaded the user from the database")
+
+_token_subjects: LRUCache[str] = LRUCache(USER_CACHE_SIZE, ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+_user_cache: LRUCache[User] = LRUCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+# Bumped by invalidate_user so lookups already in flight don't cache stale rows
+_user_cache_generation = 0
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -30,15 +47,71 @@ def get_user(db: Session, username: str) -> Optional[User]:
     """Get a user by username."""
     return db.query(User).filter(User.username == username).first()
 
+async def get_user_async(username: str) -> Optional[User]:
+    """get_user on a database worker thread."""
+    return await run_in_session(lambda db: get_user(db, username))
+
+async def get_user_cached(username: str) -> Optional[User]:
+    """get_user_async through the short-TTL user cache; the User returned is detached and read-only."""
+    user = _user_cache.get(username)
+    if user is not None:
+        USER_CACHE_HITS.inc()
+        return user
+    USER_CACHE_MISSES.inc()
+    generation = _user_cache_generation
+    user = await get_user_async(username)
+    if user is not None and generation == _user_cache_generation:
+        _user_cache.set(username, user)
+    return user
+
+def invalidate_user(username: str) -> None:
+    """Drop `username` from the user cache; call after changing the user's row."""
+    global _user_cache_generation
+    _user_cache_generation += 1
+    _user_cache.pop(username)
+
+def _update_user(db: Session, username: str, fields: dict) -> bool:
+    updated = db.query(User).filter(User.username == username).update(fields)
+    db.commit()
+    return updated > 0
+
+async def update_user(username: str, **fields) -> bool:
+    """Update columns of `username`'s row and invalidate its cache entry."""
+    try:
+        return await run_in_session(lambda db: _update_user(db, username, fields))
+    finally:
+        invalidate_user(username)
+
+async def deactivate_user(username: str) -> bool:
+    """Mark `username` inactive; its tokens stop working on the next request."""
+    return await update_user(username, is_active=False)
+
 def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
     """Authenticate a user with username and password."""
     user = get_user(db, username)
-    if not user:
+    if not user or not user.is_active:
         return None
     if not verify_password(password, user.hashed_password):
         return None
     return user
 
+async def authenticate_user_async(username: str, password: str) -> Optional[User]:
+    """authenticate_user with the lookup and bcrypt both off the event loop.
+
+    A stored hash with outdated settings (e.g. fewer rounds than BCRYPT_ROUNDS)
+    is replaced after a successful check.
+    """
+    user = await get_user_async(username)
+    if not user or not user.is_active:
+        return None
+    ok, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not ok:
+        return None
+    if new_hash:
+        await update_user(user.username, hashed_password=new_hash)
+        user.hashed_password = new_hash
+    return user
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -50,21 +123,25 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     """Get the current authenticated user."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+    username = _token_subjects.get(token)
+    if username is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            username = payload.get("sub")
+            if username is None:
+                raise credentials_exception
+        except JWTError:
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    user = get_user(db, username=username)
-    if user is None:
+        if "exp" in payload:
+            _token_subjects.set(token, username, ttl=payload["exp"] - time.time())
+    user = await get_user_cached(username)
+    if user is None or not user.is_active:
         raise credentials_exception
     return user
\ No newline at end of file
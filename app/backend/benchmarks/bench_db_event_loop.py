@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+bench_db_event_loop.py — /health latency while auth endpoints hammer the database.
+
+Starts the real app (uvicorn main:app, in its own process) on a scratch SQLite
+DB and probes /health at a fixed rate in three phases: idle; while concurrent
+clients run database-bound auth requests; and the same load while another
+connection repeatedly holds an exclusive write lock (as a batch script or
+migration would). The auth requests are:
+  - /token for unknown users (lookup only, no bcrypt)
+  - /register with a taken username
+  - /me with a valid token
+
+If database work blocks the event loop, /health stalls whenever a query waits
+on the lock; with WAL and threadpool-dispatched sessions it should not.
+
+Usage:
+  python benchmarks/bench_db_event_loop.py
+  python benchmarks/bench_db_event_loop.py --seconds 10 --concurrency 64 --users 50000
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[idx]
+
+
+def seed_users(db_path: str, users: int):
+    # Pre-hashed placeholder passwords: the benchmark never verifies them
+    con = sqlite3.connect(db_path)
+    con.executemany(
+        "INSERT INTO users (username, email, hashed_password, is_active, created_at) VALUES (?, ?, ?, 1, datetime('now'))",
+        ((f"user{i}", f"user{i}@example.com", "$2b$12$" + "x" * 53) for i in range(users)),
+    )
+    con.commit()
+    con.close()
+
+
+def start_app(port: int, env: dict) -> subprocess.Popen:
+    import httpx
+
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=1.0)
+            return proc
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proc.kill()
+    raise SystemExit("app did not start")
+
+
+def hold_write_lock(db_path: str, stop: threading.Event, hold_s: float, gap_s: float = 0.05):
+    con = sqlite3.connect(db_path, timeout=30.0, isolation_level=None)
+    while not stop.is_set():
+        con.execute("BEGIN EXCLUSIVE")
+        con.execute("UPDATE users SET is_active = 1 WHERE id = 1")
+        time.sleep(hold_s)
+        con.execute("COMMIT")
+        time.sleep(gap_s)
+    con.close()
+
+
+async def probe_health(client, stop: asyncio.Event, interval: float):
+    samples = []
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await client.get("/health")
+        samples.append((time.perf_counter() - t0) * 1000.0)
+        await asyncio.sleep(interval)
+    return samples
+
+
+async def auth_worker(client, stop: asyncio.Event, token: str, users: int, worker: int, counts: dict):
+    i = worker
+    while not stop.is_set():
+        kind = i % 3
+        if kind == 0:
+            await client.post("/token", data={"username": f"nobody{i}", "password": "x"})
+        elif kind == 1:
+            await client.post("/register", params={"username": f"user{i % users}", "email": f"n{i}@example.com", "password": "x"})
+        else:
+            await client.get("/me", headers={"Authorization": f"Bearer {token}"})
+        counts["auth"] += 1
+        i += 7
+
+
+async def run(port: int, seconds: float, concurrency: int, users: int, db_path: str, hold_s: float):
+    import httpx
+    from auth import create_access_token
+
+    token = create_access_token({"sub": "user1"})
+    limits = httpx.Limits(max_connections=concurrency + 4)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30.0) as client:
+        results = {}
+        phases = (("idle", 0, False), (f"{concurrency} auth clients", concurrency, False),
+                  ("+ writer holding lock", concurrency, True))
+        for label, workers, writer in phases:
+            stop = asyncio.Event()
+            writer_stop = threading.Event()
+            writer_thread = threading.Thread(target=hold_write_lock, args=(db_path, writer_stop, hold_s), daemon=True)
+            if writer:
+                writer_thread.start()
+            counts = {"auth": 0}
+            probe = asyncio.create_task(probe_health(client, stop, 0.01))
+            tasks = [asyncio.create_task(auth_worker(client, stop, token, users, w, counts)) for w in range(workers)]
+            await asyncio.sleep(seconds)
+            stop.set()
+            samples = await probe
+            await asyncio.gather(*tasks)
+            if writer:
+                writer_stop.set()
+                writer_thread.join()
+            results[label] = (samples, counts["auth"] / seconds)
+        return results
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Measure /health latency under database-bound auth load.")
+    ap.add_argument("--seconds", type=float, default=5.0, help="Duration of each phase")
+    ap.add_argument("--concurrency", type=int, default=32, help="Concurrent auth clients")
+    ap.add_argument("--users", type=int, default=20000, help="Users seeded into the scratch DB")
+    ap.add_argument("--lock-hold-ms", type=float, default=300.0, help="How long the writer holds each exclusive lock")
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="bench_db_")
+    db_path = os.path.join(workdir, "bench.db")
+    # Must be set before database.py creates its engine
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("OPENROUTER_API_KEY", "bench-key")
+    import database  # noqa: F401  (creates the schema)
+
+    seed_users(db_path, args.users)
+    port = free_port()
+    proc = start_app(port, dict(os.environ))
+    try:
+        results = asyncio.run(run(port, args.seconds, args.concurrency, args.users, db_path, args.lock_hold_ms / 1000.0))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+    print(f"{args.users} users • {args.seconds:.0f} s per phase • writer holds the lock {args.lock_hold_ms:.0f} ms at a time\n")
+    print(f"  {'phase':22s} {'/health p50':>12s} {'p99':>9s} {'max':>9s} {'auth req/s':>11s}")
+    for label, (samples, auth_rps) in results.items():
+        print(f"  {label:22s} {statistics.median(samples):10.2f}ms {percentile(samples, 99):7.2f}ms "
+              f"{max(samples):7.2f}ms {auth_rps:11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+bench_login_storm.py — /api/generate latency while a burst of logins runs bcrypt.
+
+Starts the real app (uvicorn main:app, in its own process) on a scratch SQLite
+DB, with OpenRouter replaced by a local stub (see bench_openrouter_client.py).
+A prober sends uncached /api/generate requests at a fixed rate in two phases:
+idle, and while --logins concurrent clients POST /token with valid
+credentials in a loop. Each login costs one bcrypt verify (~0.25-0.4 s of CPU
+at 12 rounds).
+
+If bcrypt runs on the event loop, every login stalls all in-flight requests
+for the length of a verify, so generate p99 jumps to roughly (logins queued
+ahead) x (verify time). With hashing on the bounded pool, generate latency
+stays near the stub delay, and login throughput is capped by the pool size.
+
+Usage:
+  python benchmarks/bench_login_storm.py
+  python benchmarks/bench_login_storm.py --seconds 10 --logins 32 --delay-ms 50
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from bench_db_event_loop import free_port, percentile, start_app  # noqa: E402
+from bench_openrouter_client import start_stub_server  # noqa: E402
+
+PASSWORD = "correct horse battery staple"
+GENERATE_BODY = {
+    "intent": "Intro",
+    "profileInfo": {"name": "Sam Lee", "title": "PM", "company": "Acme"},
+    "extendedProfile": {},
+    "bypass_cache": True,
+}
+
+
+def seed_users(db_path: str, users: int):
+    from services.passwords import pwd_context
+
+    # One real hash shared by every user: same cost as a distinct hash per user
+    hashed = pwd_context.hash(PASSWORD)
+    con = sqlite3.connect(db_path)
+    con.executemany(
+        "INSERT INTO users (username, email, hashed_password, is_active, created_at) VALUES (?, ?, ?, 1, datetime('now'))",
+        ((f"user{i}", f"user{i}@example.com", hashed) for i in range(users)),
+    )
+    con.commit()
+    con.close()
+
+
+async def probe_generate(client, stop: asyncio.Event, interval: float):
+    samples = []
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        r = await client.post("/api/generate", json=GENERATE_BODY)
+        r.raise_for_status()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+        await asyncio.sleep(interval)
+    return samples
+
+
+async def login_worker(client, stop: asyncio.Event, users: int, worker: int, counts: dict):
+    i = worker
+    while not stop.is_set():
+        r = await client.post("/token", data={"username": f"user{i % users}", "password": PASSWORD})
+        r.raise_for_status()
+        counts["logins"] += 1
+        i += 7
+
+
+async def run(port: int, seconds: float, logins: int, users: int, interval: float):
+    import httpx
+
+    limits = httpx.Limits(max_connections=logins + 4)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=120.0) as client:
+        results = {}
+        for label, workers in (("idle", 0), (f"{logins} concurrent logins", logins)):
+            stop = asyncio.Event()
+            counts = {"logins": 0}
+            probe = asyncio.create_task(probe_generate(client, stop, interval))
+            tasks = [asyncio.create_task(login_worker(client, stop, users, w, counts)) for w in range(workers)]
+            await asyncio.sleep(seconds)
+            stop.set()
+            samples = await probe
+            await asyncio.gather(*tasks)
+            results[label] = (samples, counts["logins"] / seconds)
+        return results
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Measure /api/generate latency during a login storm.")
+    ap.add_argument("--seconds", type=float, default=8.0, help="Duration of each phase")
+    ap.add_argument("--logins", type=int, default=16, help="Concurrent login clients")
+    ap.add_argument("--users", type=int, default=100, help="Users seeded into the scratch DB")
+    ap.add_argument("--delay-ms", type=float, default=20.0, help="Artificial stub OpenRouter latency")
+    ap.add_argument("--interval-ms", type=float, default=20.0, help="Pause between generate probes")
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="bench_login_")
+    db_path = os.path.join(workdir, "bench.db")
+    stub_port = free_port()
+    # Must be set before database.py / services.openrouter read their configuration
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{stub_port}/api/v1"
+    os.environ.setdefault("OPENROUTER_API_KEY", "bench-key")
+    import database  # noqa: F401  (creates the schema)
+
+    seed_users(db_path, args.users)
+    server, thread = start_stub_server(stub_port, args.delay_ms)
+    port = free_port()
+    proc = start_app(port, dict(os.environ))
+    try:
+        results = asyncio.run(run(port, args.seconds, args.logins, args.users, args.interval_ms / 1000.0))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+        server.should_exit = True
+        thread.join(timeout=5)
+
+    print(f"{args.seconds:.0f} s per phase • stub delay {args.delay_ms:.0f} ms • {os.cpu_count()} CPU(s)\n")
+    print(f"  {'phase':24s} {'generate p50':>13s} {'p99':>9s} {'max':>9s} {'logins/s':>9s}")
+    for label, (samples, login_rps) in results.items():
+        print(f"  {label:24s} {statistics.median(samples):11.1f}ms {percentile(samples, 99):7.1f}ms "
+              f"{max(samples):7.1f}ms {login_rps:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+bench_model_hedging.py — Tail latency of generate_message / stream_message with
+one model vs an ordered model list with hedging, against a local stub server.
+
+The stub answers per model. The primary is fast but stalls on a fraction of
+requests (a free-tier queue backing up) and fails on another fraction; the
+secondary is slower but steady. A last phase makes the primary slow on every
+request and shows the router moving the secondary to the front.
+
+Usage:
+  python benchmarks/bench_model_hedging.py
+  python benchmarks/bench_model_hedging.py --requests 400 --stall-rate 0.1 --hedge-after 0.5 --stream
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from bench_openrouter_client import free_port, percentile  # noqa: E402
+
+PRIMARY = "stub/primary"
+SECONDARY = "stub/secondary"
+MESSAGE = "Hi Sam, loved your post on payments infra. Open to a 10 min chat next week?"
+
+
+def start_stub_server(port: int, profiles: dict, seed: int):
+    """
+    OpenRouter look-alike whose latency depends on the requested model.
+
+    `profiles` maps model -> {"ms", "stall_ms", "stall_rate", "error_rate"}
+    (plus an optional "error_status", default 503) and may be changed while
+    the server runs.
+    """
+    import uvicorn
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+
+    stub = FastAPI()
+    rng = random.Random(seed)
+    served = Counter()
+
+    @stub.post("/api/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        model = body["model"]
+        profile = profiles[model]
+        served[model] += 1
+        if rng.random() < profile["error_rate"]:
+            return JSONResponse({"error": {"message": "upstream error"}}, status_code=profile.get("error_status", 503))
+        stalled = rng.random() < profile["stall_rate"]
+        delay = (profile["stall_ms"] if stalled else profile["ms"]) / 1000.0
+
+        if not body.get("stream"):
+            await asyncio.sleep(delay)
+            return {"choices": [{"message": {"role": "assistant", "content": MESSAGE}}]}
+
+        async def events():
+            yield ": OPENROUTER PROCESSING\n\n"
+            await asyncio.sleep(delay)
+            for word in MESSAGE.split(" "):
+                yield f"data: {json.dumps({'choices': [{'delta': {'content': word + ' '}}]})}\n\n"
+                await asyncio.sleep(0.002)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    config = uvicorn.Config(stub, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, served
+
+
+async def run_phase(openrouter, models, hedge_after: float, total: int, concurrency: int, stream: bool):
+    """Send `total` requests through a fresh router; returns latency stats and outcome counts."""
+    from services.model_router import ModelRouter
+
+    router = ModelRouter("bench", models, failure_penalty=hedge_after or openrouter.REQUEST_TIMEOUT)
+    openrouter.COMPLETION_ROUTER = openrouter.STREAM_ROUTER = router
+    openrouter.HEDGE_AFTER = hedge_after
+
+    sem = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+    client = openrouter.create_client()
+    profile = {"name": "Sam Lee", "title": "PM", "company": "Acme"}
+
+    async def one():
+        nonlocal failures
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                if stream:
+                    # Time to first token, which is what hedging targets for streams
+                    events = openrouter.stream_message("Intro", profile, {}, client)
+                    try:
+                        await events.__anext__()
+                        latencies.append((time.perf_counter() - t0) * 1000.0)
+                        async for _ in events:
+                            pass
+                    finally:
+                        await events.aclose()
+                else:
+                    await openrouter.generate_message("Intro", profile, {}, client=client)
+                    latencies.append((time.perf_counter() - t0) * 1000.0)
+            except Exception:
+                failures += 1
+
+    try:
+        await asyncio.gather(*(one() for _ in range(total)))
+    finally:
+        await client.aclose()
+    return {
+        "p50_ms": statistics.median(latencies) if latencies else float("nan"),
+        "p95_ms": percentile(latencies, 95) if latencies else float("nan"),
+        "p99_ms": percentile(latencies, 99) if latencies else float("nan"),
+        "failed": failures,
+        "order": router.order(),
+    }
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Benchmark single-model vs hedged model list for generate_message.")
+    ap.add_argument("--requests", type=int, default=300, help="Requests per phase")
+    ap.add_argument("--concurrency", type=int, default=10, help="Concurrent in-flight requests")
+    ap.add_argument("--primary-ms", type=float, default=80.0, help="Primary model's usual latency")
+    ap.add_argument("--stall-ms", type=float, default=4000.0, help="Primary model's latency when stalled")
+    ap.add_argument("--stall-rate", type=float, default=0.08, help="Fraction of primary requests that stall")
+    ap.add_argument("--error-rate", type=float, default=0.03, help="Fraction of primary requests answered with 503")
+    ap.add_argument("--secondary-ms", type=float, default=250.0, help="Secondary model's latency")
+    ap.add_argument("--hedge-after", type=float, default=0.5, help="Seconds before the secondary is started")
+    ap.add_argument("--stream", action="store_true", help="Measure stream_message time to first token instead")
+    ap.add_argument("--seed", type=int, default=7)
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    port = free_port()
+    # Must be set before services.openrouter reads its configuration
+    os.environ["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{port}/api/v1"
+    os.environ.setdefault("OPENROUTER_API_KEY", "bench-key")
+    from services import openrouter
+
+    profiles = {
+        PRIMARY: {"ms": args.primary_ms, "stall_ms": args.stall_ms, "stall_rate": args.stall_rate, "error_rate": args.error_rate},
+        SECONDARY: {"ms": args.secondary_ms, "stall_ms": args.secondary_ms, "stall_rate": 0.0, "error_rate": 0.0},
+    }
+    server, thread, served = start_stub_server(port, profiles, args.seed)
+    phases = (
+        ("primary only", [PRIMARY], 0.0),
+        ("fallback on error only", [PRIMARY, SECONDARY], 0.0),
+        (f"hedged after {args.hedge_after:g}s", [PRIMARY, SECONDARY], args.hedge_after),
+    )
+    try:
+        mode = "stream_message TTFT" if args.stream else "generate_message"
+        print(f"Stub server on :{port} • {mode} • {args.requests} requests • concurrency {args.concurrency}")
+        print(f"primary {args.primary_ms:g} ms, {args.stall_rate:.0%} stall at {args.stall_ms:g} ms, "
+              f"{args.error_rate:.0%} 503 • secondary {args.secondary_ms:g} ms\n")
+        print(f"  {'phase':28s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'failed':>7s}  upstream calls")
+        for label, models, hedge_after in phases:
+            served.clear()
+            stats = asyncio.run(run_phase(openrouter, models, hedge_after, args.requests, args.concurrency, args.stream))
+            calls = ", ".join(f"{m.split('/')[1]} {n}" for m, n in sorted(served.items()))
+            print(f"  {label:28s} {stats['p50_ms']:9.1f} {stats['p95_ms']:9.1f} {stats['p99_ms']:9.1f} {stats['failed']:7d}  {calls}")
+
+        # Primary degrades for good: the router should learn to lead with the secondary
+        profiles[PRIMARY].update(ms=args.secondary_ms * 4, stall_rate=0.0, error_rate=0.0)
+        served.clear()
+        stats = asyncio.run(run_phase(openrouter, [PRIMARY, SECONDARY], args.hedge_after, args.requests, args.concurrency, args.stream))
+        calls = ", ".join(f"{m.split('/')[1]} {n}" for m, n in sorted(served.items()))
+        label = f"primary at {args.secondary_ms * 4:g} ms"
+        print(f"  {label:28s} {stats['p50_ms']:9.1f} {stats['p95_ms']:9.1f} {stats['p99_ms']:9.1f} {stats['failed']:7d}  {calls}")
+        print(f"\n  learned order: {' > '.join(stats['order'])}\n")
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
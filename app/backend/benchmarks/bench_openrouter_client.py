@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+bench_openrouter_client.py — Compare a client-per-call vs a shared pooled client
+for services.openrouter.generate_message against a local stub server.
+
+The stub mimics OpenRouter's /chat/completions response shape, so no API key
+or network access is needed. Plain HTTP is used locally, so the numbers only
+show TCP connect + pool overhead; against openrouter.ai the TLS handshake
+saved by the shared client is larger still.
+
+Usage:
+  python benchmarks/bench_openrouter_client.py
+  python benchmarks/bench_openrouter_client.py --requests 2000 --concurrency 50 --delay-ms 20
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stub_server(port: int, delay_ms: float):
+    """Run a minimal OpenRouter look-alike in a background thread."""
+    import uvicorn
+    from fastapi import FastAPI
+
+    stub = FastAPI()
+
+    @stub.post("/api/v1/chat/completions")
+    async def completions():
+        if delay_ms:
+            await asyncio.sleep(delay_ms / 1000.0)
+        return {
+            "choices": [
+                {"message": {"role": "assistant", "content": "Hi Sam, loved your post on payments infra. Open to a 10 min chat next week?"}}
+            ]
+        }
+
+    config = uvicorn.Config(stub, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[idx]
+
+
+async def run_mode(openrouter, shared: bool, total: int, concurrency: int):
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+    client = openrouter.create_client() if shared else None
+
+    async def one():
+        async with sem:
+            t0 = time.perf_counter()
+            await openrouter.generate_message(
+                "Intro", {"name": "Sam Lee", "title": "PM", "company": "Acme"}, {}, client=client
+            )
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(one() for _ in range(total)))
+    finally:
+        if client is not None:
+            await client.aclose()
+    elapsed = time.perf_counter() - started
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": percentile(latencies, 99),
+        "rps": total / elapsed,
+    }
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Benchmark per-call vs shared httpx client for generate_message.")
+    ap.add_argument("--requests", type=int, default=500, help="Total requests per mode")
+    ap.add_argument("--concurrency", type=int, default=20, help="Concurrent in-flight requests")
+    ap.add_argument("--delay-ms", type=float, default=5.0, help="Artificial stub server latency")
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    port = free_port()
+    # Must be set before services.openrouter reads its configuration
+    os.environ["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{port}/api/v1"
+    os.environ.setdefault("OPENROUTER_API_KEY", "bench-key")
+    from services import openrouter
+
+    server, thread = start_stub_server(port, args.delay_ms)
+    try:
+        print(f"Stub server on :{port} • {args.requests} requests • concurrency {args.concurrency} • delay {args.delay_ms} ms\n")
+        print(f"  {'mode':26s} {'p50 ms':>9s} {'p99 ms':>9s} {'req/s':>9s}")
+        for label, shared in (("client per call (before)", False), ("shared pool (after)", True)):
+            stats = asyncio.run(run_mode(openrouter, shared, args.requests, args.concurrency))
+            print(f"  {label:26s} {stats['p50_ms']:9.2f} {stats['p99_ms']:9.2f} {stats['rps']:9.1f}")
+        print()
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
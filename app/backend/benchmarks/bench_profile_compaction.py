@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+bench_profile_compaction.py — Prompt size and compaction cost for profiles of
+growing size, at one or more token budgets (services/compaction.py).
+
+Each synthetic profile has `n` experiences, posts and awards with long
+descriptions, like an executive's fully expanded LinkedIn page. For each
+budget the script reports the estimated prompt tokens of the whole user
+message (build_user_content) before and after compaction, the compaction
+level used, and the time compact_profile takes.
+
+Usage:
+  python benchmarks/bench_profile_compaction.py
+  python benchmarks/bench_profile_compaction.py --sizes 2 10 50 --budgets 600 1000 2000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from services.compaction import compact_profile, estimate_tokens  # noqa: E402
+from services.prompts import build_user_content  # noqa: E402
+
+WORDS = (
+    "led built scaled payments platform team revenue growth launched enterprise customers "
+    "infrastructure migration hiring roadmap strategy partnerships reduced latency cost "
+    "cloud data analytics product market expansion europe security compliance"
+).split()
+INTENT = "Intro about payments infrastructure and a 15 min chat"
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    if rng.random() < 0.3:
+        text += f", up {rng.randint(5, 300)}%"
+    return text.capitalize() + "."
+
+
+def synthetic_profile(n: int, seed: int):
+    rng = random.Random(seed)
+    info = {"name": "Sam Lee", "title": "VP Engineering, Payments", "company": "Acme"}
+    extended = {
+        "about": " ".join(sentence(rng, 20) for _ in range(12)),
+        "experiences": [
+            {
+                "title": f"{rng.choice(['Director', 'Head', 'VP', 'Manager'])} of {rng.choice(WORDS).title()}",
+                "company": f"Company {i}",
+                "dateRange": "Jan 2021 - Present" if i == 0 else f"{2020 - 2 * i} - {2021 - 2 * i}",
+                "location": "San Francisco, CA",
+                "description": " ".join(sentence(rng, 15) for _ in range(8)),
+            }
+            for i in range(n)
+        ],
+        "education": [
+            {"school": f"University {i}", "degree": "MS", "fieldOfStudy": "Computer Science", "dateRange": f"{2000 - 4 * i} - {2002 - 4 * i}"}
+            for i in range(min(n, 5))
+        ],
+        "awards": [
+            {"name": f"Award {i}", "issuer": "Industry Group", "date": str(2022 - i), "description": sentence(rng, 30)}
+            for i in range(n)
+        ],
+        "recentPosts": [{"text": " ".join(sentence(rng, 12) for _ in range(3))} for _ in range(min(n, 20))],
+    }
+    return info, extended
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Benchmark profile compaction: prompt tokens and time.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1, 5, 20, 50], help="Entries per section")
+    ap.add_argument("--budgets", type=int, nargs="+", default=[500, 1000, 2000], help="Token budgets to compare")
+    ap.add_argument("--repeat", type=int, default=50, help="Timed compactions per case")
+    ap.add_argument("--seed", type=int, default=7)
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    print(f"  {'entries':>7s} {'budget':>7s} {'prompt tokens':>14s} {'-> after':>9s} {'saved':>6s} {'level':>6s} {'ms/profile':>11s}")
+    for n in args.sizes:
+        info, extended = synthetic_profile(n, args.seed)
+        before = estimate_tokens(build_user_content(INTENT, info, extended))
+        for budget in args.budgets:
+            times = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                compact = compact_profile(INTENT, info, extended, budget)
+                times.append((time.perf_counter() - t0) * 1000.0)
+            after = estimate_tokens(build_user_content(INTENT, compact.profile_info, compact.extended_profile))
+            level = "-" if compact.level < 0 else str(compact.level)
+            print(f"  {n:7d} {budget:7d} {before:14d} {after:9d} {1 - after / before:6.0%} {level:>6s} {statistics.median(times):11.2f}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+bench_upstream_overload.py — Goodput of generate_message when callers offer
+more load than the provider can take, and upstream traffic during an outage,
+with and without the adaptive upstream guard (services/upstream.py).
+
+The stub serves at most --capacity concurrent requests and answers 429
+(with Retry-After) beyond that, like a rate-limited free tier. Callers
+retry failed requests after a short pause, as the extension's users would.
+For --outage-s seconds in the middle of each run every request gets a 503.
+
+Usage:
+  python benchmarks/bench_upstream_overload.py
+  python benchmarks/bench_upstream_overload.py --callers 128 --capacity 8 --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from bench_openrouter_client import free_port  # noqa: E402
+
+
+def start_stub_server(port: int, capacity: int, service_ms: float, retry_after: str):
+    """OpenRouter look-alike with a hard concurrency capacity and a switchable outage."""
+    import uvicorn
+    from fastapi import FastAPI
+    from fastapi.responses import JSONResponse
+
+    stub = FastAPI()
+    state = {"in_flight": 0, "down": False}
+    served = Counter()
+
+    @stub.post("/api/v1/chat/completions")
+    async def completions():
+        if state["down"]:
+            served["503"] += 1
+            return JSONResponse({"error": {"message": "provider down"}}, status_code=503)
+        if state["in_flight"] >= capacity:
+            served["429"] += 1
+            headers = {"Retry-After": retry_after} if retry_after else {}
+            return JSONResponse({"error": {"message": "rate limited"}}, status_code=429, headers=headers)
+        state["in_flight"] += 1
+        try:
+            await asyncio.sleep(service_ms / 1000.0)
+        finally:
+            state["in_flight"] -= 1
+        served["200"] += 1
+        return {"choices": [{"message": {"role": "assistant", "content": "Hi Sam, open to a quick chat?"}}]}
+
+    config = uvicorn.Config(stub, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, state, served
+
+
+async def run_mode(openrouter, upstream, args, state, served):
+    from fastapi import HTTPException
+
+    openrouter.OPENROUTER_UPSTREAMS = {openrouter.MODEL: upstream}
+    served.clear()
+    client = openrouter.create_client()
+    profile = {"name": "Sam Lee", "title": "PM", "company": "Acme"}
+    ok, refused_locally = 0, 0
+    outage_calls = 0
+    started = time.perf_counter()
+    deadline = started + args.seconds
+    outage = (started + (args.seconds - args.outage_s) / 2, started + (args.seconds + args.outage_s) / 2)
+
+    async def caller():
+        nonlocal ok, refused_locally
+        while time.perf_counter() < deadline:
+            try:
+                await openrouter.generate_message("Intro", profile, {}, client=client)
+                ok += 1
+            except HTTPException as e:
+                if e.status_code == 503 and "temporarily unavailable" in str(e.detail):
+                    refused_locally += 1
+                await asyncio.sleep(args.retry_pause)
+
+    async def outage_switch():
+        nonlocal outage_calls
+        await asyncio.sleep(outage[0] - time.perf_counter())
+        before = served["503"]
+        state["down"] = True
+        await asyncio.sleep(outage[1] - time.perf_counter())
+        state["down"] = False
+        outage_calls = served["503"] - before
+
+    try:
+        await asyncio.gather(outage_switch(), *(caller() for _ in range(args.callers)))
+    finally:
+        await client.aclose()
+    elapsed = time.perf_counter() - started
+    return {
+        "goodput": ok / elapsed,
+        "upstream_rps": sum(served.values()) / elapsed,
+        "429": served["429"],
+        "outage_calls": outage_calls,
+        "refused": refused_locally,
+        "state": upstream.state(),
+    }
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Benchmark generate_message under provider overload and outage.")
+    ap.add_argument("--seconds", type=float, default=10.0, help="Length of each run")
+    ap.add_argument("--callers", type=int, default=64, help="Concurrent callers, each retrying in a loop")
+    ap.add_argument("--capacity", type=int, default=8, help="Stub's concurrent request capacity")
+    ap.add_argument("--service-ms", type=float, default=100.0, help="Stub's time per accepted request")
+    ap.add_argument("--retry-after", default="1", help="Retry-After sent with 429s ('' for none)")
+    ap.add_argument("--outage-s", type=float, default=3.0, help="Seconds of 503s in the middle of each run")
+    ap.add_argument("--retry-pause", type=float, default=0.05, help="Caller pause after a failed request")
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    port = free_port()
+    # Must be set before services.openrouter reads its configuration
+    os.environ["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{port}/api/v1"
+    os.environ.setdefault("OPENROUTER_API_KEY", "bench-key")
+    os.environ.setdefault("OPENROUTER_HEDGE_AFTER", "0")
+    from services import openrouter
+    from services.upstream import Upstream
+
+    server, thread, state, served = start_stub_server(port, args.capacity, args.service_ms, args.retry_after)
+    capacity_rps = args.capacity / (args.service_ms / 1000.0)
+    modes = (
+        # Limits too high to matter and a breaker that never trips: every request goes upstream
+        ("no guard (before)", Upstream("bench-off", initial_limit=10_000, max_limit=10_000, failure_threshold=10**9)),
+        ("AIMD + breaker (after)", Upstream("bench-on", initial_limit=16, max_limit=openrouter.MAX_CONNECTIONS,
+                                            failure_threshold=5, reset_timeout=1.0)),
+    )
+    try:
+        print(f"Stub on :{port} • capacity {args.capacity} concurrent × {args.service_ms:g} ms "
+              f"= {capacity_rps:.0f} req/s • {args.callers} callers • {args.outage_s:g}s outage\n")
+        print(f"  {'mode':24s} {'ok/s':>7s} {'upstream/s':>11s} {'429s':>7s} {'calls in outage':>16s} {'refused locally':>16s}")
+        for label, upstream in modes:
+            stats = asyncio.run(run_mode(openrouter, upstream, args, state, served))
+            print(f"  {label:24s} {stats['goodput']:7.1f} {stats['upstream_rps']:11.1f} {stats['429']:7d} "
+                  f"{stats['outage_calls']:16d} {stats['refused']:16d}")
+        print(f"\n  guard state at end: {stats['state']}\n")
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+bench_pending_queue.py — Pending-queue read/claim latency on a large campaign_member table.
+
+Builds a scratch DB with the schema of --db and --rows campaign_member rows, then
+times the original list_pending query (LIMIT only; deep pages via OFFSET)
+against the keyset read path in work_queue.py with ix_cmember_pending_queue,
+and the claim() lease on both layouts.
+
+Usage:
+  python3 bench_pending_queue.py --db ./genreach.db --rows 1000000
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+from testing import schema_copy
+from work_queue import claim, connect, ensure_queue_indexes, pending_page
+
+LEGACY_PENDING = """
+    SELECT cm.id AS campaign_member_id,
+           o.full_name,
+           o.email,
+           o.li_profile_url,
+           c.name AS campaign_name,
+           cm.priority,
+           cm.status,
+           cm.created_at
+    FROM campaign_member cm
+    JOIN campaign c  ON c.id = cm.campaign_id
+    JOIN opportunity o ON o.id = cm.opportunity_id
+    WHERE cm.status = 'pending' AND c.status = 'running'
+    ORDER BY cm.priority DESC, cm.created_at
+    LIMIT ? OFFSET ?;
+"""
+
+
+def build(db_path: str, out_path: str, rows: int, campaigns: int):
+    if os.path.exists(out_path):
+        os.remove(out_path)
+    with tempfile.TemporaryDirectory() as scratch:
+        shutil.move(schema_copy(scratch, db_path), out_path)
+    disk = sqlite3.connect(out_path)
+    disk.execute("PRAGMA journal_mode = OFF;")
+    disk.execute("PRAGMA synchronous = OFF;")
+    disk.execute("INSERT INTO organization (id, name) VALUES ('org-bench', 'Bench')")
+    disk.execute("INSERT INTO \"user\" (id, org_id, email) VALUES ('user-bench', 'org-bench', 'bench@example.com')")
+    disk.executemany(
+        "INSERT INTO campaign (id, org_id, name, status) VALUES (?, 'org-bench', ?, ?)",
+        [(f"camp-{i}", f"Campaign {i}", "paused" if i % 5 == 0 else "running") for i in range(campaigns)])
+    rnd = random.Random(7)
+    statuses = ["pending"] * 6 + ["completed"] * 3 + ["failed"]
+    disk.executemany(
+        "INSERT INTO opportunity (id, org_id, full_name, stage) VALUES (?, 'org-bench', ?, 'new')",
+        ((f"opp-{i}", f"Lead {i}") for i in range(rows)))
+    disk.executemany(
+        "INSERT INTO campaign_member (id, org_id, campaign_id, opportunity_id, status, priority, created_at) "
+        "VALUES (?, 'org-bench', ?, ?, ?, ?, datetime('2025-01-01', '+' || ? || ' seconds'))",
+        ((f"cm-{i:07d}", f"camp-{i % campaigns}", f"opp-{i}", rnd.choice(statuses), rnd.randint(0, 10),
+          rnd.randint(0, 10 ** 7)) for i in range(rows)))
+    disk.commit()
+    disk.close()
+
+
+def timed(fn, repeat: int = 5) -> float:
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000.0
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Benchmark the pending-queue reads.")
+    ap.add_argument("--db", default=os.environ.get("GENREACH_DB_PATH", "genreach.db"), help="DB to copy the schema from")
+    ap.add_argument("--rows", type=int, default=1_000_000, help="campaign_member rows to generate")
+    ap.add_argument("--campaigns", type=int, default=50)
+    ap.add_argument("--page", type=int, default=50, help="Page size")
+    ap.add_argument("--out", default=os.path.join(tempfile.gettempdir(), "bench_pending_queue.db"), help="Scratch DB path")
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.db):
+        print(f"[ERROR] DB not found: {args.db}")
+        sys.exit(1)
+
+    t0 = time.perf_counter()
+    build(args.db, args.out, args.rows, args.campaigns)
+    print(f"Built {args.rows} campaign_member rows in {time.perf_counter() - t0:.1f} s ({args.out})\n")
+
+    con = connect(args.out)
+    pending = con.execute("SELECT COUNT(*) FROM campaign_member WHERE status = 'pending'").fetchone()[0]
+    deep = pending // 2
+    page = args.page
+
+    before_first = timed(lambda: con.execute(LEGACY_PENDING, (page, 0)).fetchall())
+    before_deep = timed(lambda: con.execute(LEGACY_PENDING, (page, deep)).fetchall(), repeat=2)
+    before_claim = timed(lambda: claim(con, "user-bench", 10, lease_seconds=3600), repeat=3)
+
+    t0 = time.perf_counter()
+    ensure_queue_indexes(con)
+    con.execute("ANALYZE")
+    con.commit()
+    index_s = time.perf_counter() - t0
+
+    # Cursor of the row just before the deep page, to compare like with like
+    anchor = con.execute(LEGACY_PENDING, (1, deep - 1)).fetchone()
+    after = (anchor["priority"], anchor["created_at"], anchor["campaign_member_id"])
+    expected = [r["campaign_member_id"] for r in con.execute(LEGACY_PENDING.replace(
+        "cm.created_at\n    LIMIT", "cm.created_at, cm.id\n    LIMIT"), (page, deep)).fetchall()]
+    got = [r["campaign_member_id"] for r in pending_page(con, page, after)[0]]
+    if got != expected:
+        print("[ERROR] keyset page differs from the OFFSET page")
+        sys.exit(1)
+
+    after_first = timed(lambda: pending_page(con, page))
+    after_deep = timed(lambda: pending_page(con, page, after))
+    after_claim = timed(lambda: claim(con, "user-bench", 10, lease_seconds=3600), repeat=3)
+    con.close()
+
+    print(f"{pending} pending members, page size {page}; index built in {index_s:.1f} s\n")
+    print(f"  {'':28s} {'before':>10s} {'after':>10s}")
+    print(f"  {'first page':28s} {before_first:8.1f}ms {after_first:8.2f}ms")
+    print(f"  {'page at depth ' + str(deep):28s} {before_deep:8.1f}ms {after_deep:8.2f}ms")
+    print(f"  {'claim 10':28s} {before_claim:8.1f}ms {after_claim:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,8 @@ import sqlite3
 import sys
 from contextlib import closing
 
+from work_queue import decode_cursor, missing_queue_indexes, pending_page
+
 REQUIRED_TABLES = {
     "organization",
     "user",
@@ -47,6 +49,14 @@ def verify_schema(con: sqlite3.Connection):
         sys.exit(2)
     print("Schema check: OK (all required tables present)\n")
 
+def verify_queue_indexes(con: sqlite3.Connection):
+    missing = missing_queue_indexes(con)
+    if missing:
+        print("[WARN] Missing queue indexes:", ', '.join(missing))
+        print("       The pending queue below is read without them. Run work_queue.py once to create them.\n")
+        return
+    print("Queue indexes: OK\n")
+
 def show_counts(con: sqlite3.Connection):
     print("Row counts:")
     for t in sorted(REQUIRED_TABLES):
@@ -54,24 +64,9 @@ def show_counts(con: sqlite3.Connection):
         print(f"  {t:17s} {c:5d}")
     print()
 
-def list_pending(con: sqlite3.Connection, limit: int = 50):
-    q = """
-    SELECT cm.id AS campaign_member_id,
-           o.full_name,
-           o.email,
-           o.li_profile_url,
-           c.name AS campaign_name,
-           cm.priority,
-           cm.status,
-           cm.created_at
-    FROM campaign_member cm
-    JOIN campaign c  ON c.id = cm.campaign_id
-    JOIN opportunity o ON o.id = cm.opportunity_id
-    WHERE cm.status = 'pending' AND c.status = 'running'
-    ORDER BY cm.priority DESC, cm.created_at
-    LIMIT ?;
-    """
-    rows = con.execute(q, (limit,)).fetchall()
+def list_pending(con: sqlite3.Connection, limit: int = 50, after: str = None):
+    # Keyset-paginated read over ix_cmember_pending_queue (see work_queue.pending_page)
+    rows, next_cursor = pending_page(con, limit, decode_cursor(after) if after else None)
     print(f"Pending queue (limit {limit}): {len(rows)} rows\n")
     for r in rows:
         print(f"  cm={r['campaign_member_id']} • {r['full_name']} <{r['email'] or '-'}> • camp={r['campaign_name']} • prio={r['priority']} • status={r['status']}")
@@ -79,6 +74,8 @@ def list_pending(con: sqlite3.Connection, limit: int = 50):
         print("  (none)\n")
     else:
         print()
+    if next_cursor:
+        print(f"Next page: --after '{next_cursor}'\n")
     return rows
 
 def export_queue_csv(rows, out_path: str):
@@ -157,6 +154,7 @@ def parse_args():
     ap = argparse.ArgumentParser(description="Test the Sales.ai SQLite database.")
     ap.add_argument("--db", default=os.environ.get("GENREACH_DB_PATH", "genreach.db"), help="Path to SQLite DB file")
     ap.add_argument("--limit", type=int, default=20, help="Limit for pending queue query")
+    ap.add_argument("--after", default=None, help="Pending queue cursor from the previous page")
     ap.add_argument("--export-queue", dest="export_queue", default=None, help="Optional CSV export path for pending queue")
     ap.add_argument("--demo-writes", action="store_true", help="Insert a sample opportunity, campaign_member, and message_attempt")
     return ap.parse_args()
@@ -171,8 +169,9 @@ def main():
     try:
         print_db_info(con)
         verify_schema(con)
+        verify_queue_indexes(con)
         show_counts(con)
-        rows = list_pending(con, args.limit)
+        rows = list_pending(con, args.limit, args.after)
         if args.export_queue:
             export_queue_csv(rows, args.export_queue)
         if args.demo_writes:
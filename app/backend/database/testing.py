@@ -0,0 +1,42 @@
+"""
+testing.py — Test helper: an empty database with the checked-in genreach schema.
+
+The tests for the database tools (database/tests) and for the lead finder's
+opportunity store (scripts/tests) both start from this, as does
+bench_pending_queue.py.
+"""
+import os
+import shutil
+import sqlite3
+
+GENREACH_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "genreach.db")
+
+
+def schema_copy(directory, db_path: str = GENREACH_DB) -> str:
+    """Create `directory`/genreach.db with db_path's tables and indexes but no rows; returns its path.
+
+    The schema is read from a copy of the DB and its -wal/-shm files, so the
+    original files are never opened (opening them would rewrite the -shm).
+    """
+    source = os.path.join(str(directory), "source")
+    os.makedirs(source, exist_ok=True)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            shutil.copy(db_path + suffix, os.path.join(source, "genreach.db" + suffix))
+    src = sqlite3.connect(os.path.join(source, "genreach.db"))
+    try:
+        ddl = [r[0] for r in src.execute(
+            "SELECT sql FROM sqlite_master WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%' "
+            "ORDER BY type = 'table' DESC")]
+    finally:
+        src.close()
+
+    path = os.path.join(str(directory), "genreach.db")
+    con = sqlite3.connect(path)
+    try:
+        for sql in ddl:
+            con.execute(sql)
+        con.commit()
+    finally:
+        con.close()
+    return path
@@ -0,0 +1,38 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+DATABASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DATABASE_DIR)
+
+from testing import schema_copy  # noqa: E402
+
+
+@pytest.fixture
+def queue_db(tmp_path):
+    """Path to a genreach-schema DB seeded with one org, two senders and two campaigns.
+
+    camp-run is running and camp-off is paused; each has pending members
+    cm-<campaign>-<i> with priority i % 3 and created_at one minute apart.
+    The schema comes from testing.schema_copy.
+    """
+    path = schema_copy(tmp_path)
+    con = sqlite3.connect(path)
+    con.execute("INSERT INTO organization (id, name) VALUES ('org-q', 'Queue')")
+    con.executemany("INSERT INTO \"user\" (id, org_id, email) VALUES (?, 'org-q', ?)",
+                    [("user-1", "a@q.test"), ("user-2", "b@q.test")])
+    con.executemany("INSERT INTO campaign (id, org_id, name, status) VALUES (?, 'org-q', ?, ?)",
+                    [("camp-run", "Running", "running"), ("camp-off", "Paused", "paused")])
+    for camp in ("run", "off"):
+        for i in range(10):
+            con.execute("INSERT INTO opportunity (id, org_id, full_name, stage) VALUES (?, 'org-q', ?, 'new')",
+                        (f"opp-{camp}-{i}", f"Lead {camp} {i}"))
+            con.execute(
+                "INSERT INTO campaign_member (id, org_id, campaign_id, opportunity_id, status, priority, created_at) "
+                "VALUES (?, 'org-q', ?, ?, 'pending', ?, datetime('2025-01-01', '+' || ? || ' minutes'))",
+                (f"cm-{camp}-{i}", f"camp-{camp}", f"opp-{camp}-{i}", i % 3, i))
+    con.commit()
+    con.close()
+    return path
@@ -0,0 +1,36 @@
+import sqlite3
+import sys
+
+import query
+import work_queue
+
+
+def index_names(path):
+    con = sqlite3.connect(path)
+    try:
+        return {r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    finally:
+        con.close()
+
+
+def test_query_reports_missing_indexes_without_creating_them(queue_db, monkeypatch, capsys):
+    before = index_names(queue_db)
+    monkeypatch.setattr(sys, "argv", ["query.py", "--db", queue_db, "--limit", "3"])
+    query.main()
+    out = capsys.readouterr().out
+
+    assert index_names(queue_db) == before
+    assert "Missing queue indexes: ix_cmember_pending_queue" in out
+    assert "Pending queue (limit 3): 3 rows" in out
+    assert "Next page: --after" in out
+
+
+def test_query_reports_ok_once_work_queue_created_them(queue_db, monkeypatch, capsys):
+    con = work_queue.connect(queue_db)
+    work_queue.ensure_queue_indexes(con)
+    assert work_queue.missing_queue_indexes(con) == []
+    con.close()
+
+    monkeypatch.setattr(sys, "argv", ["query.py", "--db", queue_db])
+    query.main()
+    assert "Queue indexes: OK" in capsys.readouterr().out
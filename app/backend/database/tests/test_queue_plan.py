@@ -0,0 +1,70 @@
+import sqlite3
+
+import pytest
+
+import work_queue
+from testing import schema_copy
+
+QUEUE_INDEX = "ix_cmember_pending_queue"
+CAMPAIGN_QUEUE_INDEX = "ix_cmember_pending_by_campaign"
+LEASE_INDEX = "ix_cmember_lease_expiry"
+
+
+@pytest.fixture(scope="module")
+def plan_db(tmp_path_factory):
+    """The genreach schema plus the queue indexes, with a few thousand members and fresh statistics."""
+    con = sqlite3.connect(schema_copy(tmp_path_factory.mktemp("plan")))
+    work_queue.ensure_queue_indexes(con)
+    members, campaigns = 5000, 10
+    statuses = ["completed", "pending", "pending", "messaging"]
+    con.execute("INSERT INTO organization (id, name) VALUES ('org-plan', 'Plan Check')")
+    con.executemany(
+        "INSERT INTO campaign (id, org_id, name, status) VALUES (?, 'org-plan', ?, ?)",
+        [(f"camp-{i}", f"Campaign {i}", "running" if i % 3 else "paused") for i in range(campaigns)])
+    con.executemany(
+        "INSERT INTO opportunity (id, org_id, stage) VALUES (?, 'org-plan', 'new')",
+        [(f"opp-{i}",) for i in range(members)])
+    con.executemany(
+        "INSERT INTO campaign_member (id, org_id, campaign_id, opportunity_id, status, priority, created_at, locked_until) "
+        "VALUES (?, 'org-plan', ?, ?, ?, ?, datetime('2025-01-01', '+' || ? || ' minutes'), "
+        "CASE WHEN ? = 'messaging' THEN datetime('2025-01-01', '+' || ? || ' minutes') END)",
+        [(f"cm-{i}", f"camp-{i % campaigns}", f"opp-{i}", statuses[i % 4], i % 7, i, statuses[i % 4], i)
+         for i in range(members)])
+    con.execute("ANALYZE")
+    con.commit()
+    yield con
+    con.close()
+
+
+def plan(con, sql: str, params) -> list:
+    return [r[3] for r in con.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def assert_driven_by(steps: list, index: str):
+    assert any(f"INDEX {index} " in s or s.endswith(f"INDEX {index}") for s in steps), steps
+    assert not any("USE TEMP B-TREE" in s for s in steps), steps
+
+
+def test_claim_walks_the_queue_index(plan_db):
+    sql = work_queue._claim_sql(by_campaign=False, lease_seconds=60)
+    assert_driven_by(plan(plan_db, sql, ("user-1", 10)), QUEUE_INDEX)
+
+
+def test_claim_for_one_campaign_seeks_the_campaign_index(plan_db):
+    sql = work_queue._claim_sql(by_campaign=True, lease_seconds=60)
+    assert_driven_by(plan(plan_db, sql, ("user-1", "camp-1", 10)), CAMPAIGN_QUEUE_INDEX)
+
+
+def test_reclaim_seeks_the_lease_index(plan_db):
+    assert_driven_by(plan(plan_db, work_queue.RELEASE_EXPIRED, (3,)), LEASE_INDEX)
+
+
+@pytest.mark.parametrize("after", [
+    None,
+    (3, "2025-01-02 00:00:00", "cm-100"),
+    (None, "2025-01-02 00:00:00", "cm-100"),
+], ids=["first page", "cursor", "cursor in NULL priority"])
+def test_every_pending_page_segment_seeks_the_queue_index(plan_db, after):
+    for cursor, params in work_queue._cursor_segments(after):
+        sql = work_queue.PENDING_SELECT.format(cursor=cursor)
+        assert_driven_by(plan(plan_db, sql, (*params, 50)), QUEUE_INDEX)
@@ -0,0 +1,62 @@
+import throttle
+import work_queue
+
+
+def set_limits(con, campaign_id, per_hour=None, per_day=None):
+    con.execute("UPDATE campaign SET throttle_per_hour = ?, daily_send_limit = ? WHERE id = ?",
+                (per_hour, per_day, campaign_id))
+    con.commit()
+
+
+def add_campaign(con, org_id, campaign_id, members, per_hour=None):
+    con.execute("INSERT OR IGNORE INTO organization (id, name) VALUES (?, ?)", (org_id, org_id))
+    con.execute("INSERT INTO campaign (id, org_id, name, status, throttle_per_hour) VALUES (?, ?, ?, 'running', ?)",
+                (campaign_id, org_id, campaign_id, per_hour))
+    for i in range(members):
+        con.execute("INSERT INTO opportunity (id, org_id, stage) VALUES (?, ?, 'new')", (f"opp-{campaign_id}-{i}", org_id))
+        con.execute("INSERT INTO campaign_member (id, org_id, campaign_id, opportunity_id, status, priority) "
+                    "VALUES (?, ?, ?, ?, 'pending', 0)", (f"cm-{campaign_id}-{i}", org_id, campaign_id, f"opp-{campaign_id}-{i}"))
+    con.commit()
+
+
+def test_leases_never_exceed_the_hourly_budget(queue_db):
+    con = work_queue.connect(queue_db)
+    set_limits(con, "camp-run", per_hour=3)
+    engine = throttle.ThrottleEngine(con)
+
+    rows = engine.claim("user-1", limit=10)
+    assert len(rows) == 3
+    assert engine.available("camp-run") == 0
+    assert engine.claim("user-1", limit=10) == []
+
+    assert engine.ack("user-1", rows[0]["id"], "Hi") is not None  # reservation becomes a send
+    assert engine.fail("user-1", rows[1]["id"], "timeout") == "pending"  # reservation is released
+    assert engine.available("camp-run") == 1
+    assert engine.next_slot_in() == 0.0
+
+
+def test_refresh_sees_sends_and_leases_from_other_processes(queue_db):
+    con = work_queue.connect(queue_db)
+    set_limits(con, "camp-run", per_hour=5, per_day=4)
+    other = work_queue.connect(queue_db)
+    held = work_queue.claim(other, "user-2", limit=2, campaign_id="camp-run")
+    work_queue.ack(other, "user-2", held[0]["id"], "Hi")
+
+    engine = throttle.ThrottleEngine(con)
+    assert engine.available("camp-run") == 2  # daily limit 4 - 1 sent - 1 leased
+    assert engine.available("camp-off") == 0  # paused campaigns get nothing
+
+
+def test_slots_are_dealt_round_robin_across_organizations(queue_db):
+    con = work_queue.connect(queue_db)
+    add_campaign(con, "org-b", "camp-b", members=10)
+    add_campaign(con, "org-c", "camp-c", members=10)
+    engine = throttle.ThrottleEngine(con)
+
+    grants = engine.allocate(9)
+    assert grants == {"camp-run": 3, "camp-b": 3, "camp-c": 3}
+    rows = engine.claim("user-1", limit=6)
+    counts = {}
+    for r in rows:
+        counts[r["campaign_id"]] = counts.get(r["campaign_id"], 0) + 1
+    assert counts == {"camp-run": 2, "camp-b": 2, "camp-c": 2}
@@ -0,0 +1,95 @@
+import threading
+
+import work_queue
+
+
+def member_ids(rows):
+    return [r["id"] for r in rows]
+
+
+def expire_leases(con):
+    con.execute("UPDATE campaign_member SET locked_until = datetime('now', '-1 minute') WHERE status = 'messaging'")
+    con.commit()
+
+
+def test_claim_leases_running_members_in_queue_order(queue_db):
+    con = work_queue.connect(queue_db)
+    work_queue.ensure_queue_indexes(con)
+    rows = work_queue.claim(con, "user-1", limit=4)
+
+    # priority DESC, then created_at
+    assert member_ids(rows) == ["cm-run-2", "cm-run-5", "cm-run-8", "cm-run-1"]
+    assert all(r["attempt_count"] == 1 for r in rows)
+    statuses = dict(con.execute("SELECT id, status FROM campaign_member WHERE campaign_id = 'camp-off'"))
+    assert set(statuses.values()) == {"pending"}
+
+
+def test_concurrent_senders_never_share_a_member(queue_db):
+    claimed = []
+    lock = threading.Lock()
+
+    def sender(worker):
+        con = work_queue.connect(queue_db)
+        while True:
+            rows = work_queue.claim(con, worker, limit=2)
+            if not rows:
+                break
+            with lock:
+                claimed.extend(member_ids(rows))
+        con.close()
+
+    threads = [threading.Thread(target=sender, args=(w,)) for w in ("user-1", "user-2")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(claimed) == sorted(f"cm-run-{i}" for i in range(10))
+
+
+def test_ack_and_fail_record_attempts_and_check_the_lease(queue_db):
+    con = work_queue.connect(queue_db)
+    first, second = work_queue.claim(con, "user-1", limit=2)
+
+    assert work_queue.ack(con, "user-2", first["id"], "Hi") is None  # not the lease holder
+    assert work_queue.ack(con, "user-1", first["id"], "Hi") is not None
+    assert work_queue.fail(con, "user-1", second["id"], "timeout") == "pending"
+    assert work_queue.fail(con, "user-1", second["id"], "timeout") is None  # lease already released
+
+    attempts = con.execute("SELECT campaign_member_id, status, message_body FROM message_attempt ORDER BY created_at").fetchall()
+    assert [tuple(a) for a in attempts] == [(first["id"], "sent", "Hi"), (second["id"], "failed", None)]
+    assert con.execute("SELECT status FROM campaign_member WHERE id = ?", (first["id"],)).fetchone()[0] == "completed"
+
+
+def test_heartbeat_extends_only_held_leases(queue_db):
+    con = work_queue.connect(queue_db)
+    rows = work_queue.claim(con, "user-1", limit=2)
+    assert sorted(work_queue.heartbeat(con, "user-1", member_ids(rows))) == sorted(member_ids(rows))
+    assert work_queue.heartbeat(con, "user-2", member_ids(rows)) == []
+
+
+def test_expired_leases_are_reclaimed_until_attempts_run_out(queue_db):
+    con = work_queue.connect(queue_db)
+    for attempt in range(1, 4):
+        rows = work_queue.claim(con, "user-1", limit=1, campaign_id="camp-run", max_attempts=3)
+        assert member_ids(rows) == ["cm-run-2"] and rows[0]["attempt_count"] == attempt
+        expire_leases(con)
+
+    assert work_queue.reclaim_expired(con, max_attempts=3) == (0, 1)
+    row = con.execute("SELECT status, last_error FROM campaign_member WHERE id = 'cm-run-2'").fetchone()
+    assert tuple(row) == ("failed", "lease expired")
+    assert member_ids(work_queue.claim(con, "user-1", limit=1, max_attempts=3)) == ["cm-run-5"]
+
+
+def test_pending_page_walks_the_queue_with_a_cursor(queue_db):
+    con = work_queue.connect(queue_db)
+    work_queue.ensure_queue_indexes(con)
+    seen, after = [], None
+    while True:
+        rows, cursor = work_queue.pending_page(con, limit=3, after=after)
+        seen.extend(r["campaign_member_id"] for r in rows)
+        if cursor is None:
+            break
+        after = work_queue.decode_cursor(cursor)
+
+    expected = sorted((f"cm-run-{i}" for i in range(10)), key=lambda m: (-(int(m[-1]) % 3), int(m[-1])))
+    assert seen == expected
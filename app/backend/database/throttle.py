@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+throttle.py — Send-budget enforcement for running campaigns (throttle_per_hour, daily_send_limit).
+
+ThrottleEngine keeps each running campaign's send times for the last hour and
+the last 24 hours in memory. They are seeded by one indexed range scan over
+recent 'sent' message_attempt rows (ix_mattempt_sent_at). After that,
+checking or recording a send is amortized O(1), with no COUNT(*) per attempt.
+Limits are rolling windows: at most throttle_per_hour sends in any 60
+minutes, and at most daily_send_limit in any 24 hours. NULL means unlimited.
+
+Members leased through the engine hold a reservation against their campaign's
+budget. The reservation ends when the member is acked (it becomes a send) or
+failed (it is released), or when the lease expires. So concurrent leases cannot
+overshoot. Slots are dealt round-robin across organizations, then across each
+organization's campaigns, so one large campaign or tenant cannot starve the
+rest.
+
+Every `refresh_seconds` the engine re-reads campaigns, send history and
+live leases from the DB. That picks up limit changes, and sends and leases
+made by other processes.
+
+Usage:
+  python3 throttle.py --db ./genreach.db status
+  python3 throttle.py --db ./genreach.db claim --worker user-1 --limit 10
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+
+import work_queue
+
+HOUR = 3600
+DAY = 86400
+DEFAULT_REFRESH_SECONDS = 60.0
+
+SENT_INDEX = """CREATE INDEX IF NOT EXISTS ix_mattempt_sent_at
+   ON message_attempt (sent_at, campaign_member_id)
+   WHERE status = 'sent'"""
+
+
+class CampaignBudget:
+    """Rolling send windows and live lease reservations for one campaign."""
+
+    __slots__ = ("campaign_id", "org_id", "per_hour", "per_day", "hour", "day", "reserved", "expiries")
+
+    def __init__(self, campaign_id, org_id, per_hour, per_day):
+        self.campaign_id = campaign_id
+        self.org_id = org_id
+        self.per_hour = per_hour
+        self.per_day = per_day
+        self.hour = deque()      # send times (epoch seconds) in the last hour, oldest first
+        self.day = deque()       # send times in the last 24 hours
+        self.reserved = {}       # member id -> lease expiry
+        self.expiries = deque()  # (expiry, member id), roughly in expiry order
+
+    def _prune(self, now):
+        while self.hour and self.hour[0] <= now - HOUR:
+            self.hour.popleft()
+        while self.day and self.day[0] <= now - DAY:
+            self.day.popleft()
+        while self.expiries and self.expiries[0][0] <= now:
+            expiry, member_id = self.expiries.popleft()
+            if self.reserved.get(member_id) == expiry:
+                del self.reserved[member_id]
+
+    def available(self, now):
+        """Sends that may start now; None when the campaign has no limits."""
+        self._prune(now)
+        caps = []
+        if self.per_hour is not None:
+            caps.append(self.per_hour - len(self.hour) - len(self.reserved))
+        if self.per_day is not None:
+            caps.append(self.per_day - len(self.day) - len(self.reserved))
+        return max(0, min(caps)) if caps else None
+
+    def next_slot_in(self, now):
+        """Seconds until available() can become positive (0 if it already is)."""
+        if self.available(now) != 0:
+            return 0.0
+        waits = []
+        if self.per_hour is not None and len(self.hour) + len(self.reserved) >= self.per_hour:
+            waits.append(self.hour[0] + HOUR - now if self.hour else 0.0)
+        if self.per_day is not None and len(self.day) + len(self.reserved) >= self.per_day:
+            waits.append(self.day[0] + DAY - now if self.day else 0.0)
+        wait = max(waits) if waits else 0.0
+        if wait <= 0 and self.expiries:
+            # Only leases are in the way
+            wait = self.expiries[0][0] - now
+        return max(0.0, wait)
+
+    def reserve(self, member_id, expiry):
+        self.reserved[member_id] = expiry
+        self.expiries.append((expiry, member_id))
+
+    def release(self, member_id):
+        self.reserved.pop(member_id, None)
+
+    def record(self, at):
+        self.hour.append(at)
+        self.day.append(at)
+
+
+class ThrottleEngine:
+    """Hands out send slots across running campaigns within their hourly and daily budgets."""
+
+    def __init__(self, con, refresh_seconds=DEFAULT_REFRESH_SECONDS, clock=time.time):
+        self.con = con
+        self.refresh_seconds = refresh_seconds
+        self.clock = clock
+        self.campaigns = {}
+        self.leases = {}  # member id -> campaign id, for leases taken through this engine
+        self._org_turn = 0
+        self._campaign_turn = {}
+        self._loaded_at = None
+        con.execute(SENT_INDEX)
+        con.commit()
+        work_queue.ensure_queue_indexes(con)
+        self.refresh()
+
+    def refresh(self):
+        """Reload running campaigns, the last 24 hours of sends and the live leases."""
+        now = self.clock()
+        budgets = {}
+        for r in self.con.execute("""
+            SELECT id, org_id, throttle_per_hour, daily_send_limit
+            FROM campaign WHERE status = 'running'
+            ORDER BY org_id, id
+        """):
+            budgets[r["id"]] = CampaignBudget(r["id"], r["org_id"], r["throttle_per_hour"], r["daily_send_limit"])
+
+        for r in self.con.execute("""
+            SELECT cm.campaign_id, CAST(strftime('%s', ma.sent_at) AS INTEGER) AS sent_ts
+            FROM message_attempt ma
+            JOIN campaign_member cm ON cm.id = ma.campaign_member_id
+            WHERE ma.status = 'sent' AND ma.sent_at > datetime(?, 'unixepoch')
+            ORDER BY ma.sent_at
+        """, (int(now - DAY),)):
+            budget = budgets.get(r["campaign_id"])
+            if budget is not None:
+                budget.record(r["sent_ts"])
+
+        # Leases from every sender count against the budget until acked, failed or expired
+        for r in self.con.execute("""
+            SELECT id, campaign_id, CAST(strftime('%s', locked_until) AS INTEGER) AS expiry_ts
+            FROM campaign_member
+            WHERE status = 'messaging' AND locked_until > datetime(?, 'unixepoch')
+            ORDER BY locked_until
+        """, (int(now),)):
+            budget = budgets.get(r["campaign_id"])
+            if budget is not None:
+                budget.reserve(r["id"], r["expiry_ts"])
+
+        self.campaigns = budgets
+        self._loaded_at = now
+
+    def _maybe_refresh(self):
+        if self._loaded_at is None or self.clock() - self._loaded_at >= self.refresh_seconds:
+            self.refresh()
+
+    def available(self, campaign_id):
+        """Sends `campaign_id` may start now (0 if not running, None if unlimited)."""
+        self._maybe_refresh()
+        budget = self.campaigns.get(campaign_id)
+        return 0 if budget is None else budget.available(self.clock())
+
+    def next_slot_in(self):
+        """Seconds until any running campaign has budget again (None if no campaign is running)."""
+        self._maybe_refresh()
+        now = self.clock()
+        waits = [b.next_slot_in(now) for b in self.campaigns.values()]
+        return min(waits) if waits else None
+
+    def allocate(self, slots, exclude=()):
+        """Split up to `slots` sends across campaigns with budget; returns {campaign_id: n}.
+
+        One slot at a time goes to each organization in turn, and within an
+        organization to each of its campaigns in turn. Both rotations carry
+        over between calls.
+        """
+        self._maybe_refresh()
+        now = self.clock()
+        by_org = {}
+        budget_left = {}
+        for cid, budget in self.campaigns.items():
+            if cid in exclude:
+                continue
+            left = budget.available(now)
+            if left == 0:
+                continue
+            budget_left[cid] = left
+            by_org.setdefault(budget.org_id, []).append(cid)
+
+        orgs = sorted(by_org)
+        if orgs:
+            start = self._org_turn % len(orgs)
+            orgs = orgs[start:] + orgs[:start]
+            self._org_turn += 1
+
+        grants = {}
+        while slots > 0 and orgs:
+            for org_id in list(orgs):
+                if slots == 0:
+                    break
+                campaigns = by_org[org_id]
+                turn = self._campaign_turn.get(org_id, 0)
+                cid = campaigns[turn % len(campaigns)]
+                self._campaign_turn[org_id] = turn + 1
+                grants[cid] = grants.get(cid, 0) + 1
+                slots -= 1
+                if budget_left[cid] is not None:
+                    budget_left[cid] -= 1
+                    if budget_left[cid] == 0:
+                        campaigns.remove(cid)
+                        if not campaigns:
+                            orgs.remove(org_id)
+        return grants
+
+    def claim(self, worker_id, limit=10, lease_seconds=work_queue.DEFAULT_LEASE_SECONDS,
+              max_attempts=work_queue.DEFAULT_MAX_ATTEMPTS):
+        """Lease up to `limit` members across campaigns without exceeding any campaign's budget."""
+        rows = []
+        drained = set()  # campaigns with nothing left to lease in this call
+        while len(rows) < limit:
+            grants = self.allocate(limit - len(rows), exclude=drained)
+            if not grants:
+                break
+            expiry = self.clock() + lease_seconds
+            for cid, n in grants.items():
+                got = work_queue.claim(self.con, worker_id, n, campaign_id=cid,
+                                       lease_seconds=lease_seconds, max_attempts=max_attempts)
+                if len(got) < n:
+                    drained.add(cid)
+                budget = self.campaigns.get(cid)
+                for r in got:
+                    self.leases[r["id"]] = cid
+                    if budget is not None:
+                        budget.reserve(r["id"], expiry)
+                rows.extend(got)
+        return rows
+
+    def ack(self, worker_id, member_id, message_body=None, thread_url=None, provider="linkedin"):
+        """work_queue.ack, counting the send against the member's campaign budget."""
+        attempt_id = work_queue.ack(self.con, worker_id, member_id, message_body, thread_url, provider)
+        budget = self.campaigns.get(self.leases.pop(member_id, None))
+        if budget is not None:
+            budget.release(member_id)
+            if attempt_id is not None:
+                budget.record(self.clock())
+        return attempt_id
+
+    def fail(self, worker_id, member_id, error_message, error_code=None, retry=True,
+             max_attempts=work_queue.DEFAULT_MAX_ATTEMPTS):
+        """work_queue.fail, returning the member's reserved slot to its campaign."""
+        status = work_queue.fail(self.con, worker_id, member_id, error_message, error_code, retry, max_attempts)
+        budget = self.campaigns.get(self.leases.pop(member_id, None))
+        if budget is not None:
+            budget.release(member_id)
+        return status
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Campaign send budgets (throttle_per_hour / daily_send_limit).")
+    ap.add_argument("--db", default=os.environ.get("GENREACH_DB_PATH", "genreach.db"), help="Path to SQLite DB file")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("status", help="Show each running campaign's budget")
+    p = sub.add_parser("claim", help="Lease members within campaign budgets")
+    p.add_argument("--worker", required=True, help="User id of the sender taking the lease")
+    p.add_argument("--limit", type=int, default=10)
+    p.add_argument("--lease-seconds", type=int, default=work_queue.DEFAULT_LEASE_SECONDS)
+    return ap.parse_args()
+
+
+def fmt_limit(value):
+    return "-" if value is None else str(value)
+
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.db):
+        print(f"[ERROR] DB not found: {args.db}")
+        sys.exit(1)
+
+    con = work_queue.connect(args.db)
+    try:
+        engine = ThrottleEngine(con)
+        if args.cmd == "status":
+            now = engine.clock()
+            print(f"Running campaigns: {len(engine.campaigns)}\n")
+            for b in engine.campaigns.values():
+                available = b.available(now)
+                print(f"  camp={b.campaign_id} • org={b.org_id} • hour {len(b.hour)}/{fmt_limit(b.per_hour)} "
+                      f"• day {len(b.day)}/{fmt_limit(b.per_day)} • leased {len(b.reserved)} "
+                      f"• available {fmt_limit(available)}")
+            wait = engine.next_slot_in()
+            if wait:
+                print(f"\nNext slot in {wait:.0f} s")
+        elif args.cmd == "claim":
+            rows = engine.claim(args.worker, args.limit, args.lease_seconds)
+            print(f"Claimed {len(rows)} members for {args.worker}\n")
+            for r in rows:
+                print(f"  cm={r['id']} • camp={r['campaign_id']} • prio={r['priority']} • until={r['locked_until']}")
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+    main()
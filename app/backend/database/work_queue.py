@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+work_queue.py — Lease-based work queue over campaign_member for the Sales.ai SQLite DB.
+
+Senders claim the next pending members of running campaigns with an atomic
+UPDATE ... RETURNING inside BEGIN IMMEDIATE, so concurrent senders (threads or
+processes) never receive the same member. A claim sets status='messaging',
+locked_by_user_id and locked_until. Holders extend the lease with heartbeats
+and finish with ack (sent) or fail (retry or give up). Both write a
+message_attempt row. Leases that expire are reclaimed by the next claim, or
+explicitly with reclaim_expired.
+
+Queue reads (claim, pending_page) walk the partial covering index
+ix_cmember_pending_queue in queue order instead of sorting every pending row;
+pending_page pages with a (priority, created_at, id) cursor rather than OFFSET.
+
+Usage:
+  python3 work_queue.py --db ./genreach.db claim --worker user-1 --limit 5
+  python3 work_queue.py --db ./genreach.db ack --worker user-1 --member cm-1 --body "Hi ..."
+  python3 work_queue.py --db ./genreach.db fail --worker user-1 --member cm-1 --error "timeout"
+  python3 work_queue.py --db ./genreach.db reclaim
+  python3 work_queue.py --db ./genreach.db pending --limit 50 --after '5|2025-01-01 10:00:00|cm-9'
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import uuid
+from contextlib import closing, contextmanager
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+
+QUEUE_INDEXES = [
+    # Pending members in queue order; carries the join keys (and status) so reads never touch the table
+    """CREATE INDEX IF NOT EXISTS ix_cmember_pending_queue
+       ON campaign_member (priority DESC, created_at, id, campaign_id, opportunity_id, status)
+       WHERE status = 'pending'""",
+    # The same order within one campaign, for per-campaign claims
+    """CREATE INDEX IF NOT EXISTS ix_cmember_pending_by_campaign
+       ON campaign_member (campaign_id, priority DESC, created_at, id)
+       WHERE status = 'pending'""",
+    # Leases in flight, by expiry, for reclaiming
+    """CREATE INDEX IF NOT EXISTS ix_cmember_lease_expiry
+       ON campaign_member (locked_until)
+       WHERE status = 'messaging'""",
+]
+
+# Members are driven from the queue index (CROSS JOIN fixes the join order); otherwise
+# the planner prefers scanning the few campaigns and sorting all their pending members.
+PENDING_SELECT = """
+    SELECT cm.id AS campaign_member_id,
+           o.full_name,
+           o.email,
+           o.li_profile_url,
+           c.name AS campaign_name,
+           cm.priority,
+           cm.status,
+           cm.created_at
+    FROM campaign_member cm
+    CROSS JOIN campaign c ON c.id = cm.campaign_id
+    JOIN opportunity o ON o.id = cm.opportunity_id
+    WHERE cm.status = 'pending' AND c.status = 'running' {cursor}
+    ORDER BY cm.priority DESC, cm.created_at, cm.id
+    LIMIT ?
+"""
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    con = sqlite3.connect(db_path, timeout=30.0)
+    con.row_factory = sqlite3.Row
+    with closing(con.cursor()) as cur:
+        cur.execute("PRAGMA foreign_keys = ON;")
+        cur.execute("PRAGMA journal_mode = WAL;")
+        cur.execute("PRAGMA synchronous = NORMAL;")
+    return con
+
+
+def ensure_queue_indexes(con: sqlite3.Connection):
+    """Create the queue indexes if missing (idempotent)."""
+    for ddl in QUEUE_INDEXES:
+        con.execute(ddl)
+    con.commit()
+
+
+def missing_queue_indexes(con: sqlite3.Connection):
+    """Names of the QUEUE_INDEXES the DB does not have yet (read-only)."""
+    have = {r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    names = [ddl.split()[5] for ddl in QUEUE_INDEXES]
+    return [name for name in names if name not in have]
+
+
+def encode_cursor(row) -> str:
+    """Cursor for the page after `row` (a pending_page row)."""
+    priority = "" if row["priority"] is None else str(row["priority"])
+    return f"{priority}|{row['created_at']}|{row['campaign_member_id']}"
+
+
+def decode_cursor(cursor: str):
+    priority, created_at, member_id = cursor.split("|", 2)
+    return (int(priority) if priority else None), created_at, member_id
+
+
+def _cursor_segments(after):
+    """Keyset predicates that together cover everything after `after`, in queue order.
+
+    Each one is a single range seek on ix_cmember_pending_queue: the rest of the
+    cursor's priority, then every lower priority, then NULL priority (sorted last).
+    """
+    if after is None:
+        return [("", ())]
+    priority, created_at, member_id = after
+    if priority is None:
+        return [("AND cm.priority IS NULL AND (cm.created_at, cm.id) > (?, ?)", (created_at, member_id))]
+    return [
+        ("AND cm.priority = ? AND (cm.created_at, cm.id) > (?, ?)", (priority, created_at, member_id)),
+        ("AND cm.priority < ?", (priority,)),
+        ("AND cm.priority IS NULL", ()),
+    ]
+
+
+def pending_page(con: sqlite3.Connection, limit: int = 50, after=None):
+    """One page of the pending queue of running campaigns, in send order.
+
+    `after` is the (priority, created_at, id) of the last row already seen
+    (see decode_cursor). Returns (rows, next_cursor); next_cursor is None on
+    the last page.
+    """
+    rows = []
+    for cursor, params in _cursor_segments(after):
+        remaining = int(limit) - len(rows)
+        if remaining <= 0:
+            break
+        rows.extend(con.execute(PENDING_SELECT.format(cursor=cursor), (*params, remaining)).fetchall())
+    next_cursor = encode_cursor(rows[-1]) if len(rows) == int(limit) else None
+    return rows, next_cursor
+
+
+@contextmanager
+def immediate(con: sqlite3.Connection):
+    """Run the block in a BEGIN IMMEDIATE transaction (write lock taken up front)."""
+    if con.in_transaction:
+        con.commit()
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        yield con
+    except BaseException:
+        con.rollback()
+        raise
+    con.commit()
+
+
+def _lease_expr(lease_seconds: int) -> str:
+    return f"datetime('now', '+{int(lease_seconds)} seconds')"
+
+
+def _claim_sql(by_campaign: bool, lease_seconds: int) -> str:
+    """The claim UPDATE; parameters are (worker_id, [campaign_id,] limit)."""
+    # One campaign: seek ix_cmember_pending_by_campaign; all: walk ix_cmember_pending_queue
+    join = "JOIN" if by_campaign else "CROSS JOIN"
+    campaign_filter = "AND cm.campaign_id = ?" if by_campaign else ""
+    return f"""
+    UPDATE campaign_member
+    SET status = 'messaging',
+        locked_by_user_id = ?,
+        locked_until = {_lease_expr(lease_seconds)},
+        attempt_count = COALESCE(attempt_count, 0) + 1,
+        last_attempt_at = datetime('now')
+    WHERE id IN (
+        SELECT cm.id
+        FROM campaign_member cm
+        {join} campaign c ON c.id = cm.campaign_id
+        WHERE cm.status = 'pending' AND c.status = 'running'
+          {campaign_filter}
+        ORDER BY cm.priority DESC, cm.created_at, cm.id
+        LIMIT ?
+    )
+    RETURNING id, org_id, campaign_id, opportunity_id, personalized_message,
+              priority, attempt_count, locked_until, created_at;
+    """
+
+
+def claim(con: sqlite3.Connection, worker_id: str, limit: int = 10, campaign_id: str = None,
+          lease_seconds: int = DEFAULT_LEASE_SECONDS, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+    """Lease up to `limit` members to `worker_id` (a user id); returns the claimed rows.
+
+    Expired leases are first released (see reclaim_expired), then pending
+    members of running campaigns are leased in priority order. Each claim
+    bumps attempt_count.
+    """
+    params = [worker_id]
+    if campaign_id:
+        params.append(campaign_id)
+    params.append(int(limit))
+    with immediate(con):
+        _release_expired(con, max_attempts)
+        rows = con.execute(_claim_sql(bool(campaign_id), lease_seconds), params).fetchall()
+    # RETURNING order is unspecified; hand work out in queue order
+    return sorted(rows, key=lambda r: (r["priority"] is None, -(r["priority"] or 0), r["created_at"] or "", r["id"]))
+
+
+def heartbeat(con: sqlite3.Connection, worker_id: str, member_ids, lease_seconds: int = DEFAULT_LEASE_SECONDS):
+    """Extend the lease on members still held by `worker_id`; returns the ids extended.
+
+    Ids missing from the result were reclaimed by another sender and must not be sent.
+    """
+    member_ids = list(member_ids)
+    if not member_ids:
+        return []
+    marks = ",".join("?" for _ in member_ids)
+    q = f"""
+    UPDATE campaign_member
+    SET locked_until = {_lease_expr(lease_seconds)}
+    WHERE id IN ({marks}) AND status = 'messaging' AND locked_by_user_id = ?
+    RETURNING id;
+    """
+    with immediate(con):
+        rows = con.execute(q, (*member_ids, worker_id)).fetchall()
+    return [r["id"] for r in rows]
+
+
+def _insert_attempt(con, org_id, member_id, attempt_no, status, provider="linkedin", message_body=None,
+                    thread_url=None, error_code=None, error_message=None):
+    attempt_id = f"ma-{uuid.uuid4().hex}"
+    con.execute("""
+        INSERT INTO message_attempt (id, org_id, campaign_member_id, attempt_no, status, provider,
+                                     message_body, thread_url, error_code, error_message, sent_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CASE WHEN ? = 'sent' THEN datetime('now') END)
+    """, (attempt_id, org_id, member_id, attempt_no or 1, status, provider, message_body, thread_url,
+          error_code, error_message, status))
+    return attempt_id
+
+
+def ack(con: sqlite3.Connection, worker_id: str, member_id: str, message_body: str = None,
+        thread_url: str = None, provider: str = "linkedin"):
+    """Mark a leased member as sent: status='completed' plus a 'sent' message_attempt.
+
+    Returns the attempt id, or None if `worker_id` no longer holds the lease.
+    """
+    with immediate(con):
+        row = con.execute("""
+            UPDATE campaign_member
+            SET status = 'completed',
+                personalized_message = COALESCE(?, personalized_message),
+                last_error = NULL,
+                locked_by_user_id = NULL,
+                locked_until = NULL
+            WHERE id = ? AND status = 'messaging' AND locked_by_user_id = ?
+            RETURNING org_id, attempt_count;
+        """, (message_body, member_id, worker_id)).fetchone()
+        if row is None:
+            return None
+        return _insert_attempt(con, row["org_id"], member_id, row["attempt_count"], "sent", provider,
+                               message_body, thread_url)
+
+
+def fail(con: sqlite3.Connection, worker_id: str, member_id: str, error_message: str, error_code: str = None,
+         retry: bool = True, max_attempts: int = DEFAULT_MAX_ATTEMPTS, message_body: str = None,
+         provider: str = "linkedin"):
+    """Record a failed send and release the lease.
+
+    The member goes back to 'pending' while `retry` is set and attempt_count <
+    `max_attempts`; otherwise it becomes 'failed'. Returns the new member
+    status, or None if `worker_id` no longer holds the lease.
+    """
+    with immediate(con):
+        row = con.execute("""
+            UPDATE campaign_member
+            SET status = CASE WHEN ? AND COALESCE(attempt_count, 0) < ? THEN 'pending' ELSE 'failed' END,
+                last_error = ?,
+                locked_by_user_id = NULL,
+                locked_until = NULL
+            WHERE id = ? AND status = 'messaging' AND locked_by_user_id = ?
+            RETURNING org_id, attempt_count, status;
+        """, (1 if retry else 0, int(max_attempts), error_message, member_id, worker_id)).fetchone()
+        if row is None:
+            return None
+        _insert_attempt(con, row["org_id"], member_id, row["attempt_count"], "failed", provider,
+                        message_body, error_code=error_code, error_message=error_message)
+        return row["status"]
+
+
+# Expired leases, found through ix_cmember_lease_expiry; the parameter is max_attempts
+RELEASE_EXPIRED = """
+    UPDATE campaign_member
+    SET status = CASE WHEN COALESCE(attempt_count, 0) < ? THEN 'pending' ELSE 'failed' END,
+        last_error = COALESCE(last_error, 'lease expired'),
+        locked_by_user_id = NULL,
+        locked_until = NULL
+    WHERE status = 'messaging' AND locked_until < datetime('now')
+    RETURNING status;
+"""
+
+
+def _release_expired(con: sqlite3.Connection, max_attempts: int):
+    return con.execute(RELEASE_EXPIRED, (int(max_attempts),)).fetchall()
+
+
+def reclaim_expired(con: sqlite3.Connection, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+    """Return members with expired leases to 'pending' ('failed' once out of attempts).
+
+    Returns (requeued, failed) counts. claim() does this before leasing; this
+    is for sweeping them eagerly, e.g. from a cron job.
+    """
+    with immediate(con):
+        rows = _release_expired(con, max_attempts)
+    failed = sum(1 for r in rows if r["status"] == "failed")
+    return len(rows) - failed, failed
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Lease-based campaign_member work queue.")
+    ap.add_argument("--db", default=os.environ.get("GENREACH_DB_PATH", "genreach.db"), help="Path to SQLite DB file")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("claim", help="Lease the next pending members")
+    p.add_argument("--worker", required=True, help="User id of the sender taking the lease")
+    p.add_argument("--limit", type=int, default=10)
+    p.add_argument("--campaign", default=None, help="Only claim from this campaign")
+    p.add_argument("--lease-seconds", type=int, default=DEFAULT_LEASE_SECONDS)
+    p.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS)
+
+    p = sub.add_parser("heartbeat", help="Extend leases")
+    p.add_argument("--worker", required=True)
+    p.add_argument("--member", action="append", required=True, help="campaign_member id (repeatable)")
+    p.add_argument("--lease-seconds", type=int, default=DEFAULT_LEASE_SECONDS)
+
+    p = sub.add_parser("ack", help="Mark a leased member as sent")
+    p.add_argument("--worker", required=True)
+    p.add_argument("--member", required=True)
+    p.add_argument("--body", default=None, help="Message that was sent")
+    p.add_argument("--thread-url", default=None)
+
+    p = sub.add_parser("fail", help="Record a failed send")
+    p.add_argument("--worker", required=True)
+    p.add_argument("--member", required=True)
+    p.add_argument("--error", required=True)
+    p.add_argument("--code", default=None)
+    p.add_argument("--no-retry", action="store_true", help="Mark failed even if attempts remain")
+    p.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS)
+
+    p = sub.add_parser("reclaim", help="Release expired leases")
+    p.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS)
+
+    p = sub.add_parser("pending", help="Page through the pending queue")
+    p.add_argument("--limit", type=int, default=50)
+    p.add_argument("--after", default=None, help="Cursor printed by the previous page")
+    return ap.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.db):
+        print(f"[ERROR] DB not found: {args.db}")
+        sys.exit(1)
+
+    con = connect(args.db)
+    try:
+        ensure_queue_indexes(con)
+        if args.cmd == "claim":
+            rows = claim(con, args.worker, args.limit, args.campaign, args.lease_seconds, args.max_attempts)
+            print(f"Claimed {len(rows)} members for {args.worker}\n")
+            for r in rows:
+                print(f"  cm={r['id']} • camp={r['campaign_id']} • opp={r['opportunity_id']} • prio={r['priority']} "
+                      f"• attempt={r['attempt_count']} • until={r['locked_until']}")
+        elif args.cmd == "heartbeat":
+            held = heartbeat(con, args.worker, args.member, args.lease_seconds)
+            lost = sorted(set(args.member) - set(held))
+            print(f"Extended {len(held)} leases" + (f"; lost: {', '.join(lost)}" if lost else ""))
+        elif args.cmd == "ack":
+            attempt_id = ack(con, args.worker, args.member, args.body, args.thread_url)
+            if attempt_id is None:
+                print(f"[ERROR] {args.worker} does not hold a lease on {args.member}")
+                sys.exit(1)
+            print(f"Acked {args.member} (attempt {attempt_id})")
+        elif args.cmd == "fail":
+            status = fail(con, args.worker, args.member, args.error, args.code,
+                          retry=not args.no_retry, max_attempts=args.max_attempts)
+            if status is None:
+                print(f"[ERROR] {args.worker} does not hold a lease on {args.member}")
+                sys.exit(1)
+            print(f"Recorded failure for {args.member}; status is now {status}")
+        elif args.cmd == "reclaim":
+            requeued, failed = reclaim_expired(con, args.max_attempts)
+            print(f"Reclaimed expired leases: {requeued} requeued, {failed} failed")
+        elif args.cmd == "pending":
+            after = decode_cursor(args.after) if args.after else None
+            rows, next_cursor = pending_page(con, args.limit, after)
+            print(f"Pending queue page: {len(rows)} rows\n")
+            for r in rows:
+                print(f"  cm={r['campaign_member_id']} • {r['full_name']} • camp={r['campaign_name']} "
+                      f"• prio={r['priority']} • created={r['created_at']}")
+            if next_cursor:
+                print(f"\nNext page: --after '{next_cursor}'")
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+    main()
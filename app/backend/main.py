@@ -1,20 +1,61 @@
+import asyncio
+import json
+import logging
 import os
-from fastapi import FastAPI, Depends, HTTPException, status
+from contextlib import asynccontextmanager
+import httpx
+from fastapi import FastAPI, Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from datetime import timedelta
 from dotenv import load_dotenv
 
-from database import get_db, User
-from auth import authenticate_user, create_access_token, get_current_user, get_password_hash
+from database import User, run_in_session, shutdown_db
+from auth import authenticate_user_async, create_access_token, get_current_user
 from google_auth import google_oauth, google_auth_callback
-from models.profile import GenerateRequest, GenerateResponse
-from services.openrouter import generate_message
+from models.profile import BatchGenerateRequest, GenerateRequest, GenerateResponse
+from services.cache import ResponseCache, cache_key, create_cache
+from services.compaction import CompactProfile, compact_profile
+from services.metrics import render_prometheus
+from services.passwords import password_hasher
+from services.timing import TimingMiddleware, span
+from services.openrouter import (
+    MODELS,
+    OPENROUTER_UPSTREAMS,
+    TEMPERATURE,
+    create_client,
+    generate_message,
+    stream_message,
+)
 
 load_dotenv()
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_ITEM_TIMEOUT = float(os.getenv("BATCH_ITEM_TIMEOUT", "45"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled OpenRouter client for the life of the process
+    app.state.http_client = create_client()
+    app.state.generate_cache = create_cache()
+    try:
+        yield
+    finally:
+        await app.state.http_client.aclose()
+        password_hasher.shutdown()
+        shutdown_db()
+
+app = FastAPI(lifespan=lifespan)
+
+def get_http_client(request: Request) -> httpx.AsyncClient:
+    return request.app.state.http_client
+
+def get_generate_cache(request: Request) -> ResponseCache:
+    return request.app.state.generate_cache
 
 # Add CORS middleware
 app.add_middleware(
@@ -23,32 +64,64 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Cache", "Server-Timing", "X-Profile-Tokens-Before", "X-Profile-Tokens-After"],
 )
+# Outermost, so its timings include CORS handling
+app.add_middleware(TimingMiddleware)
 
 @app.get("/health")
 async def health():
     return {"ok": True}
 
+@app.get("/health/upstream")
+async def upstream_health():
+    # Circuit breaker, adaptive concurrency limit and any Retry-After hold for each OpenRouter model
+    return {"openrouter": {model: upstream.state() for model, upstream in OPENROUTER_UPSTREAMS.items()}}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+def _registration_conflict(db, username: str, email: str):
+    if db.query(User.id).filter(User.username == username).first():
+        return "Username already registered"
+    if db.query(User.id).filter(User.email == email).first():
+        return "Email already registered"
+    return None
+
+def _create_user(db, username: str, email: str, hashed_password: str):
+    # Re-checked in the same unit of work as the insert
+    conflict = _registration_conflict(db, username, email)
+    if conflict:
+        return conflict
+    db.add(User(username=username, email=email, hashed_password=hashed_password))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent registration
+        db.rollback()
+        return "Username or email already registered"
+    return None
+
 @app.post("/register")
-async def register(username: str, email: str, password: str, db: Session = Depends(get_db)):
+async def register(username: str, email: str, password: str):
     # Check if user already exists
-    if db.query(User).filter(User.username == username).first():
-        raise HTTPException(status_code=400, detail="Username already registered")
-    if db.query(User).filter(User.email == email).first():
-        raise HTTPException(status_code=400, detail="Email already registered")
-    
+    conflict = await run_in_session(lambda db: _registration_conflict(db, username, email))
+    if conflict:
+        raise HTTPException(status_code=400, detail=conflict)
+
     # Create new user
-    hashed_password = get_password_hash(password)
-    user = User(username=username, email=email, hashed_password=hashed_password)
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    
+    hashed_password = await password_hasher.hash(password)
+    conflict = await run_in_session(lambda db: _create_user(db, username, email, hashed_password))
+    if conflict:
+        raise HTTPException(status_code=400, detail=conflict)
+
     return {"message": "User created successfully"}
 
 @app.post("/token")
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+    user = await authenticate_user_async(form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -73,15 +146,124 @@ async def google_callback(token: str = Depends(google_auth_callback)):
 async def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
 
+def _compact(req: GenerateRequest) -> CompactProfile:
+    # Compact before the cache key so the same trimmed profile shares an entry
+    with span("compact_profile"):
+        return compact_profile(req.intent, req.profileInfo.model_dump(), req.extendedProfile.model_dump())
+
+def _token_headers(response: Response, compact: CompactProfile) -> None:
+    response.headers["X-Profile-Tokens-Before"] = str(compact.tokens_before)
+    response.headers["X-Profile-Tokens-After"] = str(compact.tokens_after)
+
 @app.post("/api/generate", response_model=GenerateResponse)
-async def generate(req: GenerateRequest):
-    message = await generate_message(
-        req.intent,
-        req.profileInfo.dict(),
-        req.extendedProfile.dict(),
+async def generate(
+    req: GenerateRequest,
+    response: Response,
+    client: httpx.AsyncClient = Depends(get_http_client),
+    cache: ResponseCache = Depends(get_generate_cache),
+):
+    compact = _compact(req)
+    profile_info, extended_profile = compact.profile_info, compact.extended_profile
+    key = cache_key(req.intent, profile_info, extended_profile, MODELS, TEMPERATURE)
+    message, cache_status = await cache.get_or_generate(
+        key,
+        lambda: generate_message(req.intent, profile_info, extended_profile, client=client),
+        bypass=req.bypass_cache,
     )
+    response.headers["X-Cache"] = cache_status
+    _token_headers(response, compact)
     return GenerateResponse(message=message)
 
+@app.post("/api/generate/batch")
+async def generate_batch(
+    req: BatchGenerateRequest,
+    client: httpx.AsyncClient = Depends(get_http_client),
+    cache: ResponseCache = Depends(get_generate_cache),
+):
+    """
+    Generate messages for many profiles concurrently. Results are streamed as
+    NDJSON in completion order; each line carries the item's index in the request
+    and its profile's estimated token count before and after compaction.
+    """
+    sem = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run_item(index: int, item: GenerateRequest) -> dict:
+        compact = _compact(item)
+        profile_info, extended_profile = compact.profile_info, compact.extended_profile
+        tokens = {"before": compact.tokens_before, "after": compact.tokens_after}
+        key = cache_key(item.intent, profile_info, extended_profile, MODELS, TEMPERATURE)
+        async with sem:
+            try:
+                message, cache_status = await asyncio.wait_for(
+                    cache.get_or_generate(
+                        key,
+                        lambda: generate_message(item.intent, profile_info, extended_profile, client=client),
+                        bypass=item.bypass_cache,
+                    ),
+                    timeout=BATCH_ITEM_TIMEOUT,
+                )
+            except asyncio.TimeoutError:
+                return {"index": index, "status": "error", "code": 504, "error": "Timed out waiting for model", "tokens": tokens}
+            except HTTPException as e:
+                return {"index": index, "status": "error", "code": e.status_code, "error": e.detail, "tokens": tokens}
+            except httpx.HTTPError as e:
+                return {"index": index, "status": "error", "code": 502, "error": f"OpenRouter request failed: {e}", "tokens": tokens}
+            except Exception as e:
+                # One bad item (e.g. a malformed upstream body) must not end the whole stream
+                logger.exception("batch item %d failed", index)
+                return {"index": index, "status": "error", "code": 500, "error": f"Internal error: {type(e).__name__}", "tokens": tokens}
+        return {"index": index, "status": "ok", "message": message, "cache": cache_status, "tokens": tokens}
+
+    async def body():
+        tasks = [asyncio.ensure_future(run_item(i, item)) for i, item in enumerate(req.items)]
+        try:
+            for done in asyncio.as_completed(tasks):
+                yield json.dumps(await done) + "\n"
+        finally:
+            # Client went away: stop spending upstream calls on the rest
+            for t in tasks:
+                t.cancel()
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/api/generate/stream")
+async def generate_stream(req: GenerateRequest, client: httpx.AsyncClient = Depends(get_http_client)):
+    compact = _compact(req)
+    tokens = {"before": compact.tokens_before, "after": compact.tokens_after}
+    events = stream_message(req.intent, compact.profile_info, compact.extended_profile, client)
+    # Pull the first event eagerly so upstream errors surface as a normal HTTP error
+    first = await events.__anext__()
+
+    async def body():
+        event = first
+        try:
+            while True:
+                if "message" in event:
+                    yield _sse("done", {**event, "tokens": tokens})
+                    break
+                yield _sse("delta", event)
+                event = await events.__anext__()
+        except HTTPException as e:
+            yield _sse("error", {"status": e.status_code, "detail": e.detail})
+        except httpx.HTTPError as e:
+            yield _sse("error", {"status": 502, "detail": f"OpenRouter stream failed: {e}"})
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "X-Profile-Tokens-Before": str(compact.tokens_before),
+            "X-Profile-Tokens-After": str(compact.tokens_after),
+        },
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", "8000")))
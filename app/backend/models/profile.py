@@ -1,41 +1,54 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 
+# Request-size limits: generous for real LinkedIn scrapes, but a runaway
+# payload is rejected with a 422 before it reaches compaction or the model.
+# services/compaction.py then trims what is accepted to PROFILE_TOKEN_BUDGET.
+SHORT_TEXT = 300
+LONG_TEXT = 5000
+
 class ProfileInfo(BaseModel):
-    name: Optional[str] = None
-    title: Optional[str] = None
-    company: Optional[str] = None
+    name: Optional[str] = Field(None, max_length=SHORT_TEXT)
+    title: Optional[str] = Field(None, max_length=SHORT_TEXT)
+    company: Optional[str] = Field(None, max_length=SHORT_TEXT)
 
 class ExperienceItem(BaseModel):
-    title: Optional[str] = None
-    company: Optional[str] = None
-    dateRange: Optional[str] = None
-    location: Optional[str] = None
-    description: Optional[str] = None
+    title: Optional[str] = Field(None, max_length=SHORT_TEXT)
+    company: Optional[str] = Field(None, max_length=SHORT_TEXT)
+    dateRange: Optional[str] = Field(None, max_length=SHORT_TEXT)
+    location: Optional[str] = Field(None, max_length=SHORT_TEXT)
+    description: Optional[str] = Field(None, max_length=LONG_TEXT)
 
 class EducationItem(BaseModel):
-    school: Optional[str] = None
-    degree: Optional[str] = None
-    fieldOfStudy: Optional[str] = None
-    dateRange: Optional[str] = None
+    school: Optional[str] = Field(None, max_length=SHORT_TEXT)
+    degree: Optional[str] = Field(None, max_length=SHORT_TEXT)
+    fieldOfStudy: Optional[str] = Field(None, max_length=SHORT_TEXT)
+    dateRange: Optional[str] = Field(None, max_length=SHORT_TEXT)
 
 class AwardItem(BaseModel):
-    name: Optional[str] = None
-    issuer: Optional[str] = None
-    date: Optional[str] = None
-    description: Optional[str] = None
+    name: Optional[str] = Field(None, max_length=SHORT_TEXT)
+    issuer: Optional[str] = Field(None, max_length=SHORT_TEXT)
+    date: Optional[str] = Field(None, max_length=SHORT_TEXT)
+    description: Optional[str] = Field(None, max_length=LONG_TEXT)
+
+class PostItem(BaseModel):
+    text: Optional[str] = Field(None, max_length=LONG_TEXT)
 
 class ExtendedProfile(BaseModel):
-    about: Optional[str] = None
-    experiences: Optional[List[ExperienceItem]] = None
-    education: Optional[List[EducationItem]] = None
-    awards: Optional[List[AwardItem]] = None
-    recentPosts: Optional[List[dict]] = None
+    about: Optional[str] = Field(None, max_length=LONG_TEXT)
+    experiences: Optional[List[ExperienceItem]] = Field(None, max_length=50)
+    education: Optional[List[EducationItem]] = Field(None, max_length=20)
+    awards: Optional[List[AwardItem]] = Field(None, max_length=50)
+    recentPosts: Optional[List[PostItem]] = Field(None, max_length=20)
 
 class GenerateRequest(BaseModel):
-    intent: Optional[str] = None
+    intent: Optional[str] = Field(None, max_length=1000)
     profileInfo: ProfileInfo
     extendedProfile: ExtendedProfile
+    bypass_cache: bool = False  # force a fresh variant instead of a cached message
 
 class GenerateResponse(BaseModel):
     message: str
+
+class BatchGenerateRequest(BaseModel):
+    items: List[GenerateRequest] = Field(..., min_length=1, max_length=200)
@@ -1,70 +1,198 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import json
 import os
-from typing import Any, Dict
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
 
 from dotenv import load_dotenv
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 
+from jobs import JobContext, JobRunner, JobStore
 from leadfinder import main as leadfinder_main
 from outreach_messages import main as outreach_main
 
+_file_locks: Dict[str, threading.Lock] = {}
+_file_locks_guard = threading.Lock()
+
+
+def file_lock(path: str) -> threading.Lock:
+    """One lock per output file, so two jobs never rewrite the same CSV at once."""
+    key = os.path.realpath(path)
+    with _file_locks_guard:
+        return _file_locks.setdefault(key, threading.Lock())
+
+
+def search_argv(data: Dict[str, Any]) -> List[str]:
+    argv = [
+        "--query", data.get("query", ""),
+        "--engine", data.get("engine", "google"),
+        "--limit", str(int(data.get("limit", 25))),
+        "--out", data.get("out", "leads.csv"),
+    ]
+    if bool(data.get("write_messages", False)):
+        argv.append("--write-messages")
+    if bool(data.get("no_cache", False)):
+        argv.append("--no-cache")
+    return argv
+
+
+def positive_int(data: Dict[str, Any], key: str, default: int) -> str:
+    value = int(data.get(key, default))
+    if value < 1:
+        raise ValueError(f"{key} must be at least 1")
+    return str(value)
+
+
+def outreach_argv(data: Dict[str, Any]) -> List[str]:
+    if data.get("db"):
+        if data.get("csv"):
+            raise ValueError("pass either csv or db, not both")
+        argv = ["--db", data["db"]]
+        if data.get("org_id"):
+            argv += ["--org-id", str(data["org_id"])]
+    elif data.get("org_id"):
+        raise ValueError("org_id needs db")
+    else:
+        argv = ["--csv", data.get("csv", "leads.csv")]
+    argv += [
+        "--model", data.get("model", "gemini-1.5-flash"),
+        "--max-chars", str(int(data.get("max_chars", 300))),
+        "--sleep", str(float(data.get("sleep", 0.75))),
+        "--concurrency", positive_int(data, "concurrency", 4),
+        "--chunksize", positive_int(data, "chunksize", 1000),
+    ]
+    for key in ("rpm", "tpm"):
+        if data.get(key) is not None:
+            budget = float(data[key])
+            if budget < 0:
+                raise ValueError(f"{key} must not be negative")
+            argv += [f"--{key}", str(budget)]
+    if data.get("services"):
+        argv += ["--services", data["services"]]
+    if bool(data.get("overwrite", False)):
+        argv.append("--overwrite")
+    if data.get("goal"):
+        argv += ["--goal", data["goal"]]
+    return argv
+
+
+def run_search(ctx: JobContext) -> Any:
+    with file_lock(ctx.params.get("out", "leads.csv")):
+        return leadfinder_main(search_argv(ctx.params), should_stop=ctx.cancelled, on_progress=ctx.report)
+
+
+def run_outreach(ctx: JobContext) -> Any:
+    with file_lock(ctx.params.get("db") or ctx.params.get("csv", "leads.csv")):
+        return outreach_main(outreach_argv(ctx.params), should_stop=ctx.cancelled, on_progress=ctx.report)
+
+
+JOB_ARGV = {"search": search_argv, "outreach": outreach_argv}
+
+# Idle SSE streams get a heartbeat this often, carrying seconds since the job's last event
+SSE_HEARTBEAT_SECONDS = 5.0
+
+
+def sse(event: str, data: Dict[str, Any], event_id: str = "") -> str:
+    head = f"id: {event_id}\n" if event_id else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def job_event_stream(runner: JobRunner, job_id: str, last_event_id: Optional[str] = None) -> Iterator[str]:
+    """SSE body for one job: its current state, then live events until it finishes.
+
+    `last_event_id` is the client's Last-Event-ID; ids that are malformed or
+    from another channel are ignored (see EventChannel.resume_after).
+    """
+    # Channel first: if the job finishes in between, the snapshot below is already final
+    channel = runner.events(job_id)
+    yield "retry: 2000\n\n"
+    yield sse("job", runner.get(job_id))
+    last_id = channel.resume_after(last_event_id) if channel is not None else 0
+    while channel is not None:
+        events, closed = channel.since(last_id, timeout=SSE_HEARTBEAT_SECONDS)
+        for seq, kind, data in events:
+            yield sse(kind, data, channel.event_id(seq))
+            last_id = seq
+        if closed:
+            break
+        if not events:
+            # Lets a client tell a stalled run from a dead connection
+            yield sse("heartbeat", {"idle_s": round(time.monotonic() - channel.last_event_at, 1)})
+    if channel is not None:
+        yield sse("job", runner.get(job_id))
+
 
 def create_app() -> Flask:
     load_dotenv()
     app = Flask(__name__)
 
+    runner = JobRunner(
+        JobStore(os.getenv("JOBS_DB_PATH", "jobs.sqlite")),
+        {"search": run_search, "outreach": run_outreach},
+        workers=int(os.getenv("JOB_WORKERS", "2")),
+        max_queued=int(os.getenv("JOB_MAX_QUEUED", "100")),
+        lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "60")),
+        max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+    )
+    runner.start()
+    app.extensions["job_runner"] = runner
+
+    def submit(kind: str) -> Any:
+        data: Dict[str, Any] = request.get_json(force=True) or {}
+        try:
+            JOB_ARGV[kind](data)  # reject bad parameters now rather than in the worker
+        except (TypeError, ValueError) as e:
+            return jsonify({"ok": False, "error": f"Invalid parameters: {e}"}), 400
+        try:
+            job_id = runner.submit(kind, data)
+        except OverflowError as e:
+            return jsonify({"ok": False, "error": str(e)}), 429
+        return jsonify({"ok": True, "job_id": job_id, "status": "queued", "url": f"/jobs/{job_id}"}), 202
+
     @app.route("/health", methods=["GET"])
     def health() -> Any:
         return jsonify({"status": "ok"})
 
     @app.route("/search", methods=["POST"])
     def search() -> Any:
-        data: Dict[str, Any] = request.get_json(force=True) or {}
-        query = data.get("query", "")
-        engine = data.get("engine", "google")
-        limit = int(data.get("limit", 25))
-        out = data.get("out", "leads.csv")
-        write_messages = bool(data.get("write_messages", False))
-
-        argv = [
-            "--query", query,
-            "--engine", engine,
-            "--limit", str(limit),
-            "--out", out,
-        ]
-        if write_messages:
-            argv.append("--write-messages")
-        leadfinder_main(argv)
-        return jsonify({"ok": True, "out": out})
+        return submit("search")
 
     @app.route("/outreach", methods=["POST"])
     def outreach() -> Any:
-        data: Dict[str, Any] = request.get_json(force=True) or {}
-        csv_path = data.get("csv", "leads.csv")
-        services = data.get("services")
-        overwrite = bool(data.get("overwrite", False))
-        model = data.get("model", "gemini-1.5-flash")
-        max_chars = int(data.get("max_chars", 300))
-        sleep_s = float(data.get("sleep", 0.75))
-        goal = data.get("goal", "")
-
-        argv = [
-            "--csv", csv_path,
-            "--model", model,
-            "--max-chars", str(max_chars),
-            "--sleep", str(sleep_s),
-        ]
-        if services:
-            argv += ["--services", services]
-        if overwrite:
-            argv.append("--overwrite")
-        if goal:
-            argv += ["--goal", goal]
-
-        outreach_main(argv)
-        return jsonify({"ok": True, "csv": csv_path})
+        return submit("outreach")
+
+    @app.route("/jobs", methods=["GET"])
+    def list_jobs() -> Any:
+        limit = min(500, int(request.args.get("limit", 50)))
+        return jsonify({"jobs": runner.store.list(limit, request.args.get("status"))})
+
+    @app.route("/jobs/<job_id>", methods=["GET"])
+    def get_job(job_id: str) -> Any:
+        job = runner.get(job_id)
+        if job is None:
+            return jsonify({"ok": False, "error": "Job not found"}), 404
+        return jsonify(job)
+
+    @app.route("/jobs/<job_id>/events", methods=["GET"])
+    def job_events(job_id: str) -> Any:
+        if runner.store.get(job_id) is None:
+            return jsonify({"ok": False, "error": "Job not found"}), 404
+        return Response(
+            job_event_stream(runner, job_id, request.headers.get("Last-Event-ID")),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.route("/jobs/<job_id>/cancel", methods=["POST"])
+    @app.route("/jobs/<job_id>", methods=["DELETE"])
+    def cancel_job(job_id: str) -> Any:
+        status = runner.cancel(job_id)
+        if status is None:
+            return jsonify({"ok": False, "error": "Job not found"}), 404
+        return jsonify({"ok": True, "job_id": job_id, "status": status})
 
     return app
 
@@ -72,5 +200,3 @@ def create_app() -> Flask:
 if __name__ == "__main__":
     app = create_app()
     app.run(host="0.0.0.0", port=int(os.getenv("PORT", "8000")), debug=False)
-
-
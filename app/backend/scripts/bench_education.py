@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Benchmark the single-pass education extractor against the original seven-pass version.
+
+Generates synthetic search snippets, checks that both implementations return
+identical output for every one, and reports the speedup.
+
+Usage:
+  python bench_education.py --snippets 300000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+from typing import List, Set
+
+from education import extract_education, extract_education_batch
+
+
+def legacy_extract_education(text: str) -> str:
+    """The original implementation, kept here as the reference for equivalence checks."""
+    if not text:
+        return ""
+    hay = " ".join(str(text).split())
+    patterns = [
+        r"([A-Z][A-Za-z.&'\- ]+ University)\b",
+        r"([A-Z][A-Za-z.&'\- ]+ College)\b",
+        r"([A-Z][A-Za-z.&'\- ]+ Institute of Technology)\b",
+        r"(Massachusetts Institute of Technology|MIT)\b",
+        r"(California Institute of Technology|Caltech)\b",
+        r"([A-Z][A-Za-z.&'\- ]+ School of [A-Z][A-Za-z.&'\- ]+)\b",
+        r"([A-Z][A-Za-z.&'\- ]+ Business School)\b",
+    ]
+    found: Set[str] = set()
+    for pat in patterns:
+        for m in re.findall(pat, hay):
+            inst = m if isinstance(m, str) else m[0]
+            inst = inst.strip()
+            if inst:
+                found.add(inst)
+    if not found:
+        return ""
+    return "; ".join(sorted(found))
+
+
+FRAGMENTS = [
+    "Product Manager", "Fintech", "AI/ML", "Lending", "Payments", "New York, New York, United States",
+    "500+ connections", "Experience: LSEG (London Stock Exchange Group)", "Location: San Francisco",
+    "Education: Washington University in St. Louis - Olin Business School", "University at Buffalo",
+    "Stanford University", "Boston College", "Georgia Institute of Technology", "MIT", "SUMMIT Partners",
+    "Caltech", "California Institute of Technology", "Harvard Business School", "London School of Economics",
+    "Columbia University2", "Dartmouth College's", "Senior Director Of Strategy And Operations",
+    "Massachusetts Institute of Technology", "Helping founders scale", "Ex-Goldman Sachs", "CFA Level III",
+    "Wharton School of the University of Pennsylvania", "O'Neill School of Public Affairs", "B.S. & M.S.",
+]
+SEPARATORS = [" · ", " | ", ". ", ", ", " - ", " ", " (", ") ", "\n", " ... "]
+
+
+def synthetic_snippets(n: int, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        parts = []
+        for _ in range(rng.randint(2, 9)):
+            parts.append(rng.choice(FRAGMENTS))
+            parts.append(rng.choice(SEPARATORS))
+        out.append("".join(parts))
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Education extractor benchmark")
+    parser.add_argument("--snippets", type=int, default=300000)
+    args = parser.parse_args()
+
+    texts = synthetic_snippets(args.snippets)
+
+    t0 = time.perf_counter()
+    expected = [legacy_extract_education(t) for t in texts]
+    legacy_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    single = [extract_education(t) for t in texts]
+    single_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batch = extract_education_batch(texts)
+    batch_s = time.perf_counter() - t0
+
+    mismatches = sum(1 for a, b in zip(expected, single) if a != b)
+    mismatches += sum(1 for a, b in zip(expected, batch) if a != b)
+    print(f"{args.snippets} synthetic snippets")
+    print(f"  seven-pass (original)  : {legacy_s:7.2f} s")
+    print(f"  single-pass            : {single_s:7.2f} s  ({legacy_s / single_s:.1f}x)")
+    print(f"  batch API              : {batch_s:7.2f} s  ({legacy_s / batch_s:.1f}x)")
+    print(f"  output mismatches      : {mismatches}")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
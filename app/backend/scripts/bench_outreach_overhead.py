@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Micro-benchmark of per-row overhead in outreach generation with the Gemini call stubbed out.
+
+Compares the old per-row path (construct a GenerativeModel and rebuild the
+whole prompt for every lead) against a shared GenerationContext.
+
+Usage:
+  python bench_outreach_overhead.py --rows 20000
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from types import SimpleNamespace
+from typing import Dict, List
+
+import google.generativeai as genai
+
+import outreach_messages as om
+
+STUB_RESPONSE = SimpleNamespace(text="Hi Sam, your fintech work stood out. Open to a quick 10 min chat next week?")
+
+
+def stub_generate_content(self, prompt, *args, **kwargs):
+    return STUB_RESPONSE
+
+
+def synthetic_fields(n: int) -> List[Dict[str, str]]:
+    return [
+        {
+            "name": f"Lead {i}",
+            "title": "Product Manager | Fintech | Payments",
+            "location": "New York, NY",
+            "company": f"Company {i % 97}",
+            "url": f"https://www.linkedin.com/in/lead-{i}",
+            "snippet": "Building lending infrastructure. Previously at a Series B startup.",
+            "education": "New York University",
+        }
+        for i in range(n)
+    ]
+
+
+def per_row_model(fields: Dict[str, str], services: str, max_chars: int, model_name: str, goal: str) -> str:
+    """The pre-context implementation: new model + full prompt build for every row."""
+    prompt = om.build_prompt(fields, services, max_chars, goal=goal)
+    model = genai.GenerativeModel(model_name=model_name)
+    response = model.generate_content(prompt)
+    return om.trim_message(response.text.strip(), max_chars)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-row overhead of outreach generation (network stubbed)")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--model", default="gemini-1.5-flash")
+    args = parser.parse_args()
+
+    genai.GenerativeModel.generate_content = stub_generate_content
+    rows = synthetic_fields(args.rows)
+    services = "Comprehensive financial planning, investment management, and tax-efficient strategies."
+    goal = "Book intro calls with fintech product leaders"
+
+    t0 = time.perf_counter()
+    for fields in rows:
+        per_row_model(fields, services, 300, args.model, goal)
+    before = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    ctx = om.GenerationContext(services=services, max_chars=300, model_name=args.model, goal=goal)
+    for fields in rows:
+        om.generate_outreach_message(fields, ctx)
+    after = time.perf_counter() - t0
+
+    print(f"{args.rows} rows, Gemini call stubbed")
+    print(f"  model + prompt per row : {before / args.rows * 1e6:8.1f} us/row")
+    print(f"  shared context         : {after / args.rows * 1e6:8.1f} us/row")
+    print(f"  speedup                : {before / after:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Education/institution extraction from search result titles and snippets.
+
+Produces exactly the same output as the original seven-pass regex heuristic,
+but faster:
+
+- The patterns are compiled once, and each runs only when its keyword
+  (" University", " College", "MIT", ...) is present. Most snippets mention
+  no institution and are rejected after a few substring checks.
+- A match can only span institution-name characters ``[A-Za-z.&'\\- ]`` and
+  must end at a keyword. So each pattern is searched only from the start of
+  the name span holding a keyword up to that span's last keyword (plus one
+  character of context for the trailing ``\\b``). The greedy prefixes
+  never backtrack over unrelated text.
+"""
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_NAME_CHARS = r"[A-Za-z.&'\- ]"
+_NAME_BYTES = frozenset(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz.&'- ")
+# Maps every byte to b"a" (name character) or b"|" (span boundary)
+_SPAN_MASK = bytes(ord("a") if b in _NAME_BYTES else ord("|") for b in range(256))
+
+
+class _Pattern:
+    def __init__(self, keyword: str, regex: str, to_span_end: bool = False) -> None:
+        self.keyword = keyword
+        self.regex = re.compile(regex)
+        # The trailing [A-Z][...]+ of "School of" patterns runs to the end of the span
+        self.to_span_end = to_span_end
+
+
+# Patterns whose matches end at a keyword inside a name span, in the original order
+_SPAN_PATTERNS: List[_Pattern] = [
+    _Pattern(" University", rf"([A-Z]{_NAME_CHARS}+ University)\b"),
+    _Pattern(" College", rf"([A-Z]{_NAME_CHARS}+ College)\b"),
+    _Pattern(" Institute of Technology", rf"([A-Z]{_NAME_CHARS}+ Institute of Technology)\b"),
+    _Pattern(" School of ", rf"([A-Z]{_NAME_CHARS}+ School of [A-Z]{_NAME_CHARS}+)\b", to_span_end=True),
+    _Pattern(" Business School", rf"([A-Z]{_NAME_CHARS}+ Business School)\b"),
+]
+# Fixed-name alternations: cheap to run directly once a trigger is present
+_NAMED_PATTERNS: List[Tuple[Tuple[str, ...], "re.Pattern[str]"]] = [
+    (("MIT", "Massachusetts Institute of Technology"), re.compile(r"(Massachusetts Institute of Technology|MIT)\b")),
+    (("Caltech", "California Institute of Technology"), re.compile(r"(California Institute of Technology|Caltech)\b")),
+]
+
+
+def _span_matches(hay: str, mask: bytes, pat: _Pattern) -> List[str]:
+    """All matches of `pat` in `hay`, searching only the name spans that contain its keyword."""
+    kw = pat.keyword
+    n = len(hay)
+    out: List[str] = []
+    pos = hay.find(kw)
+    while pos != -1:
+        span_start = mask.rfind(b"|", 0, pos) + 1
+        span_end = mask.find(b"|", pos)
+        if span_end == -1:
+            span_end = n
+        if pat.to_span_end:
+            stop = span_end
+        else:
+            stop = hay.rfind(kw, pos, span_end) + len(kw)
+        out.extend(pat.regex.findall(hay, span_start, min(n, stop + 1)))
+        pos = hay.find(kw, span_end)
+    return out
+
+
+def extract_education(text: str) -> str:
+    """Best-effort heuristic to extract university/education mentions from title/snippet.
+    Returns a semicolon-separated list of distinct institutions if multiple.
+    """
+    if not text:
+        return ""
+    hay = " ".join(str(text).split())
+    found: Set[str] = set()
+    mask: Optional[bytes] = None
+    for pat in _SPAN_PATTERNS:
+        if pat.keyword not in hay:
+            continue
+        if mask is None:
+            # Non-ASCII characters become "?", which is a span boundary like any other non-name character
+            mask = hay.encode("ascii", "replace").translate(_SPAN_MASK)
+        for m in _span_matches(hay, mask, pat):
+            inst = m.strip()
+            if inst:
+                found.add(inst)
+    for triggers, regex in _NAMED_PATTERNS:
+        if any(t in hay for t in triggers):
+            for m in regex.findall(hay):
+                found.add(m)
+    if not found:
+        return ""
+    # Preserve stable order by sorting
+    return "; ".join(sorted(found))
+
+
+def extract_education_batch(texts: Iterable[str]) -> List[str]:
+    """Extract education for many texts at once; repeated texts are only processed once."""
+    keys = [t if isinstance(t, str) else str(t or "") for t in texts]
+    results: Dict[str, str] = {t: extract_education(t) for t in dict.fromkeys(keys)}
+    return [results[t] for t in keys]
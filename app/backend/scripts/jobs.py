@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import json
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from progress import EventChannel
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+# Progress is kept in memory on every update but written to SQLite at most this often
+PROGRESS_PERSIST_SECONDS = 1.0
+# A running job's owner renews its lease every third of this; a job whose lease
+# lapses (its process died) is queued again, or failed after DEFAULT_MAX_ATTEMPTS runs
+DEFAULT_LEASE_SECONDS = 60.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobStore:
+    """SQLite table of submitted jobs: parameters, status, latest progress and result.
+
+    Every state change is committed immediately, so a restarted process can
+    see which jobs were still queued or running and pick them up again. A
+    running job records its `owner` (one per JobRunner) and a `lease_until`
+    time that the owner keeps extending; only jobs whose lease has lapsed are
+    taken back.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.con = sqlite3.connect(path, check_same_thread=False)
+        self.con.row_factory = sqlite3.Row
+        self.con.execute("PRAGMA journal_mode = WAL;")
+        self.con.execute("PRAGMA synchronous = NORMAL;")
+        self.con.execute(
+            "CREATE TABLE IF NOT EXISTS job ("
+            " id TEXT PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " params TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " progress TEXT,"
+            " result TEXT,"
+            " error TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " cancel_requested INTEGER NOT NULL DEFAULT 0,"
+            " owner TEXT,"
+            " lease_until REAL,"
+            " created_at TEXT NOT NULL,"
+            " started_at TEXT,"
+            " finished_at TEXT)"
+        )
+        # Job tables created before leases existed
+        columns = {r["name"] for r in self.con.execute("PRAGMA table_info(job)")}
+        for column, ddl in (("owner", "owner TEXT"), ("lease_until", "lease_until REAL")):
+            if column not in columns:
+                self.con.execute(f"ALTER TABLE job ADD COLUMN {ddl}")
+        self.con.execute("CREATE INDEX IF NOT EXISTS ix_job_status ON job (status, created_at)")
+        self.con.commit()
+        self._lock = threading.Lock()
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            cur = self.con.execute(sql, params)
+            self.con.commit()
+            return cur
+
+    def create(self, kind: str, params: Dict[str, Any]) -> str:
+        job_id = f"job-{uuid.uuid4().hex}"
+        self._execute(
+            "INSERT INTO job (id, kind, params, status, created_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(params), QUEUED, _now_iso()),
+        )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.con.execute("SELECT * FROM job WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, limit: int = 50, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        sql = "SELECT * FROM job"
+        params: tuple = ()
+        if status:
+            sql += " WHERE status = ?"
+            params = (status,)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        with self._lock:
+            rows = self.con.execute(sql, params + (limit,)).fetchall()
+        return [self._to_dict(r) for r in rows]
+
+    def count(self, status: str) -> int:
+        with self._lock:
+            return self.con.execute("SELECT COUNT(*) FROM job WHERE status = ?", (status,)).fetchone()[0]
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        """Queued and running jobs, oldest first."""
+        with self._lock:
+            rows = self.con.execute(
+                "SELECT * FROM job WHERE status IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING)
+            ).fetchall()
+        return [self._to_dict(r) for r in rows]
+
+    def mark_running(self, job_id: str, owner: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """Queued -> running under `owner`'s lease; False if the job was cancelled (or taken) meanwhile."""
+        cur = self._execute(
+            "UPDATE job SET status = ?, started_at = ?, attempts = attempts + 1, owner = ?, lease_until = ?"
+            " WHERE id = ? AND status = ? AND cancel_requested = 0",
+            (RUNNING, _now_iso(), owner, time.time() + lease_seconds, job_id, QUEUED),
+        )
+        return cur.rowcount == 1
+
+    def renew_lease(self, job_id: str, owner: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """Extend `owner`'s lease on a running job; False if the job is no longer running under it."""
+        cur = self._execute(
+            "UPDATE job SET lease_until = ? WHERE id = ? AND status = ? AND owner = ?",
+            (time.time() + lease_seconds, job_id, RUNNING, owner),
+        )
+        return cur.rowcount == 1
+
+    def reclaim_expired(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> List[Dict[str, Any]]:
+        """Take back running jobs whose lease lapsed (or that never had one).
+
+        Each goes back to queued, or to failed once it has been started
+        `max_attempts` times. Returns the affected jobs' new state.
+        """
+        with self._lock:
+            rows = self.con.execute(
+                "UPDATE job SET"
+                " status = CASE WHEN attempts < ? THEN ? ELSE ? END,"
+                " error = CASE WHEN attempts < ? THEN error ELSE 'abandoned after ' || attempts || ' attempts' END,"
+                " finished_at = CASE WHEN attempts < ? THEN NULL ELSE ? END,"
+                " started_at = NULL, owner = NULL, lease_until = NULL"
+                " WHERE status = ? AND (lease_until IS NULL OR lease_until < ?)"
+                " RETURNING *",
+                (max_attempts, QUEUED, FAILED, max_attempts, max_attempts, _now_iso(), RUNNING, time.time()),
+            ).fetchall()
+            self.con.commit()
+        return [self._to_dict(r) for r in rows]
+
+    def set_progress(self, job_id: str, progress: Dict[str, Any]) -> None:
+        self._execute("UPDATE job SET progress = ? WHERE id = ?", (json.dumps(progress), job_id))
+
+    def finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None,
+               progress: Optional[Dict[str, Any]] = None, owner: Optional[str] = None) -> bool:
+        """Record the outcome; with `owner`, only if the job is still running under its lease."""
+        cur = self._execute(
+            "UPDATE job SET status = ?, result = ?, error = ?, finished_at = ?,"
+            " progress = COALESCE(?, progress), lease_until = NULL"
+            " WHERE id = ? AND (? IS NULL OR (status = ? AND owner = ?))",
+            (status, json.dumps(result) if result is not None else None, error, _now_iso(),
+             json.dumps(progress) if progress is not None else None, job_id, owner, RUNNING, owner),
+        )
+        return cur.rowcount == 1
+
+    def request_cancel(self, job_id: str) -> Optional[str]:
+        """Flag the job for cancellation; queued jobs are cancelled on the spot. Returns the new status."""
+        with self._lock:
+            self.con.execute(
+                "UPDATE job SET status = CASE WHEN status = ? THEN ? ELSE status END,"
+                " finished_at = CASE WHEN status = ? THEN ? ELSE finished_at END,"
+                " cancel_requested = 1 WHERE id = ? AND status NOT IN (?, ?, ?)",
+                (QUEUED, CANCELLED, QUEUED, _now_iso(), job_id, *FINISHED),
+            )
+            self.con.commit()
+            row = self.con.execute("SELECT status FROM job WHERE id = ?", (job_id,)).fetchone()
+        return row["status"] if row else None
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        for key in ("params", "progress", "result"):
+            if job[key] is not None:
+                job[key] = json.loads(job[key])
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def close(self) -> None:
+        self.con.close()
+
+
+class JobContext:
+    """Handed to a job handler: report progress and check for cancellation."""
+
+    def __init__(self, store: JobStore, job_id: str, params: Dict[str, Any], events: EventChannel) -> None:
+        self.store = store
+        self.job_id = job_id
+        self.params = params
+        self.events = events
+        self.progress: Dict[str, Any] = {}
+        self._cancel = threading.Event()
+        self._persisted_at = 0.0
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def report(self, update: Dict[str, Any]) -> None:
+        """Merge `update` into the job's progress and publish it as a "progress" event.
+
+        Persisted at most once per PROGRESS_PERSIST_SECONDS.
+        """
+        self.progress.update(update)
+        self.events.publish("progress", update)
+        now = time.monotonic()
+        if now - self._persisted_at >= PROGRESS_PERSIST_SECONDS:
+            self._persisted_at = now
+            self.store.set_progress(self.job_id, self.progress)
+
+
+Handler = Callable[[JobContext], Any]
+
+
+class JobRunner:
+    """Runs jobs from a JobStore on a fixed pool of worker threads.
+
+    Submitting only records the job and queues its id, so callers return at
+    once. Handlers get a JobContext: progress they report shows up in get()
+    and on the job's event channel (events()), next to "status" events for
+    each state change, and cancel() sets the flag they poll. A handler's return value becomes the
+    job result; an exception or non-zero SystemExit fails the job.
+
+    Running jobs are leased to this runner's `owner` id and the leases are
+    renewed while the handlers run. On start, and then every third of
+    `lease_seconds`, jobs whose lease lapsed (their runner died) are queued
+    again, or failed once they have been started `max_attempts` times. Jobs
+    still leased by a live runner are left alone.
+    """
+
+    def __init__(self, store: JobStore, handlers: Dict[str, Handler], workers: int = 2, max_queued: int = 100,
+                 owner: Optional[str] = None, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> None:
+        self.store = store
+        self.handlers = handlers
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._active: Dict[str, JobContext] = {}
+        self._channels: Dict[str, EventChannel] = {}  # queued and running jobs
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        self.reclaim_expired()
+        for job in self.store.unfinished():
+            if job["status"] == QUEUED:
+                self._open_channel(job["id"])
+                self._queue.put(job["id"])
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._keep_leases, name="job-leases", daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def reclaim_expired(self) -> List[Dict[str, Any]]:
+        """Queue again (or fail) jobs whose runner stopped renewing their lease."""
+        jobs = self.store.reclaim_expired(self.max_attempts)
+        for job in jobs:
+            if job["status"] == QUEUED:
+                # Handlers resume from their own checkpoints (journal, URL dedup)
+                self._open_channel(job["id"])
+                self._queue.put(job["id"])
+            else:
+                self._close_channel(job["id"], job["status"])
+        return jobs
+
+    def renew_leases(self) -> None:
+        """Extend the leases of the jobs running here; a job whose lease was lost is cancelled."""
+        with self._lock:
+            active = list(self._active.values())
+        for ctx in active:
+            if not self.store.renew_lease(ctx.job_id, self.owner, self.lease_seconds):
+                ctx.cancel()
+
+    def _keep_leases(self) -> None:
+        while True:
+            time.sleep(self.lease_seconds / 3)
+            try:
+                self.renew_leases()
+                self.reclaim_expired()
+            except Exception:
+                traceback.print_exc()
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> str:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if self.max_queued and self.store.count(QUEUED) >= self.max_queued:
+            raise OverflowError(f"Too many queued jobs (max {self.max_queued})")
+        job_id = self.store.create(kind, params)
+        self._open_channel(job_id)
+        self._queue.put(job_id)
+        return job_id
+
+    def events(self, job_id: str) -> Optional[EventChannel]:
+        """Event channel of a queued or running job (None once it has finished)."""
+        with self._lock:
+            return self._channels.get(job_id)
+
+    def _open_channel(self, job_id: str) -> None:
+        with self._lock:
+            self._channels[job_id] = EventChannel()
+
+    def _close_channel(self, job_id: str, status: str) -> None:
+        with self._lock:
+            channel = self._channels.pop(job_id, None)
+        if channel is not None:
+            channel.publish("status", {"status": status})
+            channel.close()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.store.get(job_id)
+        with self._lock:
+            ctx = self._active.get(job_id)
+        if job is not None and ctx is not None:
+            # Fresher than the throttled copy in SQLite
+            job["progress"] = dict(ctx.progress)
+        return job
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        status = self.store.request_cancel(job_id)
+        with self._lock:
+            ctx = self._active.get(job_id)
+        if ctx is not None:
+            ctx.cancel()
+        elif status == CANCELLED:
+            self._close_channel(job_id, CANCELLED)
+        return status
+
+    def _work(self) -> None:
+        while True:
+            job_id = self._queue.get()
+            try:
+                self._run(job_id)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job_id: str) -> None:
+        job = self.store.get(job_id)
+        if job is None or not self.store.mark_running(job_id, self.owner, self.lease_seconds):
+            return
+        with self._lock:
+            channel = self._channels.get(job_id) or EventChannel()
+        ctx = JobContext(self.store, job_id, job["params"], channel)
+        ctx.progress = job["progress"] or {}
+        channel.publish("status", {"status": RUNNING})
+        with self._lock:
+            self._active[job_id] = ctx
+        if self.store.get(job_id)["cancel_requested"]:
+            # cancel() landed between mark_running and registering the context
+            ctx.cancel()
+        try:
+            result = self.handlers[job["kind"]](ctx)
+        except SystemExit as e:
+            # The CLI mains exit on bad input or API errors
+            if e.code in (None, 0):
+                self._finish(ctx, SUCCEEDED)
+            else:
+                self._finish(ctx, FAILED, error=f"exited with status {e.code}")
+        except Exception as e:
+            self._finish(ctx, FAILED, error=f"{type(e).__name__}: {e}")
+        else:
+            self._finish(ctx, CANCELLED if ctx.cancelled() else SUCCEEDED, result=result)
+        finally:
+            with self._lock:
+                self._active.pop(job_id, None)
+
+    def _finish(self, ctx: JobContext, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        if not self.store.finish(ctx.job_id, status, result=result, error=error, progress=ctx.progress, owner=self.owner):
+            # The lease was lost and the job taken back; report where it stands now
+            status = self.store.get(ctx.job_id)["status"]
+        self._close_channel(ctx.job_id, status)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import os
+import sqlite3
+from typing import Dict
+
+
+def journal_path_for(csv_path: str) -> str:
+    return f"{csv_path}.journal.sqlite"
+
+
+class MessageJournal:
+    """Sidecar SQLite journal of generated messages keyed by CSV row position.
+
+    Every completed message is committed immediately, so a crash loses at most
+    the rows that were in flight. Lookups are by row range, letting callers
+    stream the CSV chunk by chunk instead of loading the journal into memory.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.con = sqlite3.connect(path, check_same_thread=False)
+        self.con.execute("PRAGMA journal_mode = WAL;")
+        self.con.execute("PRAGMA synchronous = NORMAL;")
+        self.con.execute(
+            "CREATE TABLE IF NOT EXISTS message_journal ("
+            " row INTEGER PRIMARY KEY,"
+            " message TEXT NOT NULL)"
+        )
+        self.con.commit()
+
+    def count(self) -> int:
+        return self.con.execute("SELECT COUNT(*) FROM message_journal").fetchone()[0]
+
+    def rows_between(self, start: int, end: int) -> Dict[int, str]:
+        """Messages for row positions in [start, end)."""
+        cur = self.con.execute(
+            "SELECT row, message FROM message_journal WHERE row >= ? AND row < ?",
+            (start, end),
+        )
+        return dict(cur.fetchall())
+
+    def record(self, row: int, message: str) -> None:
+        self.con.execute(
+            "INSERT INTO message_journal (row, message) VALUES (?, ?)"
+            " ON CONFLICT(row) DO UPDATE SET message = excluded.message",
+            (row, message),
+        )
+        self.con.commit()
+
+    def close(self) -> None:
+        self.con.close()
+
+    def remove(self) -> None:
+        """Close and delete the journal (and its WAL files) after a successful rewrite."""
+        self.close()
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(self.path + suffix)
+            except FileNotFoundError:
+                pass
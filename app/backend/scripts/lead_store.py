@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import csv
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import pandas as pd
+
+DEFAULT_DB_PATH = os.environ.get("GENREACH_DB_PATH", "genreach.db")
+
+# Lead fields with no opportunity column of their own; kept as JSON in opportunity.notes
+NOTE_FIELDS = ["snippet", "source_engine", "search_query", "education", "fetched_at_iso"]
+
+# notes as a JSON object even if someone stored plain text there
+_NOTES_JSON = "CASE WHEN json_valid(notes) THEN notes ELSE json_object('text', notes) END"
+
+
+def normalize_url(url: str) -> str:
+    return (url or "").strip().lower()
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    con = sqlite3.connect(db_path, timeout=30.0, check_same_thread=False)
+    con.row_factory = sqlite3.Row
+    con.execute("PRAGMA foreign_keys = ON;")
+    con.execute("PRAGMA journal_mode = WAL;")
+    con.execute("PRAGMA synchronous = NORMAL;")
+    return con
+
+
+class KnownUrls:
+    """Set-like view of an org's opportunity URLs plus URLs added this session.
+
+    Membership is an indexed lookup on (org_id, li_profile_url), so checking a
+    candidate costs O(log n) instead of loading every stored URL up front.
+    """
+
+    def __init__(self, store: "OpportunityStore") -> None:
+        self.store = store
+        self.session: Set[str] = set()
+
+    def __contains__(self, url: object) -> bool:
+        key = normalize_url(str(url))
+        if key in self.session:
+            return True
+        return self.store.has_url(key)
+
+    def add(self, url: str) -> None:
+        self.session.add(normalize_url(url))
+
+    def __len__(self) -> int:
+        return self.store.count() + len(self.session)
+
+
+class OpportunityStore:
+    """Lead storage in the genreach `opportunity` table for one organization.
+
+    URLs are stored lowercased, so the (org_id, li_profile_url) unique index
+    deduplicates leads the same case-insensitive way the CSV path did.
+    """
+
+    def __init__(self, db_path: str, org_id: str) -> None:
+        self.db_path = db_path
+        self.org_id = org_id
+        self.lock = threading.Lock()
+        self.con = connect(db_path)
+        row = self.con.execute("SELECT 1 FROM organization WHERE id = ?", (org_id,)).fetchone()
+        if row is None:
+            self.con.close()
+            raise ValueError(f"Organization not found in {db_path}: {org_id}")
+
+    def close(self) -> None:
+        self.con.close()
+
+    def has_url(self, url: str) -> bool:
+        with self.lock:
+            row = self.con.execute(
+                "SELECT 1 FROM opportunity WHERE org_id = ? AND li_profile_url = ?",
+                (self.org_id, url),
+            ).fetchone()
+        return row is not None
+
+    def count(self) -> int:
+        with self.lock:
+            return self.con.execute(
+                "SELECT COUNT(*) FROM opportunity WHERE org_id = ? AND li_profile_url IS NOT NULL",
+                (self.org_id,),
+            ).fetchone()[0]
+
+    def known_urls(self) -> KnownUrls:
+        return KnownUrls(self)
+
+    def upsert_leads(self, items: List[Dict[str, str]]) -> int:
+        """Insert leads in one transaction; existing rows only have empty fields filled in."""
+        rows = []
+        for it in items:
+            url = normalize_url(it.get("url", ""))
+            if not url:
+                continue
+            notes = {k: it[k] for k in NOTE_FIELDS if it.get(k)}
+            rows.append((
+                f"opp-{uuid.uuid4().hex}",
+                self.org_id,
+                it.get("name_guess") or None,
+                it.get("title_guess") or None,
+                it.get("company") or None,
+                url,
+                json.dumps(notes) if notes else None,
+            ))
+        if not rows:
+            return 0
+        with self.lock, self.con:
+            self.con.executemany(
+                """
+                INSERT INTO opportunity (id, org_id, full_name, title, company, li_profile_url, stage, notes)
+                VALUES (?, ?, ?, ?, ?, ?, 'new', ?)
+                ON CONFLICT (org_id, li_profile_url) WHERE li_profile_url IS NOT NULL
+                DO UPDATE SET
+                    full_name = COALESCE(opportunity.full_name, excluded.full_name),
+                    title     = COALESCE(opportunity.title, excluded.title),
+                    company   = COALESCE(opportunity.company, excluded.company),
+                    notes     = COALESCE(opportunity.notes, excluded.notes)
+                """,
+                rows,
+            )
+        return len(rows)
+
+    def _lead_query(self, where: str = "") -> str:
+        return f"""
+            SELECT o.rowid AS rid,
+                   o.id AS opportunity_id,
+                   o.full_name AS name_guess,
+                   o.title AS title_guess,
+                   o.company AS company,
+                   o.li_profile_url AS url,
+                   json_extract({_NOTES_JSON}, '$.snippet') AS snippet,
+                   json_extract({_NOTES_JSON}, '$.source_engine') AS source_engine,
+                   json_extract({_NOTES_JSON}, '$.fetched_at_iso') AS fetched_at_iso,
+                   json_extract({_NOTES_JSON}, '$.search_query') AS search_query,
+                   json_extract({_NOTES_JSON}, '$.education') AS education,
+                   json_extract({_NOTES_JSON}, '$.outreach_message') AS outreach_message
+            FROM opportunity o
+            WHERE o.org_id = ? AND o.li_profile_url IS NOT NULL AND o.rowid > ? {where}
+            ORDER BY o.rowid
+            LIMIT ?
+        """
+
+    def iter_lead_frames(self, chunksize: int = 1000, only_missing_message: bool = False) -> Iterator[pd.DataFrame]:
+        """Stream the org's leads as DataFrames with the CSV column names (keyset-paginated on rowid)."""
+        where = "AND COALESCE(outreach_message, '') = ''" if only_missing_message else ""
+        query = self._lead_query(where)
+        last = 0
+        while True:
+            with self.lock:
+                frame = pd.read_sql_query(query, self.con, params=(self.org_id, last, chunksize))
+            if frame.empty:
+                return
+            last = int(frame["rid"].iloc[-1])
+            yield frame.drop(columns=["rid"])
+
+    def count_leads(self, only_missing_message: bool = False) -> int:
+        """Leads iter_lead_frames would yield (one pass over the org's rows)."""
+        where = f"AND COALESCE(json_extract({_NOTES_JSON}, '$.outreach_message'), '') = ''" if only_missing_message else ""
+        with self.lock:
+            return self.con.execute(
+                f"SELECT COUNT(*) FROM opportunity o WHERE o.org_id = ? AND o.li_profile_url IS NOT NULL {where}",
+                (self.org_id,),
+            ).fetchone()[0]
+
+    def save_messages(self, messages: List[Tuple[str, str]]) -> None:
+        """Store (opportunity_id, outreach_message) pairs in one transaction."""
+        if not messages:
+            return
+        with self.lock, self.con:
+            self.con.executemany(
+                f"UPDATE opportunity SET notes = json_set(COALESCE({_NOTES_JSON}, '{{}}'), '$.outreach_message', ?)"
+                " WHERE id = ? AND org_id = ?",
+                [(message, opp_id, self.org_id) for opp_id, message in messages],
+            )
+
+    def export_csv(self, out_path: str, chunksize: int = 5000) -> int:
+        """Write the org's leads to CSV (lead columns + outreach_message). Returns rows written."""
+        columns = [
+            "name_guess", "title_guess", "url", "snippet", "source_engine",
+            "fetched_at_iso", "search_query", "education", "outreach_message",
+        ]
+        total = 0
+        with open(out_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+            for frame in self.iter_lead_frames(chunksize):
+                writer.writerows(frame.where(frame.notna(), "").to_dict("records"))
+                total += len(frame)
+        return total
+
+
+def open_store(db_path: Optional[str], org_id: Optional[str]) -> OpportunityStore:
+    """Open the store for CLI use, exiting with a message on bad arguments."""
+    import sys
+
+    org_id = org_id or os.getenv("GENREACH_ORG_ID")
+    if not org_id:
+        print("--org-id (or GENREACH_ORG_ID) is required with --db")
+        sys.exit(1)
+    path = db_path or DEFAULT_DB_PATH
+    if not os.path.exists(path):
+        print(f"DB not found: {path}")
+        sys.exit(1)
+    try:
+        return OpportunityStore(path, org_id)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
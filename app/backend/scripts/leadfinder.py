@@ -5,19 +5,34 @@ import argparse
 import csv
 import os
 import sys
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Dict, Iterable, List, Optional, Set
-import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
 
 import requests
 from dotenv import load_dotenv
 import pandas as pd
 
+from education import extract_education, extract_education_batch
+from lead_store import OpportunityStore, open_store
+from progress import ProgressTracker
+from ratelimit import RateLimiter
+from search_cache import DEFAULT_CACHE_DIR, DEFAULT_TTL_HOURS, SearchCache
+
 
 GOOGLE_ENDPOINT = "https://www.googleapis.com/customsearch/v1"
 BING_ENDPOINT = "https://api.bing.microsoft.com/v7.0/search"
+BING_MAX_OFFSET = 1000
+
+# Per-engine request budget (queries/second) and pages fetched concurrently per engine
+ENGINE_QPS = {
+    "google": float(os.getenv("GOOGLE_QPS", "5")),
+    "bing": float(os.getenv("BING_QPS", "3")),
+}
+MAX_PAGES_IN_FLIGHT = int(os.getenv("MAX_PAGES_IN_FLIGHT", "4"))
+# One budget per engine, shared by every query in the process
+ENGINE_LIMITERS = {engine: RateLimiter(rpm=qps * 60) for engine, qps in ENGINE_QPS.items()}
 
 
 @dataclass
@@ -30,14 +45,15 @@ class LeadItem:
     fetched_at_iso: str
 
 
-def normalize_item(title: str, snippet: str, url: str, source: str) -> Dict[str, str]:
+def normalize_item(title: str, snippet: str, url: str, source: str, education: Optional[str] = None) -> Dict[str, str]:
     safe_title = (title or "").replace("LinkedIn", "").strip()
     # Strip common separators like "|" and "-" to guess a name-like left side
     name_guess = safe_title.split("|")[0].split(" - ")[0].strip()
     # Single-line, trimmed snippet capped to 120 chars
     single_line_snippet = " ".join((snippet or "").split())
     title_guess = single_line_snippet[:120]
-    education = extract_education_from_text(f"{title} \n {snippet}")
+    if education is None:
+        education = extract_education_from_text(education_text(title, snippet))
     return {
         "name_guess": name_guess,
         "title_guess": title_guess,
@@ -48,190 +64,229 @@ def normalize_item(title: str, snippet: str, url: str, source: str) -> Dict[str,
     }
 
 
+def education_text(title: str, snippet: str) -> str:
+    return f"{title} \n {snippet}"
+
+
 def extract_education_from_text(text: str) -> str:
     """Best-effort heuristic to extract university/education mentions from title/snippet.
     Returns a semicolon-separated list of distinct institutions if multiple.
     """
-    if not text:
-        return ""
-    hay = " ".join(str(text).split())
-    patterns = [
-        r"([A-Z][A-Za-z.&'\- ]+ University)\b",
-        r"([A-Z][A-Za-z.&'\- ]+ College)\b",
-        r"([A-Z][A-Za-z.&'\- ]+ Institute of Technology)\b",
-        r"(Massachusetts Institute of Technology|MIT)\b",
-        r"(California Institute of Technology|Caltech)\b",
-        r"([A-Z][A-Za-z.&'\- ]+ School of [A-Z][A-Za-z.&'\- ]+)\b",
-        r"([A-Z][A-Za-z.&'\- ]+ Business School)\b",
-    ]
-    found: Set[str] = set()
-    for pat in patterns:
-        for m in re.findall(pat, hay):
-            inst = m if isinstance(m, str) else m[0]
-            inst = inst.strip()
-            if inst:
-                found.add(inst)
-    if not found:
-        return ""
-    # Preserve stable order by sorting
-    return "; ".join(sorted(found))
+    return extract_education(text)
+
+
+class SearchAPIError(Exception):
+    """A search engine could not be queried (missing key, HTTP error, unreachable API)."""
 
 
 def require_env(var_name: str) -> str:
     value = os.getenv(var_name)
     if not value:
-        print(f"Missing required environment variable: {var_name}")
-        sys.exit(1)
+        raise SearchAPIError(f"Missing required environment variable: {var_name}")
     return value
 
 
-def fetch_google(final_query: str, limit: int, existing_urls: Set[str]) -> List[Dict[str, str]]:
+def _error_body(resp: requests.Response) -> str:
+    try:
+        return f" {resp.json()}"
+    except Exception:
+        return ""
+
+
+def google_page(final_query: str, start_index: int, num: int) -> List[Dict[str, str]]:
+    """Fetch one Google CSE results page as raw {title, snippet, url} dicts."""
     api_key = require_env("GOOGLE_API_KEY")
     cse_id = require_env("GOOGLE_CSE_ID")
+    params = {
+        "key": api_key,
+        "cx": cse_id,
+        "q": final_query,
+        "num": num,
+        "start": start_index,
+    }
+    try:
+        resp = requests.get(GOOGLE_ENDPOINT, params=params, timeout=20)
+    except requests.RequestException as e:
+        raise SearchAPIError(f"Google API request failed: {e}") from e
+
+    if resp.status_code != 200:
+        raise SearchAPIError(
+            f"Google API error: HTTP {resp.status_code}. "
+            f"Check your GOOGLE_API_KEY/GOOGLE_CSE_ID and query limits.{_error_body(resp)}"
+        )
 
-    results: List[Dict[str, str]] = []
-    fetched_new = 0
-    start_index = 1  # 1-based
-    consecutive_zero_new_pages = 0
-    session_seen: Set[str] = set()
+    data = resp.json()
+    items = data.get("items", []) or []
+    return [
+        {"title": it.get("title", ""), "snippet": it.get("snippet", ""), "url": it.get("link", "")}
+        for it in items
+    ]
 
-    while fetched_new < limit and start_index <= 91:  # Google typically caps at ~100 results
-        remaining = limit - fetched_new
-        num = min(10, remaining)  # Google allows up to 10 per page
-        params = {
-            "key": api_key,
-            "cx": cse_id,
-            "q": final_query,
-            "num": num,
-            "start": start_index,
-        }
-        try:
-            resp = requests.get(GOOGLE_ENDPOINT, params=params, timeout=20)
-        except requests.RequestException as e:
-            print(f"Google API request failed: {e}")
-            sys.exit(1)
 
-        if resp.status_code != 200:
-            print(
-                f"Google API error: HTTP {resp.status_code}. "
-                f"Check your GOOGLE_API_KEY/GOOGLE_CSE_ID and query limits."
-            )
-            try:
-                print(resp.json())
-            except Exception:
-                pass
-            sys.exit(1)
+def bing_page(final_query: str, offset: int, count: int) -> List[Dict[str, str]]:
+    """Fetch one Bing Web Search results page as raw {title, snippet, url} dicts."""
+    api_key = require_env("BING_KEY")
+    headers = {"Ocp-Apim-Subscription-Key": api_key}
+    params = {
+        "q": final_query,
+        "count": count,
+        "offset": offset,
+    }
+    try:
+        resp = requests.get(BING_ENDPOINT, headers=headers, params=params, timeout=20)
+    except requests.RequestException as e:
+        raise SearchAPIError(f"Bing API request failed: {e}") from e
+
+    if resp.status_code != 200:
+        raise SearchAPIError(
+            f"Bing API error: HTTP {resp.status_code}. "
+            f"Check your BING_KEY and query limits.{_error_body(resp)}"
+        )
 
-        data = resp.json()
-        items = data.get("items", []) or []
-        if not items:
-            break
-
-        page_new = 0
-        for item in items:
-            title = item.get("title", "")
-            snippet = item.get("snippet", "")
-            url = item.get("link", "")
-            if "linkedin.com/in" not in (url or ""):
-                continue
-            url_l = (url or "").lower()
-            if not url_l or url_l in existing_urls or url_l in session_seen:
-                continue
-            results.append(normalize_item(title, snippet, url, "google"))
-            session_seen.add(url_l)
-            fetched_new += 1
-            page_new += 1
-            if fetched_new >= limit:
-                break
+    data = resp.json()
+    web_pages = data.get("webPages") or {}
+    values = web_pages.get("value", []) or []
+    return [
+        {"title": v.get("name", ""), "snippet": v.get("snippet", ""), "url": v.get("url", "")}
+        for v in values
+    ]
 
-        if page_new == 0:
-            consecutive_zero_new_pages += 1
-            # Skip ahead more aggressively if we keep seeing duplicates
-            if consecutive_zero_new_pages >= 2:
-                start_index += 20  # skip two pages
-                consecutive_zero_new_pages = 0
-            else:
-                start_index += num
-        else:
-            consecutive_zero_new_pages = 0
-            start_index += num
 
-        time.sleep(0.2)  # politeness between pages
+def collect_pages(
+    fetch_page: Callable[[str, int, int], List[Dict[str, str]]],
+    final_query: str,
+    offsets: List[int],
+    page_size: int,
+    limit: int,
+    existing_urls: Set[str],
+    source: str,
+    limiter: RateLimiter,
+    cache: Optional[SearchCache] = None,
+) -> List[Dict[str, str]]:
+    """Page through results with up to MAX_PAGES_IN_FLIGHT requests pipelined.
+
+    Each window only requests as many pages as the remaining limit needs, and
+    pages are consumed in order, so quota use matches sequential paging
+    except for duplicate-heavy queries. Pages found in `cache` cost no quota.
+    """
+    results: List[Dict[str, str]] = []
+    session_seen: Set[str] = set()
+
+    def fetch(offset: int) -> List[Dict[str, str]]:
+        if cache is not None:
+            page = cache.get(source, final_query, offset, page_size)
+            if page is not None:
+                return page
+        limiter.acquire()
+        page = fetch_page(final_query, offset, page_size)
+        if cache is not None:
+            cache.put(source, final_query, offset, page_size, page)
+        return page
+
+    next_page = 0
+    with ThreadPoolExecutor(max_workers=MAX_PAGES_IN_FLIGHT) as pool:
+        while len(results) < limit and next_page < len(offsets):
+            remaining = limit - len(results)
+            window = min(MAX_PAGES_IN_FLIGHT, -(-remaining // page_size))
+            batch = offsets[next_page:next_page + window]
+            next_page += len(batch)
+            futures = [pool.submit(fetch, off) for off in batch]
+
+            exhausted = False
+            for fut in futures:
+                page = fut.result()
+                if not page:
+                    exhausted = True
+                    break
+                accepted: List[Dict[str, str]] = []
+                for raw in page:
+                    url = raw["url"]
+                    if "linkedin.com/in" not in (url or ""):
+                        continue
+                    url_l = (url or "").lower()
+                    if not url_l or url_l in existing_urls or url_l in session_seen:
+                        continue
+                    accepted.append(raw)
+                    session_seen.add(url_l)
+                    if len(results) + len(accepted) >= limit:
+                        break
+                educations = extract_education_batch(education_text(r["title"], r["snippet"]) for r in accepted)
+                for raw, education in zip(accepted, educations):
+                    results.append(normalize_item(raw["title"], raw["snippet"], raw["url"], source, education))
+                if len(results) >= limit:
+                    break
+            if exhausted:
+                break
 
     return results
 
 
-def fetch_bing(final_query: str, limit: int, existing_urls: Set[str]) -> List[Dict[str, str]]:
-    api_key = require_env("BING_KEY")
+def fetch_google(final_query: str, limit: int, existing_urls: Set[str], cache: Optional[SearchCache] = None) -> List[Dict[str, str]]:
+    # Google allows up to 10 per page and typically caps at ~100 results (start <= 91)
+    offsets = list(range(1, 92, 10))
+    limiter = ENGINE_LIMITERS["google"]
+    return collect_pages(google_page, final_query, offsets, 10, limit, existing_urls, "google", limiter, cache)
 
-    results: List[Dict[str, str]] = []
-    fetched_new = 0
-    offset = 0
-    consecutive_zero_new_pages = 0
-    session_seen: Set[str] = set()
 
-    while fetched_new < limit:
-        remaining = limit - fetched_new
-        count = min(50, remaining)
-        headers = {"Ocp-Apim-Subscription-Key": api_key}
-        params = {
-            "q": final_query,
-            "count": count,
-            "offset": offset,
-        }
-        try:
-            resp = requests.get(BING_ENDPOINT, headers=headers, params=params, timeout=20)
-        except requests.RequestException as e:
-            print(f"Bing API request failed: {e}")
-            sys.exit(1)
+def fetch_bing(final_query: str, limit: int, existing_urls: Set[str], cache: Optional[SearchCache] = None) -> List[Dict[str, str]]:
+    count = min(50, limit)
+    offsets = list(range(0, BING_MAX_OFFSET + 1, count))
+    limiter = ENGINE_LIMITERS["bing"]
+    return collect_pages(bing_page, final_query, offsets, count, limit, existing_urls, "bing", limiter, cache)
 
-        if resp.status_code != 200:
-            print(
-                f"Bing API error: HTTP {resp.status_code}. "
-                f"Check your BING_KEY and query limits."
-            )
-            try:
-                print(resp.json())
-            except Exception:
-                pass
-            sys.exit(1)
 
-        data = resp.json()
-        web_pages = data.get("webPages") or {}
-        values = web_pages.get("value", []) or []
-        if not values:
-            break
-
-        page_new = 0
-        for v in values:
-            title = v.get("name", "")
-            snippet = v.get("snippet", "")
-            url = v.get("url", "")
-            if "linkedin.com/in" not in (url or ""):
-                continue
-            url_l = (url or "").lower()
-            if not url_l or url_l in existing_urls or url_l in session_seen:
-                continue
-            results.append(normalize_item(title, snippet, url, "bing"))
-            session_seen.add(url_l)
-            fetched_new += 1
-            page_new += 1
-            if fetched_new >= limit:
-                break
+ENGINE_FETCHERS: Dict[str, Callable[..., List[Dict[str, str]]]] = {
+    "google": fetch_google,
+    "bing": fetch_bing,
+}
 
-        if page_new == 0:
-            consecutive_zero_new_pages += 1
-            # Skip ahead more aggressively if duplicates persist
-            if consecutive_zero_new_pages >= 2:
-                offset += 100  # skip two pages worth
-                consecutive_zero_new_pages = 0
-            else:
-                offset += count
-        else:
-            consecutive_zero_new_pages = 0
-            offset += count
 
-    return results
+def merge_engine_results(results_by_engine: Dict[str, List[Dict[str, str]]]) -> List[Dict[str, str]]:
+    """Interleave per-engine results and drop duplicate URLs.
+
+    A URL found by several engines is kept once, and its source_engine lists
+    every engine that found it (e.g. "google; bing").
+    """
+    sources: Dict[str, List[str]] = {}
+    interleaved: List[Dict[str, str]] = []
+    lists = list(results_by_engine.values())
+    for i in range(max((len(lst) for lst in lists), default=0)):
+        for lst in lists:
+            if i < len(lst):
+                it = lst[i]
+                url_key = (it.get("url") or "").lower()
+                engines = sources.setdefault(url_key, [])
+                if it["source_engine"] not in engines:
+                    engines.append(it["source_engine"])
+                interleaved.append(it)
+    merged = drop_duplicate_urls(interleaved)
+    for it in merged:
+        it["source_engine"] = "; ".join(sources[(it.get("url") or "").lower()])
+    return merged
+
+
+def fetch_all(final_query: str, limit: int, existing_urls: Set[str], cache: Optional[SearchCache] = None) -> List[Dict[str, str]]:
+    """Query every engine concurrently and return at most `limit` merged results.
+
+    An engine that fails is logged and left out, so the others' results are
+    kept. Only when every engine fails is the last error raised.
+    """
+    results: Dict[str, List[Dict[str, str]]] = {}
+    error: Optional[SearchAPIError] = None
+    with ThreadPoolExecutor(max_workers=len(ENGINE_FETCHERS)) as pool:
+        futures = {
+            name: pool.submit(fetch, final_query, limit, existing_urls, cache)
+            for name, fetch in ENGINE_FETCHERS.items()
+        }
+        for name, fut in futures.items():
+            try:
+                results[name] = fut.result()
+            except SearchAPIError as e:
+                print(f"Skipping {name}: {e}")
+                error = e
+    if not results and error is not None:
+        raise error
+    return merge_engine_results(results)[:limit]
 
 
 def drop_duplicate_urls(items: List[Dict[str, str]]) -> List[Dict[str, str]]:
@@ -260,28 +315,53 @@ def load_existing_url_set(out_path: str) -> Set[str]:
     return existing
 
 
+LEAD_COLUMNS = [
+    "name_guess",
+    "title_guess",
+    "url",
+    "snippet",
+    "source_engine",
+    "fetched_at_iso",
+    "search_query",
+    "education",
+]
+
+
+def append_to_csv(items: List[Dict[str, str]], out_path: str) -> None:
+    """Append already-deduplicated leads without re-reading the file.
+
+    Falls back to save_to_csv when the existing header lacks lead columns, so
+    the merged file still gains them.
+    """
+    if not items:
+        return
+    header: Optional[List[str]] = None
+    if os.path.exists(out_path) and os.path.getsize(out_path) > 0:
+        with open(out_path, newline="", encoding="utf-8") as f:
+            header = next(csv.reader(f), None)
+        if header is not None and not set(LEAD_COLUMNS).issubset(header):
+            save_to_csv(items, out_path, "")
+            return
+    with open(out_path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=header or LEAD_COLUMNS, extrasaction="ignore")
+        if header is None:
+            writer.writeheader()
+        writer.writerows(items)
+
+
 def save_to_csv(items: List[Dict[str, str]], out_path: str, search_query: str) -> None:
     if not items:
         # Create empty CSV with headers for consistency
-        columns = [
-            "name_guess",
-            "title_guess",
-            "url",
-            "snippet",
-            "source_engine",
-            "fetched_at_iso",
-            "search_query",
-            "education",
-        ]
+        columns = LEAD_COLUMNS
         with open(out_path, "w", newline="", encoding="utf-8") as f:
             writer = csv.DictWriter(f, fieldnames=columns)
             writer.writeheader()
         print(f"Saved 0 leads to {out_path}")
         return
 
-    # Add search query to each item
+    # Add search query to each item (batch runs stamp their own per-item query)
     for item in items:
-        item["search_query"] = search_query
+        item.setdefault("search_query", search_query)
 
     # Load existing CSV if it exists
     existing_df = pd.DataFrame()
@@ -313,6 +393,156 @@ def save_to_csv(items: List[Dict[str, str]], out_path: str, search_query: str) -
     print(f"Added {new_count} new leads to {out_path} (total: {total_count})")
 
 
+def run_query(
+    base_query: str,
+    engine: str,
+    limit: int,
+    existing_urls: Set[str],
+    cache: Optional[SearchCache] = None,
+) -> List[Dict[str, str]]:
+    final_query = f"site:linkedin.com/in {base_query}"
+    if engine == "all":
+        items = fetch_all(final_query, limit, existing_urls, cache)
+    else:
+        items = ENGINE_FETCHERS[engine](final_query, limit, existing_urls, cache)
+    return drop_duplicate_urls(items)
+
+
+def engine_limiters(engine: str) -> Dict[str, RateLimiter]:
+    """The shared limiters a run on `engine` ("all" = every engine) draws from."""
+    return dict(ENGINE_LIMITERS) if engine == "all" else {engine: ENGINE_LIMITERS[engine]}
+
+
+def load_queries(path: str) -> List[str]:
+    queries: List[str] = []
+    seen: Set[str] = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            q = line.strip()
+            if not q or q.startswith("#") or q in seen:
+                continue
+            seen.add(q)
+            queries.append(q)
+    return queries
+
+
+@dataclass
+class QueryYield:
+    query: str
+    requested: int
+    returned: int = 0
+    new: int = 0
+    error: str = ""
+
+    @property
+    def exhausted(self) -> bool:
+        """Fewer new leads than requested: further runs of this query are unlikely to pay off."""
+        return not self.error and self.new < self.requested
+
+
+def run_batch(
+    queries: List[str],
+    engine: str,
+    limit: int,
+    out_path: str,
+    concurrency: int = 2,
+    checkpoint_every: int = 0,
+    report_path: Optional[str] = None,
+    cache: Optional[SearchCache] = None,
+    store: Optional[OpportunityStore] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> List[QueryYield]:
+    """Run many queries with bounded concurrency against one shared URL set.
+
+    The output CSV is read once up front. Results are deduplicated across all
+    queries in memory and appended at checkpoints (or once at the end), so
+    each write costs O(new leads). With a `store`, leads are upserted into the
+    opportunity table instead and known URLs are looked up through its index.
+
+    `should_stop` is polled after each query; once it returns True, queries
+    that have not started are dropped and the results so far are written.
+    `on_progress` receives ProgressTracker snapshots (queries done, rate,
+    ETA, failed queries, engine rate-limit state, new leads) as queries finish.
+    """
+    existing_urls = store.known_urls() if store is not None else load_existing_url_set(out_path)
+    destination = store.db_path if store is not None else out_path
+
+    def flush(items: List[Dict[str, str]]) -> None:
+        if store is not None:
+            store.upsert_leads(items)
+        else:
+            append_to_csv(items, out_path)
+
+    print(f"Running {len(queries)} queries ({engine}, limit {limit}, {len(existing_urls)} known URLs)...")
+
+    yields: Dict[str, QueryYield] = {q: QueryYield(q, limit) for q in queries}
+    pending: List[Dict[str, str]] = []
+    completed = 0
+    total_new = 0
+
+    stopped = False
+    tracker = ProgressTracker(total=len(queries), unit="queries", limiters=engine_limiters(engine), publish=on_progress)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {pool.submit(run_query, q, engine, limit, existing_urls, cache): q for q in queries}
+        for fut in as_completed(futures):
+            if fut.cancelled():
+                continue
+            q = futures[fut]
+            stats = yields[q]
+            try:
+                items = fut.result()
+            except SearchAPIError as e:
+                # Record it and keep the rest of the batch going
+                print(f"Query failed: {q}: {e}")
+                stats.error = "API error"
+                items = []
+            stats.returned = len(items)
+            fetched_at_iso = datetime.now(timezone.utc).isoformat()
+            for it in items:
+                url_l = (it.get("url") or "").lower()
+                # Another concurrent query may have claimed this URL first
+                if url_l in existing_urls:
+                    continue
+                existing_urls.add(url_l)
+                it["fetched_at_iso"] = fetched_at_iso
+                it["search_query"] = q
+                pending.append(it)
+                stats.new += 1
+            completed += 1
+            total_new += stats.new
+            print(f"[{completed}/{len(queries)}] {stats.new:3d} new • {q}")
+            if checkpoint_every and completed % checkpoint_every == 0 and pending:
+                flush(pending)
+                pending = []
+            tracker.update(completed, errors=sum(1 for y in yields.values() if y.error), new_leads=total_new)
+            if not stopped and should_stop is not None and should_stop():
+                stopped = True
+                dropped = sum(1 for f in futures if f.cancel())
+                print(f"Stop requested; dropped {dropped} queries that had not started")
+
+    flush(pending)
+    tracker.finish(new_leads=total_new, stopped=stopped)
+    print(f"Added {total_new} new leads to {destination}")
+    print_yield_report(list(yields.values()), report_path)
+    return list(yields.values())
+
+
+def print_yield_report(yields: List[QueryYield], report_path: Optional[str] = None) -> None:
+    print("\nPer-query yield:")
+    for y in sorted(yields, key=lambda y: y.new):
+        flag = "error" if y.error else ("exhausted" if y.exhausted else "ok")
+        print(f"  {y.new:3d}/{y.requested:<3d} {flag:9s} {y.query}")
+    if report_path:
+        with open(report_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["query", "requested", "returned", "new", "exhausted", "error"])
+            for y in yields:
+                writer.writerow([y.query, y.requested, y.returned, y.new, int(y.exhausted), y.error])
+        print(f"Yield report written to {report_path}")
+
+
 def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description=(
@@ -320,12 +550,17 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
             "No LinkedIn scraping."
         )
     )
-    parser.add_argument("--query", required=True, help="Free-text search query")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--query", help="Free-text search query")
+    source.add_argument(
+        "--queries-file",
+        help="Batch mode: file with one query per line (blank lines and # comments ignored)",
+    )
     parser.add_argument(
         "--engine",
         default="google",
-        choices=["google", "bing"],
-        help="Search engine to use",
+        choices=["google", "bing", "all"],
+        help="Search engine to use ('all' queries every engine concurrently)",
     )
     parser.add_argument(
         "--limit",
@@ -338,15 +573,68 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
         default="leads.csv",
         help="Output CSV path",
     )
+    parser.add_argument(
+        "--db",
+        default=None,
+        help="Store leads in this genreach SQLite DB (opportunity table) instead of --out",
+    )
+    parser.add_argument(
+        "--org-id",
+        default=None,
+        help="Organization that owns the leads with --db (default: GENREACH_ORG_ID)",
+    )
+    parser.add_argument(
+        "--export-csv",
+        default=None,
+        help="With --db: also export the org's leads to this CSV path after the run",
+    )
     parser.add_argument(
         "--write-messages",
         action="store_true",
         help="Generate outreach messages after finding leads",
     )
+    parser.add_argument(
+        "--query-concurrency",
+        type=int,
+        default=2,
+        help="Batch mode: number of queries run concurrently",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=0,
+        help="Batch mode: append results to --out after every N completed queries (0 = once at the end)",
+    )
+    parser.add_argument(
+        "--yield-report",
+        default=None,
+        help="Batch mode: optional CSV path for the per-query yield report",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help="Directory for the on-disk search API response cache",
+    )
+    parser.add_argument(
+        "--cache-ttl-hours",
+        type=float,
+        default=DEFAULT_TTL_HOURS,
+        help="Reuse cached result pages younger than this many hours",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call the search APIs (neither read nor write the cache)",
+    )
     return parser.parse_args(argv)
 
 
-def main(argv: Optional[List[str]] = None) -> None:
+def main(
+    argv: Optional[List[str]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Run the CLI; the hooks are passed to run_batch and outreach. Returns a summary of the run."""
     load_dotenv()
     args = parse_args(argv)
 
@@ -355,39 +643,94 @@ def main(argv: Optional[List[str]] = None) -> None:
         print("Nothing to do: --limit is 0")
         sys.exit(0)
 
-    base_query = args.query.strip()
-    if not base_query:
-        print("--query cannot be empty")
+    if args.export_csv and not args.db:
+        print("--export-csv requires --db")
         sys.exit(1)
 
-    final_query = f"site:linkedin.com/in {base_query}"
-
-    # Build set of existing URLs to ensure we only collect NEW leads
-    existing_urls = load_existing_url_set(args.out)
+    store = open_store(args.db, args.org_id) if args.db else None
+    cache = None if args.no_cache else SearchCache(args.cache_dir, args.cache_ttl_hours * 3600)
 
-    if args.engine == "google":
-        items = fetch_google(final_query, limit, existing_urls)
+    if args.queries_file:
+        queries = load_queries(args.queries_file)
+        if not queries:
+            print(f"No queries found in {args.queries_file}")
+            sys.exit(1)
+        yields = run_batch(
+            queries,
+            args.engine,
+            limit,
+            args.out,
+            concurrency=args.query_concurrency,
+            checkpoint_every=args.checkpoint_every,
+            report_path=args.yield_report,
+            cache=cache,
+            store=store,
+            should_stop=should_stop,
+            on_progress=on_progress,
+        )
+        new_leads = sum(y.new for y in yields)
     else:
-        items = fetch_bing(final_query, limit, existing_urls)
+        base_query = args.query.strip()
+        if not base_query:
+            print("--query cannot be empty")
+            sys.exit(1)
 
-    fetched_at_iso = datetime.now(timezone.utc).isoformat()
-    items = drop_duplicate_urls(items)
-    for it in items:
-        it["fetched_at_iso"] = fetched_at_iso
+        # Build set of existing URLs to ensure we only collect NEW leads
+        existing_urls = store.known_urls() if store is not None else load_existing_url_set(args.out)
 
-    save_to_csv(items, args.out, base_query)
+        tracker = ProgressTracker(total=1, unit="queries", limiters=engine_limiters(args.engine), publish=on_progress)
+        try:
+            items = run_query(base_query, args.engine, limit, existing_urls, cache)
+        except SearchAPIError as e:
+            print(e)
+            sys.exit(1)
+        new_leads = len(items)
+        fetched_at_iso = datetime.now(timezone.utc).isoformat()
+        for it in items:
+            it["fetched_at_iso"] = fetched_at_iso
+
+        if store is not None:
+            for it in items:
+                it["search_query"] = base_query
+            store.upsert_leads(items)
+            print(f"Added {len(items)} new leads to {store.db_path} (org {store.org_id}: {store.count()} total)")
+        else:
+            save_to_csv(items, args.out, base_query)
+        tracker.update(1)
+        tracker.finish(new_leads=new_leads)
+
+    if cache is not None:
+        print(cache.stats_line())
+        cache.close()
     
+    summary: Dict[str, Any] = {
+        "new_leads": new_leads,
+        "destination": store.db_path if store is not None else args.out,
+        "stopped": bool(should_stop is not None and should_stop()),
+    }
+
     # Generate outreach messages if requested
-    if args.write_messages:
+    if args.write_messages and not summary["stopped"]:
         try:
             from outreach_messages import main as generate_messages
             print("\nGenerating outreach messages...")
-            generate_messages(["--csv", args.out])
+            if store is not None:
+                argv_messages = ["--db", store.db_path, "--org-id", store.org_id]
+            else:
+                argv_messages = ["--csv", args.out]
+            summary["messages"] = generate_messages(argv_messages, should_stop=should_stop, on_progress=on_progress)
         except ImportError:
             print("Warning: outreach_messages module not found. Install google-generativeai to use --write-messages")
         except Exception as e:
             print(f"Warning: Failed to generate outreach messages: {e}")
 
+    if store is not None:
+        if args.export_csv:
+            exported = store.export_csv(args.export_csv)
+            print(f"Exported {exported} leads to {args.export_csv}")
+        store.close()
+    return summary
+
 
 if __name__ == "__main__":
     main()
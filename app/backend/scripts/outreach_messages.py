@@ -3,77 +3,185 @@ from __future__ import annotations
 
 import argparse
 import os
+import re
 import sys
-import time
-from typing import Dict, Optional
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import google.generativeai as genai
 import pandas as pd
 from dotenv import load_dotenv
 
+from journal import MessageJournal, journal_path_for
+from lead_store import OpportunityStore, open_store
+from progress import ProgressTracker
+from ratelimit import RateLimiter, call_with_retries, error_status
 
-def extract_personalization_fields(row: pd.Series) -> Dict[str, str]:
-    """Extract personalization fields from a CSV row."""
-    # Name: prefer fullName, then name_guess, then username (title-cased)
-    name = ""
-    for field in ["fullName", "name_guess", "username"]:
-        if field in row and pd.notna(row[field]) and str(row[field]).strip():
-            name = str(row[field]).strip()
-            if field == "username":
-                # Convert username to title case for better presentation
-                name = name.replace(".", " ").replace("_", " ").title()
-            break
-    
-    # Title: prefer headline, then title_guess
-    title = ""
-    for field in ["headline", "title_guess"]:
-        if field in row and pd.notna(row[field]) and str(row[field]).strip():
-            title = str(row[field]).strip()
-            break
-    
-    # Other fields
-    location = str(row.get("location", "")).strip() if pd.notna(row.get("location")) else ""
-    company = str(row.get("company", "")).strip() if pd.notna(row.get("company")) else ""
-    url = str(row.get("url", "")).strip() if pd.notna(row.get("url")) else ""
-    snippet = str(row.get("snippet", "")).strip() if pd.notna(row.get("snippet")) else ""
-    education = str(row.get("education", "")).strip() if pd.notna(row.get("education")) else ""
-    
-    return {
-        "name": name,
-        "title": title,
-        "location": location,
-        "company": company,
-        "url": url,
-        "snippet": snippet,
-        "education": education,
-    }
+# The upstream guard (adaptive concurrency + circuit breaker) is shared with the backend rather than
+# copied: services/upstream.py, one level up, needs only the standard library. This is the scripts'
+# one import from the backend. The dir is appended, so scripts/ modules still win on a name clash.
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+from services.upstream import Upstream, parse_retry_after  # noqa: E402
 
+# google-api-core puts the server's RetryInfo in the error text: "retry_delay { seconds: 23 }"
+_RETRY_DELAY_RE = re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)")
 
-def build_prompt(fields: Dict[str, str], services: str, max_chars: int, goal: str = "") -> str:
-    """Build the prompt for Gemini to generate outreach messages."""
-    name = fields["name"] or "there"
-    title = fields["title"] or ""
-    location = fields["location"] or ""
-    company = fields["company"] or ""
-    snippet = fields["snippet"] or ""
-    education = fields.get("education", "") or ""
-    goal_line = f"Goal: {goal}\n" if goal else ""
-    return f"""You are composing ultra-brief LinkedIn outreach (max {max_chars} characters).
-Sender: Deeptansh (wealth manager).
-Services (briefly mention): {services}.
-{goal_line}Target:
+
+def retry_after_hint(exc: BaseException) -> Optional[float]:
+    """Seconds the server asked us to wait (Retry-After header or gRPC RetryInfo), if any."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None and hasattr(headers, "get"):
+        value = parse_retry_after(headers.get("Retry-After"))
+        if value is not None:
+            return value
+    for detail in getattr(exc, "details", None) or ():
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None and hasattr(delay, "seconds"):
+            return float(delay.seconds) + getattr(delay, "nanos", 0) / 1e9
+    match = _RETRY_DELAY_RE.search(str(exc))
+    return float(match.group(1)) if match else None
+
+# Shared by every run in the process (CLI or API jobs). The concurrency limit
+# backs off on 429/5xx and recovers on success; the breaker pauses workers
+# while Gemini keeps failing instead of burning rows on errors.
+GEMINI_MAX_CONCURRENCY = float(os.getenv("GEMINI_MAX_CONCURRENCY", "16"))
+GEMINI_UPSTREAM = Upstream(
+    "gemini",
+    initial_limit=GEMINI_MAX_CONCURRENCY,
+    max_limit=GEMINI_MAX_CONCURRENCY,
+    failure_threshold=int(os.getenv("GEMINI_BREAKER_FAILURES", "5")),
+    reset_timeout=float(os.getenv("GEMINI_BREAKER_RESET", "30")),
+    status_of=error_status,
+    retry_after_of=retry_after_hint,
+)
+
+
+PROMPT_TARGET_TEMPLATE = """Target:
   - Name: {name}
   - Title/Headline: {title}
   - Location: {location}
   - Company: {company}
   - Education: {education}
   - Context: {snippet}
-Constraints:
+"""
+
+
+def compile_prompt(services: str, max_chars: int, goal: str = "") -> Tuple[str, str]:
+    """Return the (prefix, suffix) around the per-lead target block.
+
+    Neither depends on the lead, so a run builds them once.
+    """
+    goal_line = f"Goal: {goal}\n" if goal else ""
+    prefix = f"""You are composing ultra-brief LinkedIn outreach (max {max_chars} characters).
+Sender: Deeptansh (wealth manager).
+Services (briefly mention): {services}.
+{goal_line}"""
+    suffix = f"""Constraints:
   - 1 short paragraph, <= {max_chars} characters total.
   - Personalize to the target based on provided details.
   - Friendly, specific, and credible; clear CTA to chat.
   - No emojis, no hashtags, no bullets, no greetings that add fluff beyond what's needed.
 Output ONLY the final message text."""
+    return prefix, suffix
+
+
+def render_target(fields: Dict[str, str]) -> str:
+    return PROMPT_TARGET_TEMPLATE.format(
+        name=fields["name"] or "there",
+        title=fields["title"] or "",
+        location=fields["location"] or "",
+        company=fields["company"] or "",
+        education=fields.get("education", "") or "",
+        snippet=fields["snippet"] or "",
+    )
+
+
+def _clean_column(df: pd.DataFrame, column: str) -> pd.Series:
+    """Column as stripped strings with missing values (or a missing column) as ""."""
+    if column not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    col = df[column]
+    return col.where(col.notna(), "").astype(str).str.strip().astype(object)
+
+
+def _first_non_empty(*columns: pd.Series) -> pd.Series:
+    out = columns[0]
+    for col in columns[1:]:
+        out = out.where(out != "", col)
+    return out
+
+
+def extract_personalization_frame(df: pd.DataFrame) -> List[Dict[str, str]]:
+    """Extract the personalization fields of every row in `df`, column-wise.
+
+    Returns one dict per row, in row order: name (fullName, then name_guess,
+    then username title-cased), title (headline, then title_guess),
+    location, company, url, snippet and education, stripped, with missing
+    values as "".
+    """
+    username = (
+        _clean_column(df, "username")
+        .str.replace(".", " ", regex=False)
+        .str.replace("_", " ", regex=False)
+        .str.title()
+    )
+    fields = pd.DataFrame(
+        {
+            "name": _first_non_empty(_clean_column(df, "fullName"), _clean_column(df, "name_guess"), username),
+            "title": _first_non_empty(_clean_column(df, "headline"), _clean_column(df, "title_guess")),
+            "location": _clean_column(df, "location"),
+            "company": _clean_column(df, "company"),
+            "url": _clean_column(df, "url"),
+            "snippet": _clean_column(df, "snippet"),
+            "education": _clean_column(df, "education"),
+        },
+        index=df.index,
+    )
+    return fields.to_dict("records")
+
+
+def needs_message_mask(df: pd.DataFrame, overwrite: bool) -> pd.Series:
+    """Rows that should get a (new) outreach message."""
+    if overwrite:
+        return pd.Series(True, index=df.index)
+    return _clean_column(df, "outreach_message") == ""
+
+
+def build_prompt(fields: Dict[str, str], services: str, max_chars: int, goal: str = "") -> str:
+    """Build the prompt for Gemini to generate outreach messages."""
+    prefix, suffix = compile_prompt(services, max_chars, goal)
+    return prefix + render_target(fields) + suffix
+
+
+@dataclass
+class GenerationContext:
+    """Per-run state shared by every lead: the Gemini model client and the static prompt text."""
+
+    services: str
+    max_chars: int
+    model_name: str
+    goal: str = ""
+    model: Any = field(init=False, repr=False)
+    prefix: str = field(init=False, repr=False)
+    suffix: str = field(init=False, repr=False)
+    failures: int = field(init=False, default=0)
+    _lock: Any = field(init=False, repr=False, default_factory=threading.Lock)
+
+    def __post_init__(self) -> None:
+        self.model = genai.GenerativeModel(model_name=self.model_name)
+        self.prefix, self.suffix = compile_prompt(self.services, self.max_chars, self.goal)
+
+    def prompt_for(self, fields: Dict[str, str]) -> str:
+        return self.prefix + render_target(fields) + self.suffix
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
 
 
 def trim_message(text: str, max_chars: int) -> str:
@@ -98,90 +206,331 @@ def trim_message(text: str, max_chars: int) -> str:
     return trimmed
 
 
-def generate_outreach_message(fields: Dict[str, str], services: str, max_chars: int, model_name: str, goal: str = "") -> str:
-    """Generate a single outreach message using Gemini."""
+def estimate_tokens(prompt: str, max_chars: int) -> int:
+    """Rough prompt + completion token estimate (~4 chars per token) for TPM budgeting."""
+    return (len(prompt) + max_chars) // 4 + 1
+
+
+def generate_outreach_message(
+    fields: Dict[str, str],
+    ctx: GenerationContext,
+    limiter: Optional[RateLimiter] = None,
+    max_retries: int = 5,
+) -> str:
+    """Generate a single outreach message using Gemini.
+
+    When a limiter is given, each attempt first takes one request and the
+    estimated tokens from its budget. Then it holds a GEMINI_UPSTREAM slot
+    for the Gemini call only; it waits while the breaker is open or a
+    Retry-After is pending. 429/5xx responses are retried with jittered
+    exponential backoff.
+    """
     try:
-        prompt = build_prompt(fields, services, max_chars, goal=goal)
-        model = genai.GenerativeModel(model_name=model_name)
-        response = model.generate_content(prompt)
+        prompt = ctx.prompt_for(fields)
+        tokens = estimate_tokens(prompt, ctx.max_chars)
+
+        def attempt():
+            # Waiting for budget must not hold a slot, or it would count against the concurrency limit
+            if limiter is not None:
+                limiter.acquire(tokens)
+            with GEMINI_UPSTREAM.slot_sync():
+                return ctx.model.generate_content(prompt)
+
+        response = call_with_retries(
+            attempt,
+            max_retries=max_retries,
+            on_retry=limiter.note_retry if limiter is not None else None,
+            retry_after=retry_after_hint,
+        )
         
         if not response.text:
             return ""
         
         message = response.text.strip()
-        return trim_message(message, max_chars)
+        return trim_message(message, ctx.max_chars)
         
     except Exception as e:
         print(f"Warning: Failed to generate message for {fields.get('name', 'unknown')}: {e}")
+        ctx.record_failure()
         return ""
 
 
-def process_csv(csv_path: str, services: str, model_name: str, max_chars: int, overwrite: bool = False, sleep_s: float = 0.75, goal: str = "") -> None:
-    """Process the CSV file to add outreach messages."""
-    # Load CSV
+def sleep_to_rpm(sleep_s: Optional[float]) -> Optional[float]:
+    """Compatibility shim: the old fixed sleep between calls expressed as a requests-per-minute budget."""
+    if sleep_s is None or sleep_s <= 0:
+        return None
+    return 60.0 / sleep_s
+
+
+def iter_chunks(csv_path: str, chunksize: int):
+    """Yield (start_row, chunk) pairs; start_row is the chunk's first global row position.
+
+    Every cell is read as the text it holds (blanks as ""). Types guessed
+    per chunk would differ between chunks, and the rewrite would then change
+    columns the run never touches (an integer column with a blank coming
+    back as "123.0" in that chunk only).
+    """
+    start = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=str, keep_default_na=False):
+        chunk = chunk.reset_index(drop=True)
+        if "outreach_message" not in chunk.columns:
+            chunk["outreach_message"] = ""
+        chunk["outreach_message"] = chunk["outreach_message"].astype(object)
+        yield start, chunk
+        start += len(chunk)
+
+
+def rewrite_csv_atomically(csv_path: str, journal: MessageJournal, chunksize: int) -> int:
+    """Merge journaled messages into the CSV via a temp file + rename. Returns total rows written."""
+    tmp_path = f"{csv_path}.tmp"
+    total = 0
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        for start, chunk in iter_chunks(csv_path, chunksize):
+            for row, message in journal.rows_between(start, start + len(chunk)).items():
+                chunk.at[row - start, "outreach_message"] = message
+            chunk.to_csv(f, header=(start == 0), index=False)
+            total += len(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, csv_path)
+    return total
+
+
+def cancel_queued(futures: Dict) -> None:
+    """Drop submitted rows that have not started yet (used when a run is asked to stop)."""
+    for fut in [f for f in futures if f.cancel()]:
+        del futures[fut]
+
+
+def process_csv(
+    csv_path: str,
+    services: str,
+    model_name: str,
+    max_chars: int,
+    overwrite: bool = False,
+    sleep_s: float = 0.75,
+    goal: str = "",
+    rpm: Optional[float] = None,
+    tpm: Optional[float] = None,
+    concurrency: int = 4,
+    chunksize: int = 1000,
+    should_stop: Optional[Callable[[], bool]] = None,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Process the CSV file to add outreach messages.
+
+    Leads are streamed in chunks and fanned out to `concurrency` workers
+    sharing one rate limiter (`rpm` defaults to the rate implied by
+    `sleep_s`). Each finished message is committed to a sidecar journal, so
+    an interrupted run resumes where it stopped. The CSV is rewritten once at
+    the end through a temp file + rename. Memory stays bounded by `chunksize`
+    plus the in-flight window, whatever the file size.
+
+    `should_stop` is polled before each row is submitted; once it returns
+    True, queued rows are dropped, in-flight rows finish, and the CSV is
+    rewritten with everything generated so far. `on_progress` receives
+    ProgressTracker snapshots (done/total, rate, ETA, errors, rate-limit
+    state) as rows finish, and a final one. Returns the final counts.
+    """
+    journal = MessageJournal(journal_path_for(csv_path))
+    resumed = journal.count()
+
+    # Count rows to process (streaming pass; journaled rows are already done)
+    rows_to_process = 0
     try:
-        df = pd.read_csv(csv_path)
+        for start, chunk in iter_chunks(csv_path, chunksize):
+            done = journal.rows_between(start, start + len(chunk))
+            needed = needs_message_mask(chunk, overwrite)
+            rows_to_process += int(needed.sum()) - sum(1 for row in done if needed.iat[row - start])
     except Exception as e:
+        journal.close()
         print(f"Error reading CSV: {e}")
         sys.exit(1)
     
-    # Ensure outreach_message column exists
-    if "outreach_message" not in df.columns:
-        df["outreach_message"] = ""
-    
-    # Count rows to process
-    if overwrite:
-        rows_to_process = len(df)
-    else:
-        rows_to_process = df["outreach_message"].isna().sum() + (df["outreach_message"] == "").sum()
-    
-    if rows_to_process == 0:
+    if rows_to_process == 0 and resumed == 0:
+        journal.remove()
         print("No rows to process.")
-        return
+        return {"total": 0, "processed": 0, "generated": 0, "skipped": 0, "stopped": False}
     
-    print(f"Processing {rows_to_process} rows...")
+    if resumed:
+        print(f"Resuming: {resumed} messages already journaled in {journal.path}")
+    
+    ctx = GenerationContext(services=services, max_chars=max_chars, model_name=model_name, goal=goal)
+    limiter = RateLimiter(rpm=rpm if rpm else sleep_to_rpm(sleep_s), tpm=tpm)
+    workers = max(1, int(concurrency))
+    max_inflight = workers * 4
+    print(
+        f"Processing {rows_to_process} rows with {workers} workers "
+        f"(rpm={limiter.rpm or 'unlimited'}, tpm={limiter.tpm or 'unlimited'})..."
+    )
+    tracker = ProgressTracker(
+        total=rows_to_process,
+        unit="rows",
+        limiters={"gemini": limiter},
+        upstreams={"gemini": GEMINI_UPSTREAM},
+        publish=on_progress,
+    )
     
     processed = 0
     generated = 0
     skipped = 0
     
-    for idx, row in df.iterrows():
-        # Skip if already has message and not overwriting
-        if not overwrite and pd.notna(row.get("outreach_message")) and str(row.get("outreach_message", "")).strip():
-            skipped += 1
-            continue
-        
-        # Extract personalization fields
-        fields = extract_personalization_fields(row)
-        
-        # Generate message
-        message = generate_outreach_message(fields, services, max_chars, model_name, goal=goal)
-        
-        if message:
-            df.at[idx, "outreach_message"] = message
-            generated += 1
-        else:
-            df.at[idx, "outreach_message"] = ""
-            skipped += 1
-        
-        processed += 1
-        
-        # Rate limiting
-        time.sleep(max(0.0, sleep_s))
-        
-        # Progress indicator
-        if processed % 10 == 0:
-            print(f"Processed {processed}/{rows_to_process} rows...")
+    def drain(futures: Dict, block_until: int) -> None:
+        nonlocal processed, generated, skipped
+        while len(futures) > block_until:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                row = futures.pop(fut)
+                message = fut.result()
+                if message:
+                    journal.record(row, message)
+                    generated += 1
+                else:
+                    # Not journaled, so a resumed run retries it
+                    skipped += 1
+                processed += 1
+                tracker.update(processed, errors=ctx.failures, generated=generated, skipped=skipped)
+                # Progress indicator
+                if processed % 10 == 0:
+                    print(f"Processed {tracker.line()}")
+
+    def counts() -> Dict[str, Any]:
+        return {"total": rows_to_process, "processed": processed, "generated": generated,
+                "skipped": skipped, "errors": ctx.failures, "stopped": stopped}
+
+    stopped = False
+    inflight: Dict = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for start, chunk in iter_chunks(csv_path, chunksize):
+            done = journal.rows_between(start, start + len(chunk))
+            needed = needs_message_mask(chunk, overwrite).to_numpy()
+            records = extract_personalization_frame(chunk)
+            for i, fields in enumerate(records):
+                if not needed[i] or start + i in done:
+                    continue
+                if should_stop is not None and should_stop():
+                    stopped = True
+                    break
+                fut = pool.submit(generate_outreach_message, fields, ctx, limiter)
+                inflight[fut] = start + i
+                drain(inflight, max_inflight)
+            if stopped:
+                cancel_queued(inflight)
+                print("Stop requested; finishing rows in flight...")
+                break
+        drain(inflight, 0)
     
     # Save updated CSV
     try:
-        df.to_csv(csv_path, index=False)
-        print(f"Updated CSV saved to {csv_path}")
+        total = rewrite_csv_atomically(csv_path, journal, chunksize)
+        journal.remove()
+        print(f"Updated CSV saved to {csv_path} ({total} rows)")
     except Exception as e:
-        print(f"Error saving CSV: {e}")
+        journal.close()
+        print(f"Error saving CSV: {e} (progress kept in {journal.path})")
         sys.exit(1)
     
-    print(f"Summary: {processed} processed, {generated} generated, {skipped} skipped")
+    tracker.finish(generated=generated, skipped=skipped, stopped=stopped)
+    print(f"Summary: {processed} processed, {generated} generated, {skipped} skipped ({ctx.failures} errors)")
+    return counts()
+
+
+def process_db(
+    store: OpportunityStore,
+    services: str,
+    model_name: str,
+    max_chars: int,
+    overwrite: bool = False,
+    sleep_s: float = 0.75,
+    goal: str = "",
+    rpm: Optional[float] = None,
+    tpm: Optional[float] = None,
+    concurrency: int = 4,
+    chunksize: int = 1000,
+    flush_every: int = 50,
+    should_stop: Optional[Callable[[], bool]] = None,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Add outreach messages to the org's opportunities in the genreach DB.
+
+    Same generation pipeline as process_csv, but leads are paged out of the
+    `opportunity` table and finished messages are written back in batched
+    transactions. Leads that already have a message are skipped (unless
+    `overwrite`), so an interrupted run simply resumes on the next invocation.
+    `should_stop` and `on_progress` behave as in process_csv.
+    """
+    ctx = GenerationContext(services=services, max_chars=max_chars, model_name=model_name, goal=goal)
+    limiter = RateLimiter(rpm=rpm if rpm else sleep_to_rpm(sleep_s), tpm=tpm)
+    workers = max(1, int(concurrency))
+    max_inflight = workers * 4
+    print(
+        f"Processing leads for {store.org_id} with {workers} workers "
+        f"(rpm={limiter.rpm or 'unlimited'}, tpm={limiter.tpm or 'unlimited'})..."
+    )
+    tracker = ProgressTracker(
+        total=store.count_leads(only_missing_message=not overwrite),
+        unit="leads",
+        limiters={"gemini": limiter},
+        upstreams={"gemini": GEMINI_UPSTREAM},
+        publish=on_progress,
+    )
+
+    processed = 0
+    generated = 0
+    skipped = 0
+    pending: List[Tuple[str, str]] = []
+
+    def drain(futures: Dict, block_until: int) -> None:
+        nonlocal processed, generated, skipped
+        while len(futures) > block_until:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                opportunity_id = futures.pop(fut)
+                message = fut.result()
+                if message:
+                    pending.append((opportunity_id, message))
+                    generated += 1
+                else:
+                    skipped += 1
+                processed += 1
+                if len(pending) >= flush_every:
+                    store.save_messages(pending)
+                    pending.clear()
+                tracker.update(processed, errors=ctx.failures, generated=generated, skipped=skipped)
+                if processed % 10 == 0:
+                    print(f"Processed {tracker.line()}")
+
+    def counts() -> Dict[str, Any]:
+        return {"processed": processed, "generated": generated, "skipped": skipped,
+                "errors": ctx.failures, "stopped": stopped}
+
+    stopped = False
+    inflight: Dict = {}
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for chunk in store.iter_lead_frames(chunksize, only_missing_message=not overwrite):
+                records = extract_personalization_frame(chunk)
+                for opportunity_id, fields in zip(chunk["opportunity_id"], records):
+                    if should_stop is not None and should_stop():
+                        stopped = True
+                        break
+                    fut = pool.submit(generate_outreach_message, fields, ctx, limiter)
+                    inflight[fut] = opportunity_id
+                    drain(inflight, max_inflight)
+                if stopped:
+                    cancel_queued(inflight)
+                    print("Stop requested; finishing leads in flight...")
+                    break
+            drain(inflight, 0)
+    finally:
+        store.save_messages(pending)
+
+    tracker.finish(generated=generated, skipped=skipped, stopped=stopped)
+    if processed == 0:
+        print("No rows to process.")
+        return counts()
+    print(f"Summary: {processed} processed, {generated} generated, {skipped} skipped ({ctx.failures} errors)")
+    return counts()
 
 
 def parse_args(argv: Optional[list] = None) -> argparse.Namespace:
@@ -189,19 +538,30 @@ def parse_args(argv: Optional[list] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Generate personalized outreach messages for LinkedIn leads using Gemini AI"
     )
-    parser.add_argument("--csv", required=True, help="Path to CSV file with leads")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--csv", help="Path to CSV file with leads")
+    source.add_argument("--db", help="Path to the genreach SQLite DB; messages are stored on opportunity rows")
+    parser.add_argument("--org-id", default=None, help="Organization whose opportunities to process with --db (default: GENREACH_ORG_ID)")
     parser.add_argument("--overwrite", action="store_true", help="Overwrite existing messages")
     parser.add_argument("--services", help="Services description (overrides SERVICES env var)")
     parser.add_argument("--model", default="gemini-1.5-flash", help="Gemini model to use")
     parser.add_argument("--max-chars", type=int, default=300, help="Maximum characters per message")
-    parser.add_argument("--sleep", type=float, default=0.75, help="Seconds to sleep between API calls (rate limit)")
+    parser.add_argument("--sleep", type=float, default=0.75, help="Legacy: seconds between API calls; converted to --rpm 60/sleep when --rpm is not set")
+    parser.add_argument("--rpm", type=float, default=None, help="Requests-per-minute budget (overrides --sleep)")
+    parser.add_argument("--tpm", type=float, default=None, help="Tokens-per-minute budget (estimated prompt + completion tokens)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Number of concurrent generation workers")
+    parser.add_argument("--chunksize", type=int, default=1000, help="Rows read per chunk while streaming the CSV")
     parser.add_argument("--goal", type=str, default="", help="What you want to accomplish; included in prompt")
     
     return parser.parse_args(argv)
 
 
-def main(argv: Optional[list] = None) -> None:
-    """Main function."""
+def main(
+    argv: Optional[list] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Main function; hooks are passed to process_csv / process_db, whose counts are returned."""
     load_dotenv()
     args = parse_args(argv)
     
@@ -220,8 +580,29 @@ def main(argv: Optional[list] = None) -> None:
         print("Error: SERVICES not provided via --services or SERVICES env var")
         sys.exit(1)
     
+    if args.db:
+        store = open_store(args.db, args.org_id)
+        try:
+            return process_db(
+                store,
+                services=services,
+                model_name=args.model,
+                max_chars=args.max_chars,
+                overwrite=args.overwrite,
+                sleep_s=args.sleep,
+                goal=args.goal,
+                rpm=args.rpm,
+                tpm=args.tpm,
+                concurrency=args.concurrency,
+                chunksize=args.chunksize,
+                should_stop=should_stop,
+                on_progress=on_progress,
+            )
+        finally:
+            store.close()
+
     # Process CSV
-    process_csv(
+    return process_csv(
         csv_path=args.csv,
         services=services,
         model_name=args.model,
@@ -229,6 +610,12 @@ def main(argv: Optional[list] = None) -> None:
         overwrite=args.overwrite,
         sleep_s=args.sleep,
         goal=args.goal,
+        rpm=args.rpm,
+        tpm=args.tpm,
+        concurrency=args.concurrency,
+        chunksize=args.chunksize,
+        should_stop=should_stop,
+        on_progress=on_progress,
     )
 
 
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from collections import deque
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, List, Mapping, Optional, Tuple
+
+from ratelimit import RateLimiter
+
+if TYPE_CHECKING:
+    from services.upstream import Upstream
+
+# Throughput is measured over this trailing window, so a stall shows up as a falling rate
+RATE_WINDOW_SECONDS = 30.0
+# Minimum spacing between published snapshots (the final one is always published)
+PUBLISH_INTERVAL_SECONDS = 0.5
+
+
+class ProgressTracker:
+    """Counts, throughput, ETA and rate-limit state for one engine run.
+
+    Engines call update() with their running counts as work completes; each
+    call may publish a snapshot dict to `publish` (at most every
+    PUBLISH_INTERVAL_SECONDS, plus a final one from finish()). Snapshots
+    carry `done`/`total`, `errors`, `rate_per_s` over the last
+    RATE_WINDOW_SECONDS, `eta_s`, `elapsed_s`, every limiter's state(),
+    every upstream guard's state() (circuit breaker, adaptive concurrency
+    limit), and whatever extra counters the engine passes.
+    """
+
+    def __init__(
+        self,
+        total: Optional[int] = None,
+        unit: str = "rows",
+        limiters: Optional[Mapping[str, RateLimiter]] = None,
+        publish: Optional[Callable[[Dict[str, Any]], None]] = None,
+        upstreams: Optional[Mapping[str, Upstream]] = None,
+    ) -> None:
+        self.total = total
+        self.unit = unit
+        self.limiters = dict(limiters or {})
+        self.upstreams = dict(upstreams or {})
+        self.publish = publish
+        self.done = 0
+        self.errors = 0
+        self.counters: Dict[str, Any] = {}
+        self.started = time.monotonic()
+        self._samples: Deque[Tuple[float, int]] = deque([(self.started, 0)])
+        self._published_at = 0.0
+
+    def update(self, done: int, errors: int = 0, **counters: Any) -> None:
+        now = time.monotonic()
+        self.done = done
+        self.errors = errors
+        self.counters.update(counters)
+        self._samples.append((now, done))
+        while len(self._samples) > 2 and self._samples[1][0] < now - RATE_WINDOW_SECONDS:
+            self._samples.popleft()
+        if self.publish is not None and now - self._published_at >= PUBLISH_INTERVAL_SECONDS:
+            self._published_at = now
+            self.publish(self.snapshot())
+
+    def rate(self) -> float:
+        """Units per second over the trailing window (0 while nothing has finished in it)."""
+        now = time.monotonic()
+        # Baseline: the newest sample at or before the window start (the oldest one if none is)
+        t0, d0 = self._samples[0]
+        for t, d in self._samples:
+            if t > now - RATE_WINDOW_SECONDS:
+                break
+            t0, d0 = t, d
+        span = now - t0
+        return (self.done - d0) / span if span > 0 else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        rate = self.rate()
+        remaining = None if self.total is None else max(0, self.total - self.done)
+        eta = None
+        if remaining == 0:
+            eta = 0.0
+        elif remaining is not None and rate > 0:
+            eta = round(remaining / rate, 1)
+        return {
+            "unit": self.unit,
+            "done": self.done,
+            "total": self.total,
+            "errors": self.errors,
+            "rate_per_s": round(rate, 3),
+            "eta_s": eta,
+            "elapsed_s": round(time.monotonic() - self.started, 1),
+            "rate_limit": {name: limiter.state() for name, limiter in self.limiters.items()},
+            "upstream": {name: upstream.state() for name, upstream in self.upstreams.items()},
+            **self.counters,
+        }
+
+    def line(self) -> str:
+        """One-line human summary for CLI progress output."""
+        snap = self.snapshot()
+        total = f"/{snap['total']}" if snap["total"] is not None else ""
+        eta = f" • ETA {snap['eta_s']:.0f}s" if snap["eta_s"] else ""
+        throttled = [name for name, state in snap["rate_limit"].items() if state["throttled"]]
+        limited = f" • throttled: {', '.join(throttled)}" if throttled else ""
+        tripped = [name for name, state in snap["upstream"].items() if state["circuit"] != "closed"]
+        circuit = f" • circuit open: {', '.join(tripped)}" if tripped else ""
+        return (f"{snap['done']}{total} {self.unit} • {snap['rate_per_s']:.2f}/s{eta}"
+                f" • {snap['errors']} errors{limited}{circuit}")
+
+    def finish(self, **counters: Any) -> Dict[str, Any]:
+        """Publish and return the final snapshot."""
+        self.counters.update(counters)
+        snap = self.snapshot()
+        if self.publish is not None:
+            self.publish(snap)
+        return snap
+
+
+class EventChannel:
+    """In-memory event log for one run that any number of readers can follow.
+
+    Events get increasing ids. Readers ask for everything after the last id
+    they saw (so a reconnecting SSE client resumes with Last-Event-ID) and
+    block until something new arrives, the channel closes, or a timeout
+    passes. Only the newest `maxlen` events are kept.
+
+    Ids restart at 1 in every channel, so the ids sent to clients carry the
+    channel's random `epoch` (event_id / resume_after). An id from another
+    channel, e.g. one opened after a restart, replays this channel from its start.
+    """
+
+    def __init__(self, maxlen: int = 1000) -> None:
+        self._events: Deque[Tuple[int, str, Dict[str, Any]]] = deque(maxlen=maxlen)
+        self._seq = 0
+        self.epoch = uuid.uuid4().hex[:8]
+        self._cond = threading.Condition()
+        self.closed = False
+        self.last_event_at = time.monotonic()
+
+    def publish(self, kind: str, data: Dict[str, Any]) -> int:
+        with self._cond:
+            self._seq += 1
+            self._events.append((self._seq, kind, data))
+            self.last_event_at = time.monotonic()
+            self._cond.notify_all()
+            return self._seq
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def event_id(self, seq: int) -> str:
+        """Client-facing id of event `seq`, unique across channels."""
+        return f"{self.epoch}-{seq}"
+
+    def resume_after(self, last_event_id: Optional[str]) -> int:
+        """The seq to resume after for a client's Last-Event-ID; 0 (from the start) if it is not one of ours."""
+        epoch, _, seq = (last_event_id or "").strip().partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return 0
+        return int(seq)
+
+    def since(self, last_id: int, timeout: float) -> Tuple[List[Tuple[int, str, Dict[str, Any]]], bool]:
+        """Events with id > last_id, waiting up to `timeout` for one. Returns (events, closed)."""
+        with self._cond:
+            if last_id > self._seq:
+                # Not an id this channel handed out; start over rather than wait for it
+                last_id = 0
+            self._cond.wait_for(lambda: self.closed or self._seq > last_id, timeout=timeout)
+            return [e for e in self._events if e[0] > last_id], self.closed
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# A limiter that waited or backed off this recently reports itself as throttled
+THROTTLED_WINDOW_SECONDS = 10.0
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `per_minute` tokens/minute.
+
+    Requests larger than the bucket capacity are admitted once the bucket is
+    full and leave it in deficit, so oversized requests still respect the
+    long-run rate.
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float = 1.0) -> None:
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Block until `amount` tokens are available. Returns seconds spent waiting."""
+        waited = 0.0
+        need = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= need:
+                    self.tokens -= amount
+                    return waited
+                wait = (need - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class RateLimiter:
+    """Combined requests-per-minute and tokens-per-minute budget. None disables a limit.
+
+    Also keeps running totals of time spent waiting on the budget and of
+    backoff retries (see note_retry), reported by state().
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None) -> None:
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm, burst_seconds=10.0) if tpm else None
+        self.rpm = rpm
+        self.tpm = tpm
+        self._stats_lock = threading.Lock()
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.retries = 0
+        self.backoff_seconds = 0.0
+        self.last_retry_status: Optional[int] = None
+        self._last_throttled = 0.0
+
+    def acquire(self, tokens: int = 0) -> float:
+        waited = 0.0
+        if self.requests is not None:
+            waited += self.requests.acquire(1)
+        if self.tokens is not None and tokens > 0:
+            waited += self.tokens.acquire(tokens)
+        if waited > 0:
+            with self._stats_lock:
+                self.waits += 1
+                self.wait_seconds += waited
+                self._last_throttled = time.monotonic()
+        return waited
+
+    def note_retry(self, exc: BaseException, delay: float) -> None:
+        """on_retry hook for call_with_retries: count a backoff caused by `exc`."""
+        with self._stats_lock:
+            self.retries += 1
+            self.backoff_seconds += delay
+            self.last_retry_status = error_status(exc)
+            self._last_throttled = time.monotonic()
+
+    def state(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "rpm": self.rpm,
+                "tpm": self.tpm,
+                "throttled": self._last_throttled > 0
+                and time.monotonic() - self._last_throttled < THROTTLED_WINDOW_SECONDS,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 3),
+                "retries": self.retries,
+                "backoff_seconds": round(self.backoff_seconds, 3),
+                "last_retry_status": self.last_retry_status,
+            }
+
+
+def error_status(exc: BaseException) -> Optional[int]:
+    """Best-effort HTTP status from google-api-core / requests style exceptions."""
+    for attr in ("code", "status_code"):
+        value = getattr(exc, attr, None)
+        if callable(value):
+            try:
+                value = value()
+            except Exception:
+                value = None
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    return error_status(exc) in RETRYABLE_STATUS
+
+
+def call_with_retries(
+    fn: Callable[[], T],
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+    retryable: Callable[[BaseException], bool] = is_retryable,
+    on_retry: Optional[Callable[[BaseException, float], None]] = None,
+    retry_after: Optional[Callable[[BaseException], Optional[float]]] = None,
+) -> T:
+    """Call `fn`, retrying retryable failures with full-jitter exponential backoff.
+
+    A server-supplied wait (`retry_after(exc)`, in seconds) replaces a shorter
+    backoff, but no sleep is longer than `max_delay`.
+    `on_retry(exc, delay)` is called before each backoff sleep.
+    """
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= max_retries or not retryable(e):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+            if retry_after is not None:
+                delay = min(max_delay, max(delay, retry_after(e) or 0.0))
+            attempt += 1
+            if on_retry is not None:
+                on_retry(e, delay)
+            time.sleep(delay)
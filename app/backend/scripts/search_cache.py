@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional
+
+DEFAULT_CACHE_DIR = ".search_cache"
+DEFAULT_TTL_HOURS = 24 * 7
+
+
+class SearchCache:
+    """On-disk cache of search API result pages keyed on engine + query + offset + page size.
+
+    Pages are stored as zlib-compressed JSON in a single SQLite file inside
+    `cache_dir`. Entries older than `ttl_seconds` are treated as misses and
+    refreshed. Safe to share between fetch threads.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, ttl_seconds: float = DEFAULT_TTL_HOURS * 3600) -> None:
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "search_cache.sqlite")
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.con = sqlite3.connect(self.path, check_same_thread=False)
+        self.con.execute("PRAGMA journal_mode = WAL;")
+        self.con.execute("PRAGMA synchronous = NORMAL;")
+        self.con.execute(
+            "CREATE TABLE IF NOT EXISTS search_page ("
+            " engine TEXT NOT NULL,"
+            " query TEXT NOT NULL,"
+            " offset INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " fetched_at REAL NOT NULL,"
+            " body BLOB NOT NULL,"
+            " PRIMARY KEY (engine, query, offset, size))"
+        )
+        self.con.commit()
+
+    def get(self, engine: str, query: str, offset: int, size: int) -> Optional[List[Dict[str, str]]]:
+        with self.lock:
+            row = self.con.execute(
+                "SELECT body FROM search_page"
+                " WHERE engine = ? AND query = ? AND offset = ? AND size = ? AND fetched_at > ?",
+                (engine, query, offset, size, time.time() - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def put(self, engine: str, query: str, offset: int, size: int, page: List[Dict[str, str]]) -> None:
+        body = zlib.compress(json.dumps(page, separators=(",", ":")).encode("utf-8"))
+        with self.lock:
+            self.con.execute(
+                "INSERT OR REPLACE INTO search_page (engine, query, offset, size, fetched_at, body)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (engine, query, offset, size, time.time(), body),
+            )
+            self.con.commit()
+
+    def stats_line(self) -> str:
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100.0) if total else 0.0
+        return f"Search cache: {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate) • {self.path}"
+
+    def close(self) -> None:
+        with self.lock:
+            self.con.close()
@@ -0,0 +1,94 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import pytest
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPTS_DIR)
+# For testing.schema_copy; appended so the database tools never shadow a script module
+sys.path.append(os.path.join(os.path.dirname(SCRIPTS_DIR), "database"))
+
+from testing import schema_copy  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModel:
+    """Stand-in for genai.GenerativeModel: answers after `delay` seconds and records concurrency."""
+
+    instances = []
+    delay = 0.0
+    reply = "Hi {name}, would love to connect."
+    fail_with = None  # exception raised by every call, if set
+
+    def __init__(self, model_name: str = "", **kwargs):
+        self.model_name = model_name
+        self.prompts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        type(self).instances.append(self)
+
+    def generate_content(self, prompt: str) -> FakeResponse:
+        with self._lock:
+            self.prompts.append(prompt)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                time.sleep(self.delay)
+            if self.fail_with is not None:
+                raise self.fail_with
+            name = prompt.split("- Name: ", 1)[1].split("\n", 1)[0] if "- Name: " in prompt else "there"
+            return FakeResponse(self.reply.format(name=name))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def fake_gemini(monkeypatch):
+    """Replace Gemini with FakeModel and give the run a fresh upstream guard."""
+    import outreach_messages
+    from services.upstream import Upstream
+
+    class Model(FakeModel):
+        instances = []
+
+    monkeypatch.setattr(outreach_messages.genai, "GenerativeModel", Model)
+    monkeypatch.setattr(outreach_messages, "GEMINI_UPSTREAM", Upstream(
+        "gemini-test", initial_limit=16, max_limit=16, failure_threshold=1000,
+        status_of=outreach_messages.error_status,
+    ))
+    return Model
+
+
+@pytest.fixture
+def leads_csv(tmp_path):
+    """Write a leads CSV with `n` rows and return its path."""
+    def write(n: int, **columns) -> str:
+        import pandas as pd
+
+        data = {"fullName": [f"Lead {i}" for i in range(n)], "headline": ["PM"] * n, "url": [f"https://li/{i}" for i in range(n)]}
+        data.update(columns)
+        path = str(tmp_path / "leads.csv")
+        pd.DataFrame(data).to_csv(path, index=False)
+        return path
+    return write
+
+
+@pytest.fixture
+def genreach_db(tmp_path):
+    """Empty DB with the genreach schema (testing.schema_copy) and one organization ("org-test"); returns its path."""
+    path = schema_copy(tmp_path)
+    con = sqlite3.connect(path)
+    con.execute("INSERT INTO organization (id, name) VALUES ('org-test', 'Test Org')")
+    con.commit()
+    con.close()
+    return path
@@ -0,0 +1,36 @@
+import pytest
+
+import api
+import outreach_messages
+
+
+def test_outreach_argv_passes_rate_and_db_options_through():
+    argv = api.outreach_argv({
+        "db": "genreach.db", "org_id": "org-1", "rpm": 30, "tpm": "20000", "concurrency": "8", "chunksize": 250,
+    })
+    args = outreach_messages.parse_args(argv)
+    assert (args.db, args.csv, args.org_id) == ("genreach.db", None, "org-1")
+    assert (args.rpm, args.tpm, args.concurrency, args.chunksize) == (30.0, 20000.0, 8, 250)
+
+
+def test_outreach_argv_defaults_match_the_cli():
+    args = outreach_messages.parse_args(api.outreach_argv({}))
+    assert args.csv == "leads.csv"
+    assert (args.rpm, args.tpm, args.concurrency, args.chunksize) == (None, None, 4, 1000)
+
+
+@pytest.mark.parametrize("data", [
+    {"csv": "leads.csv", "db": "genreach.db"},
+    {"org_id": "org-1"},
+    {"concurrency": 0},
+    {"chunksize": "many"},
+    {"rpm": -1},
+    {"tpm": "fast"},
+])
+def test_bad_outreach_parameters_are_rejected_before_queueing(tmp_path, monkeypatch, data):
+    monkeypatch.setenv("JOBS_DB_PATH", str(tmp_path / "jobs.sqlite"))
+    app = api.create_app()
+    resp = app.test_client().post("/outreach", json=data)
+    assert resp.status_code == 400
+    assert resp.get_json()["error"].startswith("Invalid parameters")
+    assert app.extensions["job_runner"].store.list(10, None) == []
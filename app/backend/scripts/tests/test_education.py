@@ -0,0 +1,39 @@
+import leadfinder
+from bench_education import legacy_extract_education
+from education import extract_education, extract_education_batch
+from ratelimit import RateLimiter
+
+TEXTS = [
+    "Jane Doe - PM | LinkedIn \n MBA, Harvard Business School. BS Stanford University",
+    "John Roe - Engineer \n Studied at MIT and Boston College",
+    "Sam Lee - Founder \n Nothing to see here",
+    "Ana Ruiz \n London School of Economics alumna; Caltech PhD",
+]
+
+
+def test_extract_education_matches_the_original_heuristic():
+    for text in TEXTS:
+        assert extract_education(text) == legacy_extract_education(text)
+    assert "Caltech" in extract_education(TEXTS[3])
+    assert extract_education(TEXTS[2]) == ""
+    assert extract_education("") == ""
+
+
+def test_batch_matches_per_text_extraction():
+    texts = TEXTS + TEXTS[:2] + [None]
+    assert extract_education_batch(texts) == [extract_education(t or "") for t in texts]
+
+
+def test_collected_leads_carry_batch_extracted_education(monkeypatch):
+    page = [
+        {"title": t.split(" \n ")[0], "snippet": t.split(" \n ")[1], "url": f"https://www.linkedin.com/in/p{i}"}
+        for i, t in enumerate(TEXTS)
+    ]
+    monkeypatch.setattr(leadfinder, "google_page", lambda q, offset, num: page if offset == 1 else [])
+    monkeypatch.setattr(leadfinder, "ENGINE_LIMITERS", {"google": RateLimiter(rpm=60_000)})
+
+    items = leadfinder.fetch_google("q", 3, set())
+
+    assert len(items) == 3
+    for it, raw in zip(items, page):
+        assert it["education"] == extract_education(f"{raw['title']} \n {raw['snippet']}")
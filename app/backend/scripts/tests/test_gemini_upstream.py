@@ -0,0 +1,53 @@
+import outreach_messages
+from ratelimit import RateLimiter, call_with_retries
+
+
+class HTTPError(Exception):
+    def __init__(self, code: int, message: str = ""):
+        super().__init__(message or f"HTTP {code}")
+        self.code = code
+
+
+class SlotCheckingLimiter(RateLimiter):
+    """Records how many Gemini slots were held whenever the run waited for budget."""
+
+    def __init__(self):
+        super().__init__(rpm=60_000)
+        self.slots_held = []
+
+    def acquire(self, tokens: int = 0) -> float:
+        self.slots_held.append(outreach_messages.GEMINI_UPSTREAM.in_flight)
+        return super().acquire(tokens)
+
+
+def test_retry_after_hint_reads_gemini_retry_delay():
+    exc = HTTPError(429, "429 Quota exceeded. retry_delay { seconds: 23 }")
+    assert outreach_messages.retry_after_hint(exc) == 23.0
+    assert outreach_messages.retry_after_hint(HTTPError(429)) is None
+
+
+def test_server_wait_is_capped_at_max_delay():
+    delays = []
+    calls = []
+
+    def throttled():
+        calls.append(1)
+        if len(calls) == 1:
+            raise HTTPError(429)
+        return "ok"
+
+    result = call_with_retries(
+        throttled, max_delay=0.01, on_retry=lambda exc, delay: delays.append(delay), retry_after=lambda exc: 3600.0
+    )
+    assert result == "ok"
+    assert delays == [0.01]
+
+
+def test_budget_is_taken_before_the_gemini_slot(fake_gemini):
+    ctx = outreach_messages.GenerationContext("wealth planning", 300, "fake")
+    limiter = SlotCheckingLimiter()
+    fields = {"name": "Sam", "title": "PM", "location": "", "company": "Acme", "snippet": ""}
+
+    assert outreach_messages.generate_outreach_message(fields, ctx, limiter) == "Hi Sam, would love to connect."
+    assert limiter.slots_held == [0]
+    assert outreach_messages.GEMINI_UPSTREAM.in_flight == 0
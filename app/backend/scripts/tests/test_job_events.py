@@ -0,0 +1,70 @@
+import pytest
+
+import api
+from progress import EventChannel
+
+
+class FakeRunner:
+    """Just enough of JobRunner for job_event_stream."""
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    def events(self, job_id):
+        return self.channel
+
+    def get(self, job_id):
+        return {"id": job_id, "status": "running"}
+
+
+def closed_channel(n: int) -> EventChannel:
+    channel = EventChannel()
+    for i in range(1, n + 1):
+        channel.publish("progress", {"done": i})
+    channel.close()
+    return channel
+
+
+def streamed_ids(channel, last_event_id):
+    body = "".join(api.job_event_stream(FakeRunner(channel), "job-1", last_event_id))
+    return [line[4:] for line in body.splitlines() if line.startswith("id: ")]
+
+
+def test_resume_sends_only_missed_events():
+    channel = closed_channel(3)
+    assert streamed_ids(channel, None) == [channel.event_id(i) for i in (1, 2, 3)]
+    assert streamed_ids(channel, channel.event_id(2)) == [channel.event_id(3)]
+
+
+@pytest.mark.parametrize("header", ["abc", "12", "-", "  ", "deadbeef-x"])
+def test_malformed_last_event_id_is_ignored(header):
+    channel = closed_channel(2)
+    assert streamed_ids(channel, header) == [channel.event_id(1), channel.event_id(2)]
+
+
+def test_ids_from_another_channel_replay_this_one():
+    old = closed_channel(5)
+    new = closed_channel(2)  # e.g. the same job after a restart: seqs start at 1 again
+    assert old.epoch != new.epoch
+    assert streamed_ids(new, old.event_id(5)) == [new.event_id(1), new.event_id(2)]
+
+
+def test_since_resets_an_id_past_the_end():
+    channel = closed_channel(2)
+    events, closed = channel.since(10, timeout=0.01)
+    assert [seq for seq, _, _ in events] == [1, 2] and closed
+
+
+def test_events_endpoint_ignores_bad_last_event_id(tmp_path, monkeypatch):
+    monkeypatch.setenv("JOBS_DB_PATH", str(tmp_path / "jobs.sqlite"))
+    app = api.create_app()
+    runner = app.extensions["job_runner"]
+    job_id = runner.store.create("search", {"query": "pm"})
+    runner.store.finish(job_id, "succeeded", result={"new_leads": 0})
+
+    client = app.test_client()
+    resp = client.get(f"/jobs/{job_id}/events", headers={"Last-Event-ID": "not-a-number"})
+    assert resp.status_code == 200
+    body = resp.get_data(as_text=True)
+    assert body.count("event: job") == 1 and '"status": "succeeded"' in body
+    assert client.get("/jobs/job-missing/events").status_code == 404
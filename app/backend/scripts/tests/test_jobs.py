@@ -0,0 +1,121 @@
+import threading
+import time
+
+from jobs import CANCELLED, FAILED, QUEUED, RUNNING, SUCCEEDED, JobRunner, JobStore
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_job_runs_reports_progress_and_succeeds(tmp_path):
+    def handler(ctx):
+        ctx.report({"done": 1, "total": 1})
+        return {"params": ctx.params}
+
+    runner = JobRunner(JobStore(str(tmp_path / "jobs.sqlite")), {"echo": handler}, workers=1)
+    runner.start()
+    job_id = runner.submit("echo", {"x": 1})
+
+    assert wait_for(lambda: runner.get(job_id)["status"] == SUCCEEDED)
+    job = runner.get(job_id)
+    assert job["result"] == {"params": {"x": 1}}
+    assert job["progress"] == {"done": 1, "total": 1}
+    assert job["attempts"] == 1 and job["owner"] == runner.owner and job["lease_until"] is None
+
+
+def test_running_job_can_be_cancelled(tmp_path):
+    started = threading.Event()
+
+    def handler(ctx):
+        started.set()
+        while not ctx.cancelled():
+            time.sleep(0.01)
+        return {"partial": True}
+
+    runner = JobRunner(JobStore(str(tmp_path / "jobs.sqlite")), {"slow": handler}, workers=1)
+    runner.start()
+    job_id = runner.submit("slow", {})
+    assert started.wait(5)
+    assert runner.cancel(job_id) == RUNNING
+    assert wait_for(lambda: runner.get(job_id)["status"] == CANCELLED)
+    assert runner.get(job_id)["result"] == {"partial": True}
+
+
+def test_restart_leaves_live_leases_and_requeues_expired_ones(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    store = JobStore(path)
+    live, dead = store.create("echo", {}), store.create("echo", {})
+    assert store.mark_running(live, "other-host:1", lease_seconds=60)
+    assert store.mark_running(dead, "crashed-host:2", lease_seconds=-1)  # lease already lapsed
+
+    runner = JobRunner(JobStore(path), {"echo": lambda ctx: "ok"}, workers=1)
+    runner.start()
+
+    assert wait_for(lambda: runner.get(dead)["status"] == SUCCEEDED)
+    assert runner.get(dead)["attempts"] == 2
+    job = runner.get(live)
+    assert (job["status"], job["owner"]) == (RUNNING, "other-host:1")
+
+
+def test_job_is_failed_once_it_runs_out_of_attempts(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    job_id = store.create("echo", {})
+    for attempt in range(1, 4):
+        assert store.mark_running(job_id, f"host-{attempt}", lease_seconds=-1)
+        jobs = store.reclaim_expired(max_attempts=3)
+        assert [j["id"] for j in jobs] == [job_id]
+
+    job = store.get(job_id)
+    assert job["status"] == FAILED
+    assert job["error"] == "abandoned after 3 attempts"
+    assert store.unfinished() == []
+
+
+def test_leases_are_renewed_while_running_and_a_lost_lease_cancels(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    started = threading.Event()
+
+    def handler(ctx):
+        started.set()
+        while not ctx.cancelled():
+            time.sleep(0.01)
+
+    runner = JobRunner(JobStore(path), {"slow": handler}, workers=1, lease_seconds=0.3)
+    runner.start()
+    job_id = runner.submit("slow", {})
+    assert started.wait(5)
+    time.sleep(0.6)  # two lease lengths: only renewal keeps it
+    assert JobStore(path).reclaim_expired() == []
+    assert runner.get(job_id)["status"] == RUNNING
+
+    # Another process takes the job over: this runner stops and does not overwrite its state
+    other = JobStore(path)
+    other._execute("UPDATE job SET owner = 'other-host:3' WHERE id = ?", (job_id,))
+    assert wait_for(lambda: runner.events(job_id) is None)
+    job = other.get(job_id)
+    assert (job["status"], job["owner"]) == (RUNNING, "other-host:3")
+
+
+def test_old_job_tables_gain_lease_columns(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "jobs.sqlite")
+    con = sqlite3.connect(path)
+    con.execute(
+        "CREATE TABLE job (id TEXT PRIMARY KEY, kind TEXT NOT NULL, params TEXT NOT NULL, status TEXT NOT NULL,"
+        " progress TEXT, result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0,"
+        " cancel_requested INTEGER NOT NULL DEFAULT 0, created_at TEXT NOT NULL, started_at TEXT, finished_at TEXT)"
+    )
+    con.execute("INSERT INTO job (id, kind, params, status, attempts, created_at) VALUES ('job-old', 'echo', '{}', ?, 1, '2025')",
+                (RUNNING,))
+    con.commit()
+    con.close()
+
+    store = JobStore(path)
+    assert [j["status"] for j in store.reclaim_expired()] == [QUEUED]  # no lease recorded: taken back
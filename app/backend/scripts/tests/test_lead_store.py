@@ -0,0 +1,87 @@
+import json
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import leadfinder
+from lead_store import OpportunityStore
+
+
+def lead(n: int, **extra) -> dict:
+    item = {
+        "name_guess": f"Lead {n}",
+        "title_guess": "PM",
+        "url": f"https://www.LinkedIn.com/in/Lead-{n}",
+        "snippet": "PM at Acme",
+        "source_engine": "google",
+        "search_query": "pm",
+    }
+    item.update(extra)
+    return item
+
+
+def test_upsert_dedups_case_insensitively_and_fills_only_empty_fields(genreach_db):
+    store = OpportunityStore(genreach_db, "org-test")
+    assert store.upsert_leads([lead(0, name_guess=""), lead(1)]) == 2
+    store.upsert_leads([lead(0, name_guess="Ana"), lead(1, name_guess="Renamed", url="https://www.linkedin.com/in/lead-1")])
+
+    assert store.count() == 2
+    con = sqlite3.connect(genreach_db)
+    rows = dict(con.execute("SELECT li_profile_url, full_name FROM opportunity"))
+    assert rows == {"https://www.linkedin.com/in/lead-0": "Ana", "https://www.linkedin.com/in/lead-1": "Lead 1"}
+    notes = json.loads(con.execute("SELECT notes FROM opportunity LIMIT 1").fetchone()[0])
+    assert notes == {"snippet": "PM at Acme", "source_engine": "google", "search_query": "pm"}
+    store.close()
+
+
+def test_known_urls_are_indexed_lookups_plus_session(genreach_db):
+    store = OpportunityStore(genreach_db, "org-test")
+    store.upsert_leads([lead(0)])
+    known = store.known_urls()
+    assert "HTTPS://WWW.LINKEDIN.COM/IN/LEAD-0" in known
+    assert "https://www.linkedin.com/in/lead-9" not in known
+    known.add("https://www.linkedin.com/in/Lead-9")
+    assert "https://www.linkedin.com/in/lead-9" in known
+    assert len(known) == 2
+    store.close()
+
+
+def test_frames_messages_and_export(genreach_db, tmp_path):
+    store = OpportunityStore(genreach_db, "org-test")
+    store.upsert_leads([lead(n) for n in range(5)])
+
+    frames = list(store.iter_lead_frames(chunksize=2))
+    assert [len(f) for f in frames] == [2, 2, 1]
+    first = frames[0].iloc[0]
+    store.save_messages([(first["opportunity_id"], "Hi Lead 0")])
+
+    assert store.count_leads(only_missing_message=True) == 4
+    missing = pd.concat(store.iter_lead_frames(only_missing_message=True))
+    assert first["url"] not in set(missing["url"])
+
+    out = str(tmp_path / "export.csv")
+    assert store.export_csv(out, chunksize=2) == 5
+    exported = pd.read_csv(out)
+    assert exported.loc[exported["url"] == first["url"], "outreach_message"].item() == "Hi Lead 0"
+    store.close()
+
+
+def test_unknown_org_is_rejected(genreach_db):
+    with pytest.raises(ValueError):
+        OpportunityStore(genreach_db, "org-missing")
+
+
+def test_batch_writes_to_the_store(monkeypatch, genreach_db):
+    monkeypatch.setattr(
+        leadfinder, "run_query",
+        lambda q, engine, limit, existing, cache=None: [lead(n) for n in range(3) if lead(n)["url"] not in existing],
+    )
+    store = OpportunityStore(genreach_db, "org-test")
+    store.upsert_leads([lead(0)])
+
+    yields = leadfinder.run_batch(["q1", "q2"], "google", 10, "unused.csv", store=store)
+
+    assert sum(y.new for y in yields) == 2
+    assert store.count() == 3
+    store.close()
@@ -0,0 +1,65 @@
+import csv
+
+import pandas as pd
+
+import leadfinder
+
+
+def lead(n: int, source: str = "google") -> dict:
+    return {
+        "name_guess": f"Lead {n}",
+        "title_guess": "PM",
+        "url": f"https://www.linkedin.com/in/lead-{n}",
+        "snippet": "PM at Acme",
+        "source_engine": source,
+        "education": "",
+    }
+
+
+# Each query returns an overlapping window of leads
+RESULTS = {"q1": range(0, 10), "q2": range(5, 15), "q3": range(10, 20)}
+
+
+def fake_run_query(base_query, engine, limit, existing_urls, cache=None):
+    return [lead(n) for n in RESULTS[base_query] if lead(n)["url"].lower() not in existing_urls][:limit]
+
+
+def test_batch_dedups_across_queries_and_appends(monkeypatch, tmp_path):
+    monkeypatch.setattr(leadfinder, "run_query", fake_run_query)
+    out = str(tmp_path / "leads.csv")
+    leadfinder.append_to_csv([lead(0)], out)  # already known before the run
+    report = str(tmp_path / "yield.csv")
+
+    yields = leadfinder.run_batch(["q1", "q2", "q3"], "google", 10, out, concurrency=2, checkpoint_every=1, report_path=report)
+
+    df = pd.read_csv(out)
+    assert df["url"].tolist().count("https://www.linkedin.com/in/lead-0") == 1
+    assert sorted(df["url"]) == sorted(lead(n)["url"] for n in range(20))
+    assert set(df.loc[df["url"] != lead(0)["url"], "search_query"]) <= {"q1", "q2", "q3"}
+    assert sum(y.new for y in yields) == 19
+    with open(report, newline="") as f:
+        rows = {r["query"]: r for r in csv.DictReader(f)}
+    assert sum(int(r["new"]) for r in rows.values()) == 19
+    assert any(r["exhausted"] == "1" for r in rows.values())  # overlapping queries yield fewer than the limit
+
+
+def test_failed_query_is_reported_and_the_batch_continues(monkeypatch, tmp_path):
+    def flaky(base_query, *args, **kwargs):
+        if base_query == "q2":
+            raise leadfinder.SearchAPIError("HTTP 403")
+        return fake_run_query(base_query, *args, **kwargs)
+
+    monkeypatch.setattr(leadfinder, "run_query", flaky)
+    out = str(tmp_path / "leads.csv")
+    yields = {y.query: y for y in leadfinder.run_batch(["q1", "q2", "q3"], "google", 10, out)}
+
+    assert yields["q2"].error == "API error"
+    assert not yields["q2"].exhausted
+    assert yields["q1"].new + yields["q3"].new == 20
+    assert len(pd.read_csv(out)) == 20
+
+
+def test_load_queries_skips_comments_blanks_and_repeats(tmp_path):
+    path = tmp_path / "queries.txt"
+    path.write_text("# header\nq1\n\nq2\nq1\n  q3  \n", encoding="utf-8")
+    assert leadfinder.load_queries(str(path)) == ["q1", "q2", "q3"]
@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+import leadfinder
+from ratelimit import RateLimiter
+
+
+def profile(n: int, engine: str) -> dict:
+    return {"title": f"Lead {n} - PM | LinkedIn", "snippet": f"PM at Acme ({engine})", "url": f"https://www.linkedin.com/in/lead-{n}"}
+
+
+class FakeEngine:
+    """Serves `per_page` profiles per page, numbered from `first`; records offsets and overlap."""
+
+    def __init__(self, name: str, base: int, first: int, per_page: int, delay: float = 0.0):
+        self.name = name
+        self.base = base
+        self.first = first
+        self.per_page = per_page
+        self.delay = delay
+        self.offsets = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, final_query: str, offset: int, num: int):
+        with self.lock:
+            self.offsets.append(offset)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            start = self.first + (offset - self.base) // num * self.per_page
+            return [profile(n, self.name) for n in range(start, start + self.per_page)]
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def engines(monkeypatch):
+    google = FakeEngine("google", base=1, first=0, per_page=10, delay=0.05)
+    bing = FakeEngine("bing", base=0, first=5, per_page=10, delay=0.05)
+    monkeypatch.setattr(leadfinder, "google_page", google)
+    monkeypatch.setattr(leadfinder, "bing_page", bing)
+    monkeypatch.setattr(leadfinder, "ENGINE_LIMITERS", {e: RateLimiter(rpm=60_000) for e in ("google", "bing")})
+    return google, bing
+
+
+def test_pages_are_pipelined_up_to_the_needed_count(engines):
+    google, _ = engines
+    items = leadfinder.fetch_google("site:linkedin.com/in pm", 30, set())
+
+    assert [it["url"] for it in items] == [f"https://www.linkedin.com/in/lead-{n}" for n in range(30)]
+    assert sorted(google.offsets) == [1, 11, 21]  # only the three pages the limit needs
+    assert google.max_in_flight == 3
+
+
+def test_engine_all_queries_engines_concurrently_and_merges(engines):
+    google, bing = engines
+    started = time.perf_counter()
+    items = leadfinder.run_query("pm", "all", 10, set())
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < google.delay + bing.delay  # both engines were in flight together
+    urls = [it["url"] for it in items]
+    assert len(urls) == len(set(urls)) == 10  # --limit caps the merged list, not each engine
+    sources = {it["url"]: it["source_engine"] for it in items}
+    assert sources["https://www.linkedin.com/in/lead-0"] == "google"
+    # Interleaved, so both engines' best results make the cut
+    assert set(urls) == {f"https://www.linkedin.com/in/lead-{n}" for n in range(10)}
+    assert sorted(sources["https://www.linkedin.com/in/lead-7"].split("; ")) == ["bing", "google"]
+
+
+def test_engine_all_keeps_results_when_one_engine_fails(engines, monkeypatch, capsys):
+    google, _ = engines
+
+    def no_key(final_query, offset, count):
+        raise leadfinder.SearchAPIError("Missing required environment variable: BING_KEY")
+
+    monkeypatch.setattr(leadfinder, "bing_page", no_key)
+    items = leadfinder.run_query("pm", "all", 10, set())
+
+    assert [it["url"] for it in items] == [f"https://www.linkedin.com/in/lead-{n}" for n in range(10)]
+    assert {it["source_engine"] for it in items} == {"google"}
+    assert "Skipping bing: Missing required environment variable: BING_KEY" in capsys.readouterr().out
+
+
+def test_engine_all_fails_when_every_engine_fails(engines, monkeypatch):
+    def down(final_query, offset, count):
+        raise leadfinder.SearchAPIError("HTTP 500")
+
+    monkeypatch.setattr(leadfinder, "google_page", down)
+    monkeypatch.setattr(leadfinder, "bing_page", down)
+    with pytest.raises(leadfinder.SearchAPIError):
+        leadfinder.run_query("pm", "all", 10, set())
+
+
+def test_known_urls_are_skipped(engines):
+    known = {f"https://www.linkedin.com/in/lead-{n}" for n in range(5)}
+    items = leadfinder.run_query("pm", "google", 10, known)
+    assert [it["url"] for it in items][0] == "https://www.linkedin.com/in/lead-5"
+    assert len(items) == 10
@@ -0,0 +1,59 @@
+import time
+
+import pandas as pd
+import pytest
+
+import outreach_messages
+from ratelimit import RateLimiter, call_with_retries
+
+
+class HTTPError(Exception):
+    def __init__(self, code: int):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+def test_rows_are_generated_concurrently(fake_gemini, leads_csv):
+    fake_gemini.delay = 0.05
+    path = leads_csv(16)
+    started = time.perf_counter()
+    counts = outreach_messages.process_csv(path, "wealth planning", "fake", 300, rpm=60_000, concurrency=4)
+    elapsed = time.perf_counter() - started
+
+    model = fake_gemini.instances[0]
+    assert counts["generated"] == 16
+    assert model.max_in_flight == 4
+    assert elapsed < 16 * 0.05  # well under the sequential time
+    df = pd.read_csv(path)
+    assert df["outreach_message"].tolist() == [f"Hi Lead {i}, would love to connect." for i in range(16)]
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(rpm=1200)  # 20/s with a one-second burst
+    started = time.perf_counter()
+    for _ in range(30):
+        limiter.acquire()
+    assert time.perf_counter() - started >= 0.4
+    assert limiter.state()["waits"] > 0
+
+
+def test_call_with_retries_retries_only_retryable_errors():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise HTTPError(429)
+        return "ok"
+
+    assert call_with_retries(flaky, base_delay=0.001) == "ok"
+    assert len(calls) == 3
+
+    def rejected():
+        calls.append(1)
+        raise HTTPError(400)
+
+    calls.clear()
+    with pytest.raises(HTTPError):
+        call_with_retries(rejected, base_delay=0.001)
+    assert len(calls) == 1
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+import outreach_messages
+
+FRAME = pd.DataFrame(
+    {
+        "fullName": ["  Ana Ruiz ", np.nan, "", np.nan, "Bo"],
+        "name_guess": [np.nan, "Lee Chan", "   ", np.nan, "ignored"],
+        "username": ["ana.r", "lee_c", "sam.o_neil", np.nan, "bo"],
+        "headline": ["VP Sales", np.nan, "", "CTO", np.nan],
+        "title_guess": ["ignored", "Founder", "Engineer", np.nan, np.nan],
+        "location": ["NYC", np.nan, " London ", "", "Paris"],
+        "company": [np.nan, "Acme", "Initech", "Globex", ""],
+        "url": ["https://li/ana", "https://li/lee", np.nan, "https://li/x", "https://li/bo"],
+        "snippet": ["Loves fintech", np.nan, "Builds things", "", "  "],
+        "education": [np.nan, "MIT", "", "Stanford University", np.nan],
+        "outreach_message": ["Hi Ana", np.nan, "", "  ", "Hi Bo"],
+    }
+)
+
+
+def reference_fields(row: pd.Series) -> dict:
+    """The original per-row extraction, kept as the reference for extract_personalization_frame."""
+    # Name: prefer fullName, then name_guess, then username (title-cased)
+    name = ""
+    for field in ["fullName", "name_guess", "username"]:
+        if field in row and pd.notna(row[field]) and str(row[field]).strip():
+            name = str(row[field]).strip()
+            if field == "username":
+                # Convert username to title case for better presentation
+                name = name.replace(".", " ").replace("_", " ").title()
+            break
+
+    # Title: prefer headline, then title_guess
+    title = ""
+    for field in ["headline", "title_guess"]:
+        if field in row and pd.notna(row[field]) and str(row[field]).strip():
+            title = str(row[field]).strip()
+            break
+
+    # Other fields
+    location = str(row.get("location", "")).strip() if pd.notna(row.get("location")) else ""
+    company = str(row.get("company", "")).strip() if pd.notna(row.get("company")) else ""
+    url = str(row.get("url", "")).strip() if pd.notna(row.get("url")) else ""
+    snippet = str(row.get("snippet", "")).strip() if pd.notna(row.get("snippet")) else ""
+    education = str(row.get("education", "")).strip() if pd.notna(row.get("education")) else ""
+
+    return {
+        "name": name,
+        "title": title,
+        "location": location,
+        "company": company,
+        "url": url,
+        "snippet": snippet,
+        "education": education,
+    }
+
+
+def test_frame_extraction_matches_per_row_extraction():
+    expected = [reference_fields(row) for _, row in FRAME.iterrows()]
+    assert outreach_messages.extract_personalization_frame(FRAME) == expected
+    assert [f["name"] for f in expected] == ["Ana Ruiz", "Lee Chan", "Sam O Neil", "", "Bo"]
+
+
+def test_missing_columns_are_empty_strings():
+    df = FRAME[["fullName", "url"]]
+    expected = [reference_fields(row) for _, row in df.iterrows()]
+    assert outreach_messages.extract_personalization_frame(df) == expected
+
+
+def test_needs_message_mask():
+    assert outreach_messages.needs_message_mask(FRAME, overwrite=False).tolist() == [False, True, True, True, False]
+    assert outreach_messages.needs_message_mask(FRAME, overwrite=True).all()
@@ -0,0 +1,70 @@
+import os
+
+import pandas as pd
+
+import outreach_messages
+from journal import MessageJournal, journal_path_for
+
+
+def test_resume_skips_journaled_rows(fake_gemini, leads_csv):
+    path = leads_csv(10)
+    # A crashed run that had finished rows 0-4
+    journal = MessageJournal(journal_path_for(path))
+    for row in range(5):
+        journal.record(row, f"journaled {row}")
+    journal.close()
+
+    counts = outreach_messages.process_csv(path, "wealth planning", "fake", 300, rpm=60_000, chunksize=3)
+
+    prompts = fake_gemini.instances[0].prompts
+    assert counts["generated"] == 5
+    assert sorted(p.split("- Name: ")[1].split("\n")[0] for p in prompts) == [f"Lead {i}" for i in range(5, 10)]
+    messages = pd.read_csv(path)["outreach_message"].tolist()
+    assert messages[:5] == [f"journaled {i}" for i in range(5)]
+    assert messages[5:] == [f"Hi Lead {i}, would love to connect." for i in range(5, 10)]
+    assert not os.path.exists(journal_path_for(path))
+
+
+def test_failed_rows_stay_unjournaled_for_the_next_run(fake_gemini, leads_csv):
+    path = leads_csv(4)
+    fake_gemini.fail_with = ValueError("model refused")
+    first = outreach_messages.process_csv(path, "wealth planning", "fake", 300, rpm=60_000)
+    assert (first["generated"], first["skipped"]) == (0, 4)
+
+    fake_gemini.fail_with = None
+    second = outreach_messages.process_csv(path, "wealth planning", "fake", 300, rpm=60_000)
+    assert second["generated"] == 4
+    assert pd.read_csv(path)["outreach_message"].notna().all()
+
+
+def test_rewrite_preserves_rows_and_columns(leads_csv, tmp_path):
+    path = leads_csv(7, company=[f"Co {i}" for i in range(7)])
+    journal = MessageJournal(str(tmp_path / "j.sqlite"))
+    journal.record(6, "last row")
+    for start, chunk in outreach_messages.iter_chunks(path, 3):
+        assert list(chunk.columns)[-1] == "outreach_message"
+    assert outreach_messages.rewrite_csv_atomically(path, journal, chunksize=3) == 7
+    df = pd.read_csv(path)
+    assert df["company"].tolist() == [f"Co {i}" for i in range(7)]
+    assert df["outreach_message"].iloc[6] == "last row"
+    assert df["outreach_message"].iloc[:6].isna().all()
+    assert not os.path.exists(f"{path}.tmp")
+
+
+def test_rewrite_leaves_untouched_columns_byte_for_byte(tmp_path):
+    path = str(tmp_path / "leads.csv")
+    # employees is numeric with a blank only in the second chunk; zip is all blank in the last one
+    lines = ["fullName,employees,zip", "Lead 0,120,02134", "Lead 1,35,10001", "Lead 2,,94105",
+             "Lead 3,4000,60601", "Lead 4,12,", "Lead 5,7,"]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    journal = MessageJournal(str(tmp_path / "j.sqlite"))
+    journal.record(1, "Hi Lead 1")
+
+    assert outreach_messages.rewrite_csv_atomically(path, journal, chunksize=2) == 6
+
+    with open(path, encoding="utf-8") as f:
+        rewritten = f.read().splitlines()
+    expected = [lines[0] + ",outreach_message"] + [line + ("," + "Hi Lead 1" if i == 1 else ",")
+                                                   for i, line in enumerate(lines[1:])]
+    assert rewritten == expected
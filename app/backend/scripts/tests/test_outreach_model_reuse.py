@@ -0,0 +1,17 @@
+import outreach_messages
+
+
+def test_one_model_per_run(fake_gemini, leads_csv):
+    path = leads_csv(12)
+    outreach_messages.process_csv(path, "wealth planning", "gemini-x", 300, rpm=60_000, concurrency=3)
+    assert len(fake_gemini.instances) == 1
+    assert fake_gemini.instances[0].model_name == "gemini-x"
+    assert len(fake_gemini.instances[0].prompts) == 12
+
+
+def test_compiled_prompt_matches_build_prompt(fake_gemini):
+    fields = {"name": "Ana", "title": "CFO", "location": "NYC", "company": "Acme", "url": "", "snippet": "Fintech", "education": "MIT"}
+    ctx = outreach_messages.GenerationContext(services="tax planning", max_chars=250, model_name="m", goal="Book a call")
+    assert ctx.prompt_for(fields) == outreach_messages.build_prompt(fields, "tax planning", 250, "Book a call")
+    assert "Goal: Book a call" in ctx.prompt_for(fields)
+    assert "- Name: there" in ctx.prompt_for({**fields, "name": ""})
@@ -0,0 +1,45 @@
+import leadfinder
+from ratelimit import RateLimiter
+from search_cache import SearchCache
+
+PAGE = [{"title": "Ana - PM", "snippet": "PM at Acme", "url": "https://www.linkedin.com/in/ana"}]
+
+
+def test_round_trip_and_hit_counts(tmp_path):
+    cache = SearchCache(str(tmp_path), ttl_seconds=60)
+    assert cache.get("google", "q", 1, 10) is None
+    cache.put("google", "q", 1, 10, PAGE)
+
+    assert cache.get("google", "q", 1, 10) == PAGE
+    assert cache.get("bing", "q", 1, 10) is None  # keyed on engine, query, offset and size
+    assert cache.get("google", "q", 11, 10) is None
+    assert (cache.hits, cache.misses) == (1, 3)
+    assert "1 hits, 3 misses" in cache.stats_line()
+    cache.close()
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = SearchCache(str(tmp_path), ttl_seconds=0)
+    cache.put("google", "q", 1, 10, PAGE)
+    assert cache.get("google", "q", 1, 10) is None
+    cache.close()
+
+
+def test_cached_pages_cost_no_quota(monkeypatch, tmp_path):
+    calls = []
+
+    def google_page(final_query, offset, num):
+        calls.append(offset)
+        return PAGE if offset == 1 else []
+
+    monkeypatch.setattr(leadfinder, "google_page", google_page)
+    monkeypatch.setattr(leadfinder, "ENGINE_LIMITERS", {"google": RateLimiter(rpm=60_000)})
+    cache = SearchCache(str(tmp_path), ttl_seconds=60)
+
+    first = leadfinder.fetch_google("q", 10, set(), cache)
+    fetched = len(calls)
+    second = leadfinder.fetch_google("q", 10, set(), cache)
+
+    assert first == second
+    assert fetched > 0 and len(calls) == fetched
+    cache.close()
@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Generic, Optional, Sequence, Tuple, TypeVar
+
+from .prompts import build_user_payload
+
+GENERATE_CACHE_SIZE = int(os.getenv("GENERATE_CACHE_SIZE", "512"))
+GENERATE_CACHE_TTL = float(os.getenv("GENERATE_CACHE_TTL", "3600"))
+GENERATE_CACHE_DB = os.getenv("GENERATE_CACHE_DB", "")  # empty disables the SQLite tier
+
+# Values for the X-Cache response header
+CACHE_HIT = "HIT"
+CACHE_MISS = "MISS"
+CACHE_BYPASS = "BYPASS"
+
+
+def cache_key(
+    intent: str | None,
+    profile_info: dict,
+    extended_profile: dict,
+    models: Sequence[str],
+    temperature: float,
+) -> str:
+    """
+    Return a stable hash of the canonical prompt payload plus sampling settings.
+
+    `models` is the whole ordered model list: with hedging, any of them may
+    produce the answer, so changing a fallback must not serve old entries.
+    """
+    payload = build_user_payload(intent, profile_info, extended_profile)
+    canonical = json.dumps(
+        {"payload": payload, "models": list(models), "temperature": temperature},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+V = TypeVar("V")
+
+
+class LRUCache(Generic[V]):
+    """
+    Bounded in-memory LRU with a per-entry TTL.
+
+    Values are stored and returned by reference, not copied, so callers must
+    treat them as read-only (e.g. auth.py caches detached User rows).
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, V]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[V]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: V, ttl: Optional[float] = None) -> None:
+        if self.max_size <= 0:
+            return
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    """
+    Optional persistent tier so cached messages survive restarts.
+    Calls are dispatched to a worker thread to keep the event loop free.
+    """
+
+    def __init__(self, db_path: str, ttl: float):
+        self.db_path = db_path
+        self.ttl = ttl
+        con = self._connect()
+        try:
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS generate_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            con.commit()
+        finally:
+            con.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.db_path, timeout=5.0)
+        con.execute("PRAGMA journal_mode = WAL;")
+        con.execute("PRAGMA synchronous = NORMAL;")
+        return con
+
+    def _get(self, key: str) -> Optional[str]:
+        con = self._connect()
+        try:
+            row = con.execute(
+                "SELECT value FROM generate_cache WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        finally:
+            con.close()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: str) -> None:
+        con = self._connect()
+        try:
+            con.execute(
+                "INSERT INTO generate_cache (key, value, expires_at) VALUES (?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+                (key, value, time.time() + self.ttl),
+            )
+            con.commit()
+        finally:
+            con.close()
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: str) -> None:
+        await asyncio.to_thread(self._set, key, value)
+
+
+class ResponseCache:
+    """
+    Two-tier cache for generated messages with in-flight request collapsing:
+    concurrent misses for the same key share a single upstream call.
+    """
+
+    def __init__(self, memory: LRUCache[str], persistent: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.persistent = persistent
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        if self.persistent is not None:
+            value = await self.persistent.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            await self.persistent.set(key, value)
+
+    async def get_or_generate(
+        self,
+        key: str,
+        produce: Callable[[], Awaitable[str]],
+        bypass: bool = False,
+    ) -> Tuple[str, str]:
+        """
+        Return (value, cache_status). With `bypass` a fresh value is always
+        produced and replaces the cached one.
+        """
+        if bypass:
+            value = await produce()
+            await self.set(key, value)
+            return value, CACHE_BYPASS
+
+        value = await self.get(key)
+        if value is not None:
+            return value, CACHE_HIT
+
+        task = self._inflight.get(key)
+        if task is not None:
+            # Another request is already generating this exact payload
+            return await asyncio.shield(task), CACHE_HIT
+
+        # Run upstream as its own task so a disconnecting caller doesn't cancel
+        # the call other waiters are sharing.
+        task = asyncio.ensure_future(self._produce_and_store(key, produce))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._inflight.pop(key, None) if self._inflight.get(key) is t else None)
+        return await asyncio.shield(task), CACHE_MISS
+
+    async def _produce_and_store(self, key: str, produce: Callable[[], Awaitable[str]]) -> str:
+        value = await produce()
+        await self.set(key, value)
+        return value
+
+
+def create_cache() -> ResponseCache:
+    persistent = SQLiteCache(GENERATE_CACHE_DB, GENERATE_CACHE_TTL) if GENERATE_CACHE_DB else None
+    return ResponseCache(LRUCache(GENERATE_CACHE_SIZE, GENERATE_CACHE_TTL), persistent)
@@ -0,0 +1,219 @@
+import json
+import os
+import re
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Optional, Sequence, Tuple
+
+from .metrics import Counter, Histogram
+
+# Estimated tokens the profile JSON may take in the prompt (0 disables compaction)
+PROFILE_TOKEN_BUDGET = int(os.getenv("PROFILE_TOKEN_BUDGET", "1000"))
+
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+PROFILE_TOKENS = Histogram(
+    "profile_tokens",
+    "Estimated prompt tokens of the profile JSON before and after compaction",
+    TOKEN_BUCKETS,
+    labelnames=("stage",),
+)
+PROFILE_COMPACTIONS = Counter(
+    "profile_compactions_total",
+    "Profiles that had to be truncated to fit PROFILE_TOKEN_BUDGET",
+)
+
+# Words and digit runs in chunks of up to 6 characters, and single punctuation marks
+_PIECE_RE = re.compile(r"[^\W\d_]{1,6}|\d{1,6}|[^\w\s]|_")
+_YEAR_RE = re.compile(r"\b(19[5-9]\d|20\d\d)\b")
+_WORD_RE = re.compile(r"[^\W\d_]{3,}")
+_NUMBER_RE = re.compile(r"\d")
+_PRESENT_RE = re.compile(r"\b(present|current|now)\b", re.IGNORECASE)
+
+# Successively tighter caps, applied until the profile fits the budget:
+# (experiences, experience description chars, posts, post chars, about chars,
+#  awards, award description chars, education entries)
+COMPACTION_LEVELS: Tuple[Tuple[int, int, int, int, int, int, int, int], ...] = (
+    (6, 400, 3, 300, 800, 3, 200, 3),
+    (4, 250, 2, 220, 500, 2, 120, 2),
+    (3, 150, 2, 160, 300, 1, 0, 2),
+    (2, 80, 1, 120, 160, 1, 0, 1),
+    (1, 0, 0, 0, 0, 0, 0, 1),
+)
+
+# Words too common in intents and profiles to say anything about relevance
+_STOPWORDS = frozenset(
+    "the and for with you your our that this from are was were have has into about over more "
+    "their they them will would can could just also like want help intro".split()
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap local estimate of BPE tokens: one per punctuation mark and per
+    word or digit run, with one more for every further 6 characters of long
+    ones. Close enough to budget prompts without loading a tokenizer.
+    """
+    return len(_PIECE_RE.findall(text))
+
+
+def _json_tokens(value) -> int:
+    return estimate_tokens(json.dumps(value, separators=(",", ":")))
+
+
+def _clean(value):
+    """Drop None/empty values and collapse whitespace in every string."""
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        cleaned = {k: _clean(v) for k, v in value.items()}
+        return {k: v for k, v in cleaned.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        cleaned = [_clean(v) for v in value]
+        return [v for v in cleaned if v not in (None, "", [], {})]
+    return value
+
+
+def clip(text: str, max_chars: int) -> str:
+    """Cut `text` to about `max_chars` at a word boundary, marking the cut with an ellipsis."""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    space = cut.rfind(" ")
+    if space > max_chars * 0.6:
+        cut = cut[:space]
+    return cut.rstrip(" ,;:.-") + "..."
+
+
+def _years(date_range: str) -> Tuple[float, float]:
+    """(end, start) years of a LinkedIn date range; "Present" ends now, undated ranks last."""
+    years = [int(y) for y in _YEAR_RE.findall(date_range or "")]
+    end = float(date.today().year) + 0.5 if _PRESENT_RE.search(date_range or "") else (max(years) if years else 0.0)
+    return end, (min(years) if years else 0.0)
+
+
+def _terms(*texts: Optional[str]) -> set:
+    return {w for t in texts if t for w in _WORD_RE.findall(t.lower())} - _STOPWORDS
+
+
+def _overlap(text: str, terms: set) -> int:
+    return len(_terms(text) & terms) if terms else 0
+
+
+def _rank_experiences(items: List[dict], terms: set) -> List[dict]:
+    """Most recent first, with experiences that mention the intent or carry numbers pulled forward."""
+    this_year = date.today().year
+
+    def score(item: dict) -> float:
+        end, _ = _years(item.get("dateRange", ""))
+        recency = 3.0 if end > this_year else max(0.0, 2.0 - 0.2 * (this_year - end)) if end else 0.0
+        text = " ".join(str(item.get(k, "")) for k in ("title", "company", "description"))
+        return recency + min(2, _overlap(text, terms)) + (0.5 if _NUMBER_RE.search(item.get("description", "")) else 0.0)
+
+    order = sorted(range(len(items)), key=lambda i: (-score(items[i]), i))
+    return [items[i] for i in order]
+
+
+def _rank_posts(posts: List[dict], terms: set) -> List[dict]:
+    """Highest-signal posts first: concrete numbers, some substance, and overlap with the intent/title."""
+
+    def score(post: dict) -> float:
+        text = str(post.get("text", ""))
+        return (
+            (1.5 if _NUMBER_RE.search(text) else 0.0)
+            + (1.0 if len(text) >= 80 else 0.0)
+            + min(3, _overlap(text, terms))
+        )
+
+    order = sorted(range(len(posts)), key=lambda i: (-score(posts[i]), i))
+    return [posts[i] for i in order]
+
+
+def _by_recency(items: List[dict], key: str) -> List[dict]:
+    order = sorted(range(len(items)), key=lambda i: (-_years(items[i].get(key, ""))[0], i))
+    return [items[i] for i in order]
+
+
+def _apply_level(extended: dict, level: Sequence[int]) -> dict:
+    max_exp, exp_chars, max_posts, post_chars, about_chars, max_awards, award_chars, max_edu = level
+    out = dict(extended)
+
+    def clip_field(item: dict, field: str, max_chars: int) -> dict:
+        if field not in item:
+            return item
+        item = dict(item)
+        if max_chars:
+            item[field] = clip(item[field], max_chars)
+        else:
+            del item[field]
+        return item
+
+    if "about" in out:
+        out = clip_field(out, "about", about_chars)
+    if "experiences" in out:
+        out["experiences"] = [clip_field(e, "description", exp_chars) for e in out["experiences"][:max_exp]]
+    if "recentPosts" in out:
+        out["recentPosts"] = [clip_field(p, "text", post_chars) for p in out["recentPosts"][:max_posts]]
+        out["recentPosts"] = [p for p in out["recentPosts"] if p]
+    if "awards" in out:
+        out["awards"] = [clip_field(a, "description", award_chars) for a in out["awards"][:max_awards]]
+    if "education" in out:
+        out["education"] = out["education"][:max_edu]
+    return {k: v for k, v in out.items() if v not in (None, "", [], {})}
+
+
+@dataclass
+class CompactProfile:
+    profile_info: dict
+    extended_profile: dict
+    tokens_before: int
+    tokens_after: int
+    level: int  # -1 = fitted without truncation, else index into COMPACTION_LEVELS
+
+
+def compact_profile(
+    intent: Optional[str],
+    profile_info: dict,
+    extended_profile: dict,
+    budget: int = PROFILE_TOKEN_BUDGET,
+) -> CompactProfile:
+    """
+    Shrink a scraped profile to fit about `budget` prompt tokens.
+
+    Empty fields are always dropped and whitespace collapsed. A profile
+    that then fits is returned in its original order. Otherwise sections
+    are ranked (experiences by recency and overlap with the intent and
+    headline, posts by signal: numbers, substance, overlap; education and
+    awards by recency) and progressively tighter COMPACTION_LEVELS cap how
+    many entries are kept and clip long text. The last level is used even
+    if it does not fit. Token counts are estimates
+    (estimate_tokens) of the profile JSON.
+    """
+    tokens_before = _json_tokens({"profileInfo": profile_info, "extendedProfile": extended_profile})
+    info = _clean(profile_info) or {}
+    extended = _clean(extended_profile) or {}
+
+    level = -1
+    compacted = extended
+    tokens_after = _json_tokens({"profileInfo": info, "extendedProfile": compacted})
+    if budget > 0 and tokens_after > budget:
+        # Only a profile that must lose entries is reordered; one that fits keeps LinkedIn's order
+        terms = _terms(intent, info.get("title"), info.get("company"))
+        if "experiences" in extended:
+            extended["experiences"] = _rank_experiences(extended["experiences"], terms)
+        if "recentPosts" in extended:
+            extended["recentPosts"] = _rank_posts(extended["recentPosts"], terms)
+        if "education" in extended:
+            extended["education"] = _by_recency(extended["education"], "dateRange")
+        if "awards" in extended:
+            extended["awards"] = _by_recency(extended["awards"], "date")
+        while tokens_after > budget and level + 1 < len(COMPACTION_LEVELS):
+            level += 1
+            compacted = _apply_level(extended, COMPACTION_LEVELS[level])
+            tokens_after = _json_tokens({"profileInfo": info, "extendedProfile": compacted})
+
+    PROFILE_TOKENS.labels("before").observe(tokens_before)
+    PROFILE_TOKENS.labels("after").observe(tokens_after)
+    if level >= 0:
+        PROFILE_COMPACTIONS.inc()
+    return CompactProfile(info, compacted, tokens_before, tokens_after, level)
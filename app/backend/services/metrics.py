@@ -0,0 +1,182 @@
+import bisect
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+# Latency buckets in seconds, tuned for LLM round trips
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Metric:
+    """
+    Shared name/help/label handling. A metric declared with `labelnames` holds
+    one child per label combination (see labels()); otherwise it holds a value itself.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), register: bool = True):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+        self._lock = threading.Lock()
+        if register:
+            REGISTRY.append(self)
+
+    def _child(self) -> "_Metric":
+        """A fresh unregistered, unlabeled metric of the same type for one label combination."""
+        return type(self)(self.name, self.help, register=False)
+
+    def labels(self, *values, **kwargs) -> "_Metric":
+        if kwargs:
+            values = tuple(kwargs[n] for n in self.labelnames)
+        key = tuple(str(v) for v in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._child()
+        return child
+
+    def series(self) -> List[Tuple[Dict[str, str], "_Metric"]]:
+        """(labels, metric) pairs to export."""
+        if not self.labelnames:
+            return [({}, self)]
+        with self._lock:
+            items = list(self._children.items())
+        return [(dict(zip(self.labelnames, key)), child) for key, child in items]
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        """(suffix, extra labels, value) lines for this (unlabeled or child) metric."""
+        return [("", {}, self.snapshot()["value"])]
+
+
+class Histogram(_Metric):
+    """
+    Minimal cumulative histogram (Prometheus semantics) safe to update from any thread.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS,
+                 labelnames: Sequence[str] = (), register: bool = True):
+        super().__init__(name, help_text, labelnames, register)
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+
+    def _child(self) -> "Histogram":
+        return Histogram(self.name, self.help, self.buckets, register=False)
+
+    def observe(self, value: float) -> None:
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            cumulative: List[int] = []
+            running = 0
+            for c in self._counts:
+                running += c
+                cumulative.append(running)
+            return {"buckets": list(zip(self.buckets + (float("inf"),), cumulative)), "sum": self._sum, "count": self._count}
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        snap = self.snapshot()
+        out = [("_bucket", {"le": _format_value(le)}, count) for le, count in snap["buckets"]]
+        out.append(("_sum", {}, snap["sum"]))
+        out.append(("_count", {}, snap["count"]))
+        return out
+
+
+class Gauge(_Metric):
+    """
+    Value that goes up and down (queue depth, in-flight work), safe to update from any thread.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), register: bool = True):
+        super().__init__(name, help_text, labelnames, register)
+        self._value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = value
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {"value": self._value}
+
+
+class Counter(_Metric):
+    """
+    Monotonic count, safe to update from any thread.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), register: bool = True):
+        super().__init__(name, help_text, labelnames, register)
+        self._value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {"value": self._value}
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        f'{k}="' + str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') + '"'
+        for k, v in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def render_prometheus() -> str:
+    """
+    Render every registered metric in the Prometheus text exposition format (0.0.4).
+    """
+    lines: List[str] = []
+    for metric in list(REGISTRY):
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for labels, series in metric.series():
+            for suffix, extra, value in series.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels({**labels, **extra})} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+REGISTRY: List[_Metric] = []
+
+GENERATE_STREAM_TTFT = Histogram(
+    "generate_stream_ttft_seconds",
+    "Time from /api/generate/stream request to the first streamed token",
+)
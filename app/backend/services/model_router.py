@@ -0,0 +1,165 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, TypeVar
+
+from .metrics import DEFAULT_BUCKETS, Counter, Gauge, Histogram
+
+T = TypeVar("T")
+
+MODEL_ATTEMPTS = Counter(
+    "model_attempts_total",
+    "Upstream model attempts by outcome (ok, error, cancelled = lost a hedge race)",
+    labelnames=("router", "model", "outcome"),
+)
+MODEL_LATENCY = Histogram(
+    "model_latency_seconds",
+    "Time for a model attempt to produce its answer (successful attempts only)",
+    DEFAULT_BUCKETS,
+    labelnames=("router", "model"),
+)
+MODEL_LATENCY_EWMA = Gauge(
+    "model_latency_ewma_seconds",
+    "Smoothed per-model latency that decides the model order",
+    labelnames=("router", "model"),
+)
+MODEL_HEDGES = Counter(
+    "model_hedges_total",
+    "Extra model attempts started because earlier ones were slow (slow) or failed (error)",
+    labelnames=("router", "reason"),
+)
+
+
+class ModelRouter:
+    """
+    Ordered model preferences with per-model latency tracking.
+
+    Each model keeps an exponentially weighted moving average of how long it
+    takes to answer, and order() sorts measured models fastest first.
+    Unmeasured models keep their configured rank. A failure counts as
+    `failure_penalty` seconds. A model with no sample for `stale_after`
+    seconds counts as unmeasured again. It then goes back to its configured
+    rank and gets re-measured, so one bad spell does not bury it for good.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        models: Sequence[str],
+        alpha: float = 0.3,
+        stale_after: float = 300.0,
+        failure_penalty: float = 30.0,
+    ):
+        if not models:
+            raise ValueError("ModelRouter needs at least one model")
+        self.name = name
+        self.models = list(dict.fromkeys(models))
+        self.alpha = alpha
+        self.stale_after = stale_after
+        self.failure_penalty = failure_penalty
+        self._ewma: Dict[str, float] = {}
+        self._seen_at: Dict[str, float] = {}
+
+    def latency(self, model: str) -> Optional[float]:
+        """Smoothed latency of `model` in seconds, or None if it has no recent samples."""
+        seen_at = self._seen_at.get(model)
+        if seen_at is None:
+            return None
+        if time.monotonic() - seen_at > self.stale_after:
+            del self._seen_at[model]
+            del self._ewma[model]
+            return None
+        return self._ewma[model]
+
+    def observe(self, model: str, seconds: float) -> None:
+        prev = self.latency(model)
+        value = seconds if prev is None else prev + self.alpha * (seconds - prev)
+        self._ewma[model] = value
+        self._seen_at[model] = time.monotonic()
+        MODEL_LATENCY_EWMA.labels(self.name, model).set(value)
+
+    def observe_failure(self, model: str) -> None:
+        self.observe(model, self.failure_penalty)
+
+    def observe_at_least(self, model: str, seconds: float) -> None:
+        """A cancelled attempt: all we know is the model needed more than `seconds`."""
+        prev = self.latency(model)
+        if prev is None or seconds > prev:
+            self.observe(model, seconds)
+
+    def order(self) -> List[str]:
+        ranked = sorted((m for m in self.models if self.latency(m) is not None), key=self._ewma.__getitem__)
+        for rank, model in enumerate(self.models):
+            if model not in self._ewma:
+                ranked.insert(min(rank, len(ranked)), model)
+        return ranked
+
+    def state(self) -> List[dict]:
+        return [{"model": m, "latency_ewma_s": self.latency(m)} for m in self.order()]
+
+
+async def hedged(
+    router: ModelRouter,
+    attempt: Callable[[str], Awaitable[T]],
+    hedge_after: float,
+    fatal: Callable[[BaseException], bool] = lambda exc: False,
+) -> T:
+    """
+    Run attempt(model) over router.order() and return the first success.
+
+    The preferred model starts alone. If no attempt has finished after
+    `hedge_after` seconds (0 disables hedging), the next model is started
+    next to it. When an attempt fails, the next model is started at once.
+    The first successful result wins and the attempts still running are
+    cancelled. An error for which fatal(exc) is true, such as a rejected API
+    key, is raised at once. If every model fails,
+    the last error is raised.
+    """
+    models = router.order()
+    running: Dict["asyncio.Future[T]", tuple] = {}
+    launched = 0
+    last_error: Optional[BaseException] = None
+
+    def launch(reason: Optional[str]) -> None:
+        nonlocal launched
+        model = models[launched]
+        launched += 1
+        if reason is not None:
+            MODEL_HEDGES.labels(router.name, reason).inc()
+        running[asyncio.ensure_future(attempt(model))] = (model, time.perf_counter())
+
+    launch(None)
+    try:
+        while running:
+            can_hedge = hedge_after > 0 and launched < len(models)
+            done, _ = await asyncio.wait(
+                running, timeout=hedge_after if can_hedge else None, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                launch("slow")
+                continue
+            for task in done:
+                model, started = running.pop(task)
+                elapsed = time.perf_counter() - started
+                exc = task.exception()
+                if exc is None:
+                    router.observe(model, elapsed)
+                    MODEL_ATTEMPTS.labels(router.name, model, "ok").inc()
+                    MODEL_LATENCY.labels(router.name, model).observe(elapsed)
+                    return task.result()
+                MODEL_ATTEMPTS.labels(router.name, model, "error").inc()
+                if fatal(exc):
+                    # Not this model's fault, so its ranking is left alone
+                    raise exc
+                router.observe_failure(model)
+                last_error = exc
+                if launched < len(models):
+                    launch("error")
+        raise last_error
+    finally:
+        for task, (model, started) in running.items():
+            if not task.done():
+                task.cancel()
+                router.observe_at_least(model, time.perf_counter() - started)
+                MODEL_ATTEMPTS.labels(router.name, model, "cancelled").inc()
+        # Let losers run their cleanup (closing streamed responses) before returning
+        await asyncio.gather(*running, return_exceptions=True)
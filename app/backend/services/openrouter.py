@@ -1,40 +1,268 @@
+import json
+import math
 import os
+import time
+from typing import AsyncIterator, Dict
 import httpx
 from fastapi import HTTPException
+from .metrics import GENERATE_STREAM_TTFT, Counter
+from .model_router import ModelRouter, hedged
 from .prompts import get_system_prompt, build_user_content
+from .timing import record_span, span
+from .upstream import Upstream, UpstreamUnavailable, parse_retry_after
 
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
-MODEL = "meta-llama/llama-3.3-8b-instruct:free"
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1").rstrip("/")
+# Ordered preference list; later models are hedges/fallbacks for the ones before them
+MODELS = [m.strip() for m in os.getenv("OPENROUTER_MODELS", "meta-llama/llama-3.3-8b-instruct:free").split(",") if m.strip()]
+MODEL = MODELS[0]
+# Start the next model when no answer (or, when streaming, no first token) has come after this many seconds; 0 = only on errors
+HEDGE_AFTER = float(os.getenv("OPENROUTER_HEDGE_AFTER", "4"))
+# Seconds without a sample after which a model's latency is forgotten and its configured rank restored
+MODEL_LATENCY_STALE_AFTER = float(os.getenv("OPENROUTER_MODEL_LATENCY_STALE_AFTER", "300"))
+TEMPERATURE = 0.85
+MAX_TOKENS = 320
 
-async def generate_message(intent: str | None, profile_info: dict, extended_profile: dict) -> str:
+# Connection pool settings for the shared client (see create_client)
+REQUEST_TIMEOUT = float(os.getenv("OPENROUTER_TIMEOUT", "30"))
+MAX_CONNECTIONS = int(os.getenv("OPENROUTER_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENROUTER_MAX_KEEPALIVE", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("OPENROUTER_KEEPALIVE_EXPIRY", "60"))
+HTTP2 = os.getenv("OPENROUTER_HTTP2", "1").lower() not in ("0", "false", "no")
+
+# Adaptive concurrency and circuit breaker for calls to OpenRouter (see services/upstream.py)
+UPSTREAM_INITIAL_CONCURRENCY = float(os.getenv("OPENROUTER_INITIAL_CONCURRENCY", "16"))
+UPSTREAM_MAX_CONCURRENCY = float(os.getenv("OPENROUTER_MAX_CONCURRENCY", str(MAX_CONNECTIONS)))
+UPSTREAM_QUEUE_TIMEOUT = float(os.getenv("OPENROUTER_QUEUE_TIMEOUT", "10"))
+BREAKER_FAILURES = int(os.getenv("OPENROUTER_BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.getenv("OPENROUTER_BREAKER_RESET", "30"))
+
+OPENROUTER_RESPONSES = Counter(
+    "openrouter_responses_total",
+    "OpenRouter chat/completions responses by HTTP status (\"error\" for transport failures)",
+    labelnames=("status",),
+)
+
+# A failed attempt ranks like one that had to be hedged
+FAILURE_PENALTY = HEDGE_AFTER or REQUEST_TIMEOUT
+# Whole completions and time to first streamed token are ranked separately
+COMPLETION_ROUTER = ModelRouter("completion", MODELS, stale_after=MODEL_LATENCY_STALE_AFTER, failure_penalty=FAILURE_PENALTY)
+STREAM_ROUTER = ModelRouter("stream", MODELS, stale_after=MODEL_LATENCY_STALE_AFTER, failure_penalty=FAILURE_PENALTY)
+
+
+
+def _new_upstream(model: str) -> Upstream:
+    return Upstream(
+        f"openrouter:{model}",
+        initial_limit=UPSTREAM_INITIAL_CONCURRENCY,
+        max_limit=UPSTREAM_MAX_CONCURRENCY,
+        failure_threshold=BREAKER_FAILURES,
+        reset_timeout=BREAKER_RESET,
+    )
+
+
+# One guard per model: a model that keeps failing opens only its own breaker
+# and halves only its own limit, so hedging can still fall back to the others
+OPENROUTER_UPSTREAMS: Dict[str, Upstream] = {model: _new_upstream(model) for model in MODELS}
+
+
+def upstream_for(model: str) -> Upstream:
+    """The guard for calls to `model`, created on first use for models not in MODELS."""
+    upstream = OPENROUTER_UPSTREAMS.get(model)
+    if upstream is None:
+        upstream = OPENROUTER_UPSTREAMS.setdefault(model, _new_upstream(model))
+    return upstream
+
+
+# Surrounding quote/backtick pairs stripped from model output
+QUOTE_PAIRS = {
+    "`": "`",
+    "\"": "\"",
+    "'": "'",
+    "\u201c": "\u201d",  # curly double quotes
+    "\u2018": "\u2019",  # curly single quotes
+    "\u00ab": "\u00bb",  # guillemets
+}
+
+
+def create_client() -> httpx.AsyncClient:
+    """
+    Build a pooled AsyncClient for OpenRouter calls.
+
+    The FastAPI app owns one of these for its whole lifetime so keep-alive
+    connections (and the TLS handshakes behind them) are reused across requests.
+    HTTP/2 is used when the optional `h2` package is installed.
+    """
+    http2 = HTTP2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            http2 = False
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(REQUEST_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        http2=http2,
+    )
+
+
+def _completion_request(intent: str | None, profile_info: dict, extended_profile: dict, stream: bool = False) -> dict:
+    """
+    Return the keyword arguments for a chat/completions POST to MODEL
+    (see _for_model for the other models).
+    """
+    system = get_system_prompt()
+    with span("build_user_content"):
+        user_content = build_user_content(intent, profile_info, extended_profile)
+    body = {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user_content},
+        ],
+        "max_tokens": MAX_TOKENS,
+        "temperature": TEMPERATURE,
+    }
+    if stream:
+        body["stream"] = True
+    return dict(
+        headers={
+            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://salesai-backend",
+            "X-Title": "Sales.ai Backend",
+        },
+        json=body,
+    )
+
+
+def _for_model(request_kwargs: dict, model: str) -> dict:
+    return {**request_kwargs, "json": {**request_kwargs["json"], "model": model}}
+
+
+def _is_fatal(exc: BaseException) -> bool:
+    """Errors that no other model would avoid: the API key was rejected."""
+    return isinstance(exc, HTTPException) and exc.status_code in (401, 403)
+
+
+def _unavailable(exc: UpstreamUnavailable) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=f"OpenRouter temporarily unavailable ({exc.reason})",
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
+
+
+def normalize_message(content: str) -> str:
+    """
+    Normalize whitespace and strip surrounding quotes/backticks if present.
+    """
+    content = " ".join(content.split())
+    if len(content) >= 2:
+        right = QUOTE_PAIRS.get(content[0])
+        if right is not None and content.endswith(right):
+            content = content[1:-1].strip()
+    return content
+
+
+class StreamNormalizer:
+    """
+    Incremental counterpart of normalize_message for streamed deltas.
+
+    Whitespace runs are collapsed as they arrive. Text that opens with a
+    quote is held back: whether normalize_message strips that quote depends
+    on the last character, so the whole message is released by flush() once
+    the stream ends. The model is told not to quote its message, so this is
+    the rare case. Either way the concatenated deltas equal finish().
+    """
+
+    def __init__(self):
+        self._raw: list[str] = []
+        self._leading = True
+        self._holding = False
+        self._pending_space = False
+
+    def feed(self, delta: str) -> str:
+        self._raw.append(delta)
+        if self._holding:
+            return ""
+        out: list[str] = []
+        for ch in delta:
+            if ch.isspace():
+                if not self._leading:
+                    self._pending_space = True
+                continue
+            if self._leading:
+                self._leading = False
+                if ch in QUOTE_PAIRS:
+                    self._holding = True
+                    return ""
+            if self._pending_space:
+                out.append(" ")
+                self._pending_space = False
+            out.append(ch)
+        return "".join(out)
+
+    def flush(self) -> str:
+        """Return the text still owed after the last delta (the whole message if it was held back)."""
+        return self.finish() if self._holding else ""
+
+    def finish(self) -> str:
+        """Return the full message exactly as normalize_message would produce it."""
+        return normalize_message("".join(self._raw))
+
+
+async def generate_message(
+    intent: str | None,
+    profile_info: dict,
+    extended_profile: dict,
+    client: httpx.AsyncClient | None = None,
+) -> str:
     """
     Generate a LinkedIn outreach message using OpenRouter API.
+
+    Models are tried in COMPLETION_ROUTER order and hedged (see
+    model_router.hedged): the first good answer wins. A model whose guard
+    refuses the call (see upstream_for) is skipped like a failed one.
+
+    Pass the application's shared `client`; without one a throwaway client is
+    opened for this call only.
     """
     if not OPENROUTER_API_KEY:
         raise HTTPException(status_code=500, detail="OpenRouter API key not configured on server")
 
-    system = get_system_prompt()
-    user_content = build_user_content(intent, profile_info, extended_profile)
-
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        resp = await client.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://salesai-backend",
-                "X-Title": "Sales.ai Backend",
-            },
-            json={
-                "model": MODEL,
-                "messages": [
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": user_content},
-                ],
-                "max_tokens": 320,
-                "temperature": 0.85,
-            },
-        )
+    request_kwargs = _completion_request(intent, profile_info, extended_profile)
+    url = f"{OPENROUTER_BASE_URL}/chat/completions"
+
+    async def attempt(http: httpx.AsyncClient, model: str) -> str:
+        return await _complete(http, url, _for_model(request_kwargs, model))
+
+    try:
+        with span("upstream"):
+            if client is None:
+                async with create_client() as one_shot:
+                    return await hedged(COMPLETION_ROUTER, lambda m: attempt(one_shot, m), HEDGE_AFTER, _is_fatal)
+            return await hedged(COMPLETION_ROUTER, lambda m: attempt(client, m), HEDGE_AFTER, _is_fatal)
+    except UpstreamUnavailable as e:
+        raise _unavailable(e) from e
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"OpenRouter request failed: {e}") from e
+
+
+async def _complete(client: httpx.AsyncClient, url: str, request_kwargs: dict) -> str:
+    """One non-streamed chat/completions call, returning the normalized message."""
+    async with upstream_for(request_kwargs["json"]["model"]).slot(UPSTREAM_QUEUE_TIMEOUT) as slot:
+        try:
+            resp = await client.post(url, **request_kwargs)
+        except httpx.HTTPError:
+            OPENROUTER_RESPONSES.labels(status="error").inc()
+            raise
+        OPENROUTER_RESPONSES.labels(status=resp.status_code).inc()
+        slot.record(resp.status_code, parse_retry_after(resp.headers.get("Retry-After")))
 
     if resp.status_code >= 400:
         try:
@@ -43,37 +271,133 @@ async def generate_message(intent: str | None, profile_info: dict, extended_prof
             text = ""
         raise HTTPException(status_code=resp.status_code, detail=f"OpenRouter error: {text}")
 
-    data = resp.json()
-    content: str = ""
-    try:
-        choices = data.get("choices", [])
-        if choices:
-            msg = choices[0].get("message", {})
-            c = msg.get("content")
-            if isinstance(c, str):
-                content = c.strip()
-            elif isinstance(c, list):
-                content = "".join(part if isinstance(part, str) else part.get("text", "") for part in c).strip()
-    except Exception:
-        content = ""
+    with span("normalize"):
+        data = resp.json()
+        content: str = ""
+        try:
+            choices = data.get("choices", [])
+            if choices:
+                msg = choices[0].get("message", {})
+                c = msg.get("content")
+                if isinstance(c, str):
+                    content = c.strip()
+                elif isinstance(c, list):
+                    content = "".join(part if isinstance(part, str) else part.get("text", "") for part in c).strip()
+        except Exception:
+            content = ""
+        message = normalize_message(content)
 
     if not content:
         raise HTTPException(status_code=502, detail="No content returned from model")
 
-    # Normalize whitespace and strip surrounding quotes/backticks if present
-    content = " ".join(content.split())
-    if len(content) >= 2:
-        pairs = [
-            ("`", "`"),
-            ("\"", "\""),
-            ("'", "'"),
-            ("", ""),  # alt quotes if any
-            ("", ""),
-            ("", ""),
-        ]
-        for left, right in pairs:
-            if content.startswith(left) and content.endswith(right):
-                content = content[len(left):-len(right)].strip()
-                break
-    
-    return content
+    return message
+
+
+async def stream_message(
+    intent: str | None,
+    profile_info: dict,
+    extended_profile: dict,
+    client: httpx.AsyncClient,
+) -> AsyncIterator[dict]:
+    """
+    Stream a message from OpenRouter (`stream: true`) as normalized deltas.
+
+    Yields {"delta": str} events followed by one final
+    {"message": str, "ttft_ms": float | None} event carrying the fully
+    normalized text, identical to what generate_message would return.
+    Models are hedged on their first token (STREAM_ROUTER order); the model
+    that produces output first is streamed and the others are cancelled.
+    Errors before the first event raise HTTPException (transport errors as 502).
+    """
+    if not OPENROUTER_API_KEY:
+        raise HTTPException(status_code=500, detail="OpenRouter API key not configured on server")
+
+    request_kwargs = _completion_request(intent, profile_info, extended_profile, stream=True)
+    url = f"{OPENROUTER_BASE_URL}/chat/completions"
+    started = time.perf_counter()
+
+    async def attempt(model: str) -> tuple[AsyncIterator[dict], dict]:
+        events = _stream_completion(client, url, _for_model(request_kwargs, model), started)
+        try:
+            return events, await events.__anext__()
+        except BaseException:
+            await events.aclose()
+            raise
+
+    try:
+        events, first = await hedged(STREAM_ROUTER, attempt, HEDGE_AFTER, _is_fatal)
+    except UpstreamUnavailable as e:
+        raise _unavailable(e) from e
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"OpenRouter stream failed: {e}") from e
+    # Until the winning model's first event; the rest is covered by the request duration
+    record_span("upstream", time.perf_counter() - started)
+    try:
+        yield first
+        async for event in events:
+            yield event
+    finally:
+        await events.aclose()
+
+
+async def _stream_completion(
+    client: httpx.AsyncClient,
+    url: str,
+    request_kwargs: dict,
+    started: float,
+) -> AsyncIterator[dict]:
+    """One streamed chat/completions call, yielding the events described in stream_message."""
+    ttft: float | None = None
+    normalizer = StreamNormalizer()
+
+    resp = None
+    try:
+        # The slot is held for the whole stream, so the concurrency limit counts open streams
+        async with upstream_for(request_kwargs["json"]["model"]).slot(UPSTREAM_QUEUE_TIMEOUT) as slot, \
+                client.stream("POST", url, **request_kwargs) as resp:
+            OPENROUTER_RESPONSES.labels(status=resp.status_code).inc()
+            slot.record(resp.status_code, parse_retry_after(resp.headers.get("Retry-After")))
+            if resp.status_code >= 400:
+                try:
+                    text = (await resp.aread()).decode("utf-8", "replace")[:300]
+                except Exception:
+                    text = ""
+                raise HTTPException(status_code=resp.status_code, detail=f"OpenRouter error: {text}")
+
+            async for line in resp.aiter_lines():
+                # SSE comments (": OPENROUTER PROCESSING") and blank keep-alives
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                    choices = chunk.get("choices") or []
+                    piece = (choices[0].get("delta") or {}).get("content") if choices else None
+                except (ValueError, AttributeError):
+                    continue
+                if not isinstance(piece, str) or not piece:
+                    continue
+                delta = normalizer.feed(piece)
+                if not delta:
+                    continue
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                    GENERATE_STREAM_TTFT.observe(ttft)
+                yield {"delta": delta}
+    except httpx.HTTPError:
+        if resp is None:
+            OPENROUTER_RESPONSES.labels(status="error").inc()
+        raise
+
+    message = normalizer.finish()
+    if not message:
+        raise HTTPException(status_code=502, detail="No content returned from model")
+    tail = normalizer.flush()
+    if tail:
+        if ttft is None:
+            ttft = time.perf_counter() - started
+            GENERATE_STREAM_TTFT.observe(ttft)
+        yield {"delta": tail}
+    yield {"message": message, "ttft_ms": round(ttft * 1000.0, 1) if ttft is not None else None}
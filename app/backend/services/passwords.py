@@ -0,0 +1,124 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple, TypeVar
+
+from passlib.context import CryptContext
+
+from .metrics import Counter, Gauge, Histogram
+
+# bcrypt cost factor for new hashes; existing hashes with another cost are
+# upgraded on the next successful login (see PasswordHasher.verify_and_update)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Hashes/verifies allowed to run at once; bcrypt is pure CPU, so more than the
+# core count only adds latency to every login in flight
+PASSWORD_HASH_CONCURRENCY = int(os.getenv("PASSWORD_HASH_CONCURRENCY", str(os.cpu_count() or 1)))
+
+# Buckets around bcrypt's cost (~0.25 s at 12 rounds) plus queueing on top
+HASH_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PASSWORD_HASH_QUEUE_DEPTH = Gauge(
+    "password_hash_queue_depth",
+    "Password hash/verify calls waiting for a hashing slot",
+)
+PASSWORD_HASH_IN_FLIGHT = Gauge(
+    "password_hash_in_flight",
+    "Password hash/verify calls running on the hashing pool",
+)
+PASSWORD_HASH_WAIT = Histogram(
+    "password_hash_wait_seconds",
+    "Time a password hash/verify waited for a hashing slot",
+    HASH_BUCKETS,
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "Time spent hashing or verifying a password on the hashing pool",
+    HASH_BUCKETS,
+)
+PASSWORD_REHASH_TOTAL = Counter(
+    "password_rehash_total",
+    "Logins whose stored password hash was rehashed with the current bcrypt settings",
+)
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+T = TypeVar("T")
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated, bounded thread pool so it never blocks the event loop.
+
+    bcrypt releases the GIL while it works, so hashes on the pool run in
+    parallel with each other and with request handling. Callers past the
+    concurrency limit wait on a semaphore (not in the executor queue) so the
+    backlog is visible as a gauge and a cancelled request never reaches bcrypt.
+
+    The pool and semaphore are created on first use in an event loop and
+    dropped by shutdown(), so each app lifespan (and each loop) gets its own.
+    """
+
+    def __init__(self, context: CryptContext, concurrency: int):
+        self.context = context
+        self.concurrency = max(1, concurrency)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _start(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="bcrypt")
+        if self._slots is None or self._slots_loop is not loop:
+            # asyncio.Semaphore binds to the loop it is first awaited on
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._slots_loop = loop
+
+    async def _run(self, fn: Callable[..., T], *args) -> T:
+        loop = asyncio.get_running_loop()
+        self._start(loop)
+        executor, slots = self._executor, self._slots
+        queued_at = time.perf_counter()
+        PASSWORD_HASH_QUEUE_DEPTH.inc()
+        waiting = True
+        try:
+            async with slots:
+                PASSWORD_HASH_QUEUE_DEPTH.dec()
+                waiting = False
+                started = time.perf_counter()
+                PASSWORD_HASH_WAIT.observe(started - queued_at)
+                PASSWORD_HASH_IN_FLIGHT.inc()
+                try:
+                    return await loop.run_in_executor(executor, fn, *args)
+                finally:
+                    PASSWORD_HASH_IN_FLIGHT.dec()
+                    PASSWORD_HASH_DURATION.observe(time.perf_counter() - started)
+        finally:
+            if waiting:
+                PASSWORD_HASH_QUEUE_DEPTH.dec()
+
+    async def hash(self, password: str) -> str:
+        """Hash `password` with the current settings."""
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """
+        Check `password` against `hashed`.
+
+        Returns (ok, new_hash): new_hash is set when the password matched but
+        the stored hash uses outdated settings and should be replaced.
+        """
+        ok, new_hash = await self._run(self.context.verify_and_update, password, hashed)
+        if new_hash:
+            PASSWORD_REHASH_TOTAL.inc()
+        return ok, new_hash
+
+    def shutdown(self) -> None:
+        """Stop the hashing pool; the next hash or verify starts a fresh pool and semaphore."""
+        executor, self._executor = self._executor, None
+        self._slots = self._slots_loop = None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+password_hasher = PasswordHasher(pwd_context, PASSWORD_HASH_CONCURRENCY)
@@ -0,0 +1,111 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from .metrics import Gauge, Histogram
+
+# Send a Server-Timing header with each response's spans (set to 0 to disable)
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1").lower() not in ("0", "false", "no")
+
+# Spans range from sub-millisecond prompt building to multi-second upstream calls
+SPAN_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time to serve an HTTP request, until the last body chunk is sent",
+    SPAN_BUCKETS,
+    labelnames=("method", "route", "status"),
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served",
+)
+SPAN_DURATION = Histogram(
+    "span_duration_seconds",
+    "Time spent in named steps of request handling (prompt building, upstream call, normalization)",
+    SPAN_BUCKETS,
+    labelnames=("span",),
+)
+
+# Spans recorded for the current request, in completion order
+_request_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_spans", default=None)
+
+
+def record_span(name: str, seconds: float) -> None:
+    """
+    Record a finished step: always into SPAN_DURATION, and into the current
+    request's Server-Timing list when called inside a request.
+    """
+    SPAN_DURATION.labels(span=name).observe(seconds)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((name, seconds))
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the enclosed block as span `name` (see record_span)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - started)
+
+
+def server_timing(spans: List[Tuple[str, float]], total: float) -> str:
+    """Format spans plus the elapsed app time as a Server-Timing header value (milliseconds)."""
+    parts = [f"{name};dur={seconds * 1000.0:.2f}" for name, seconds in spans]
+    parts.append(f"app;dur={total * 1000.0:.2f}")
+    return ", ".join(parts)
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware that times every HTTP request.
+
+    Each request gets its own span list through a context variable, so spans
+    recorded by handlers and services (services.timing.span) show up in the
+    Server-Timing header without passing anything around. Only spans finished
+    before the response starts are included; streamed bodies are covered by
+    http_request_duration_seconds.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        spans: List[Tuple[str, float]] = []
+        token = _request_spans.set(spans)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING:
+                    headers = list(message.get("headers", []))
+                    value = server_timing(spans, time.perf_counter() - started)
+                    headers.append((b"server-timing", value.encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            _request_spans.reset(token)
+            # Route template, not the raw path, to keep label cardinality bounded
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+            ).observe(time.perf_counter() - started)
@@ -0,0 +1,376 @@
+import asyncio
+import email.utils
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Iterator, List, Optional, Tuple
+
+from .metrics import Counter, Gauge
+
+# Circuit breaker states
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+# Call outcomes, see outcome_for()
+OK = "ok"
+CLIENT_ERROR = "client_error"  # 4xx other than 429: the provider is up, the request was bad
+OVERLOADED = "overloaded"  # 429
+FAILED = "failed"  # 5xx, timeout or connection error
+ABANDONED = "abandoned"  # cancelled by the caller before an answer
+
+UPSTREAM_CONCURRENCY_LIMIT = Gauge(
+    "upstream_concurrency_limit",
+    "Current adaptive (AIMD) limit on concurrent calls to the provider",
+    labelnames=("upstream",),
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "upstream_in_flight",
+    "Calls to the provider currently holding a slot",
+    labelnames=("upstream",),
+)
+UPSTREAM_CIRCUIT_STATE = Gauge(
+    "upstream_circuit_state",
+    "Circuit breaker state: 0 closed, 1 half-open, 2 open",
+    labelnames=("upstream",),
+)
+UPSTREAM_OUTCOMES = Counter(
+    "upstream_outcomes_total",
+    "Finished provider calls by outcome (ok, client_error, overloaded, failed, abandoned)",
+    labelnames=("upstream", "outcome"),
+)
+UPSTREAM_REJECTED = Counter(
+    "upstream_rejected_total",
+    "Calls refused without reaching the provider, by reason (open, retry_after, saturated)",
+    labelnames=("upstream", "reason"),
+)
+
+_CIRCUIT_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """Seconds to wait from a Retry-After header value (delta-seconds or an HTTP date)."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def outcome_for(status: Optional[int]) -> str:
+    """Classify a response status; None means no response at all."""
+    if status is None or status == 408 or status >= 500:
+        return FAILED
+    if status == 429:
+        return OVERLOADED
+    if status >= 400:
+        return CLIENT_ERROR
+    return OK
+
+
+def _status_of(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _retry_after_of(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or getattr(exc, "headers", None)
+    return parse_retry_after(headers.get("Retry-After")) if headers else None
+
+
+class UpstreamUnavailable(Exception):
+    """A call was refused locally: breaker open, Retry-After pending, or no free slot in time."""
+
+    def __init__(self, name: str, reason: str, retry_after: float):
+        super().__init__(f"{name} unavailable ({reason}); retry in {retry_after:.1f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AIMDLimit:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit.
+
+    A success made while the limit was fully used raises it by 1/limit
+    (about +1 per limit's worth of calls). Within one slot of the limit at
+    which the last overload happened, it grows `probe_step` times as fast,
+    so the limit does not keep hitting the same ceiling. An overload signal
+    (429) multiplies it by `backoff`. Calls admitted before the last decrease
+    were sent at the old limit, so their errors are ignored.
+    """
+
+    def __init__(self, initial: float, min_limit: float = 1.0, max_limit: float = 64.0,
+                 backoff: float = 0.5, probe_step: float = 0.1):
+        self.min_limit = min_limit
+        self.max_limit = max(min_limit, max_limit)
+        self.limit = min(self.max_limit, max(min_limit, initial))
+        self.backoff = backoff
+        self.probe_step = probe_step
+        self.ceiling: Optional[float] = None
+        self._decreased_at = float("-inf")
+
+    def on_success(self, saturated: bool) -> None:
+        if saturated:
+            near_ceiling = self.ceiling is not None and self.limit + 1.0 > self.ceiling
+            step = self.probe_step if near_ceiling else 1.0
+            self.limit = min(self.max_limit, self.limit + step / self.limit)
+
+    def on_overload(self, admitted_at: float) -> None:
+        if admitted_at < self._decreased_at:
+            return
+        self.ceiling = self.limit
+        self._decreased_at = time.monotonic()
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and refuses calls
+    for `reset_timeout` seconds (longer if the provider sent Retry-After).
+    Then one probe call is let through (half-open): success closes the
+    breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self._opened_until = 0.0
+        self._probing = False
+
+    def admit(self) -> Optional[float]:
+        """Take permission for one call: None if granted, else seconds until asking again makes sense."""
+        if self.state == OPEN:
+            remaining = self._opened_until - time.monotonic()
+            if remaining > 0:
+                return remaining
+            self.state = HALF_OPEN
+            self._probing = False
+        if self.state == HALF_OPEN:
+            if self._probing:
+                return min(1.0, self.reset_timeout)
+            self._probing = True
+        return None
+
+    def open_for(self) -> float:
+        return max(0.0, self._opened_until - time.monotonic()) if self.state == OPEN else 0.0
+
+    def on_success(self) -> None:
+        self.failures = 0
+        self.state = CLOSED
+        self._probing = False
+
+    def on_failure(self, retry_after: Optional[float] = None) -> None:
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = OPEN
+            self.trips += 1
+            self._probing = False
+            self._opened_until = time.monotonic() + max(self.reset_timeout, retry_after or 0.0)
+
+    def on_neutral(self) -> None:
+        """The call says nothing about provider health (429, cancelled): free the probe."""
+        self._probing = False
+
+
+class Slot:
+    """One admitted call. record() the response status; an exception records itself."""
+
+    def __init__(self, upstream: "Upstream"):
+        self.upstream = upstream
+        self.admitted_at = time.monotonic()
+        self.outcome: Optional[str] = None
+        self.retry_after: Optional[float] = None
+
+    def record(self, status: Optional[int], retry_after: Optional[float] = None) -> None:
+        if self.outcome is None:
+            self.outcome = outcome_for(status)
+            self.retry_after = retry_after
+
+    def _record_exception(self, exc: BaseException) -> None:
+        if isinstance(exc, (asyncio.CancelledError, GeneratorExit, KeyboardInterrupt)):
+            if self.outcome is None:
+                self.outcome = ABANDONED
+        else:
+            self.record(self.upstream.status_of(exc), self.upstream.retry_after_of(exc))
+
+
+class Upstream:
+    """
+    Client-side guard for one provider, shared by every caller in the process.
+
+    Calls go through slot() (async) or slot_sync() (threads):
+    - An AIMD limit caps how many calls are in flight. A 429 halves the cap
+      and successes grow it back, so load settles near what the provider
+      can actually serve. 5xx and timeouts are left to the breaker: a few
+      sporadic ones say nothing about how much load is too much.
+    - A Retry-After hint holds every new call until it passes.
+    - A circuit breaker refuses calls while the provider keeps failing.
+      Async callers get UpstreamUnavailable at once, while threads wait by
+      default. state() reports the limit, breaker and hold for health
+      endpoints and progress output.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: float = 8,
+        max_limit: float = 64,
+        min_limit: float = 1,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        status_of: Callable[[BaseException], Optional[int]] = _status_of,
+        retry_after_of: Callable[[BaseException], Optional[float]] = _retry_after_of,
+    ):
+        self.name = name
+        self.limit = AIMDLimit(initial_limit, min_limit=min_limit, max_limit=max_limit)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.status_of = status_of
+        self.retry_after_of = retry_after_of
+        self.in_flight = 0
+        self._hold_until = 0.0
+        self._cond = threading.Condition()
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, "asyncio.Future[None]"]] = []
+        self._publish()
+
+    def _admit(self) -> Tuple[Optional[str], float]:
+        """Under the lock: (None, 0) when a slot was taken, else (reason, seconds to wait or 0 = until a release)."""
+        hold = self._hold_until - time.monotonic()
+        if hold > 0:
+            return "retry_after", hold
+        if self.in_flight >= int(self.limit.limit):
+            return "saturated", 0.0
+        wait = self.breaker.admit()
+        if wait is not None:
+            return "open", wait
+        self.in_flight += 1
+        self._publish()
+        return None, 0.0
+
+    def _reject(self, reason: str, wait: float) -> UpstreamUnavailable:
+        UPSTREAM_REJECTED.labels(self.name, reason).inc()
+        return UpstreamUnavailable(self.name, reason, wait)
+
+    def acquire(self, max_wait: Optional[float] = None, fail_fast: bool = False) -> None:
+        """Block until a slot is free (at most `max_wait` seconds; None = no limit)."""
+        deadline = None if max_wait is None else time.monotonic() + max_wait
+        with self._cond:
+            while True:
+                reason, wait = self._admit()
+                if reason is None:
+                    return
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if (fail_fast and reason == "open") or (remaining is not None and remaining <= 0):
+                    raise self._reject(reason, wait)
+                timeouts = [t for t in (wait or None, remaining) if t is not None]
+                self._cond.wait(min(timeouts) if timeouts else None)
+
+    async def acquire_async(self, max_wait: float, fail_fast: bool = True) -> None:
+        """Wait up to `max_wait` seconds for a slot without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_wait
+        while True:
+            with self._cond:
+                reason, wait = self._admit()
+                if reason is None:
+                    return
+                remaining = deadline - loop.time()
+                if (fail_fast and reason == "open") or remaining <= 0 or wait > remaining:
+                    raise self._reject(reason, wait)
+                waiter = (loop, loop.create_future())
+                self._async_waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter[1], timeout=wait or remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._cond:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+
+    def release(self, outcome: str, retry_after: Optional[float] = None, admitted_at: float = float("inf")) -> None:
+        with self._cond:
+            saturated = self.in_flight >= int(self.limit.limit)
+            self.in_flight -= 1
+            if outcome == OK:
+                self.limit.on_success(saturated)
+                self.breaker.on_success()
+            elif outcome == CLIENT_ERROR:
+                self.breaker.on_success()
+            elif outcome == OVERLOADED:
+                self.limit.on_overload(admitted_at)
+                self.breaker.on_neutral()
+            elif outcome == FAILED:
+                self.breaker.on_failure(retry_after)
+            else:
+                self.breaker.on_neutral()
+            if retry_after:
+                self._hold_until = max(self._hold_until, time.monotonic() + retry_after)
+            self._publish()
+            self._cond.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        UPSTREAM_OUTCOMES.labels(self.name, outcome).inc()
+        for loop, fut in waiters:
+            loop.call_soon_threadsafe(_wake, fut)
+
+    @asynccontextmanager
+    async def slot(self, max_wait: float = 10.0) -> AsyncIterator[Slot]:
+        await self.acquire_async(max_wait)
+        slot = Slot(self)
+        try:
+            yield slot
+        except BaseException as exc:
+            slot._record_exception(exc)
+            raise
+        finally:
+            slot.record(200)
+            self.release(slot.outcome, slot.retry_after, slot.admitted_at)
+
+    @contextmanager
+    def slot_sync(self, max_wait: Optional[float] = None) -> Iterator[Slot]:
+        self.acquire(max_wait)
+        slot = Slot(self)
+        try:
+            yield slot
+        except BaseException as exc:
+            slot._record_exception(exc)
+            raise
+        finally:
+            slot.record(200)
+            self.release(slot.outcome, slot.retry_after, slot.admitted_at)
+
+    def _publish(self) -> None:
+        UPSTREAM_CONCURRENCY_LIMIT.labels(self.name).set(self.limit.limit)
+        UPSTREAM_IN_FLIGHT.labels(self.name).set(self.in_flight)
+        UPSTREAM_CIRCUIT_STATE.labels(self.name).set(_CIRCUIT_STATE_VALUES[self.breaker.state])
+
+    def state(self) -> dict:
+        with self._cond:
+            return {
+                "circuit": self.breaker.state,
+                "circuit_open_for_s": round(self.breaker.open_for(), 1),
+                "consecutive_failures": self.breaker.failures,
+                "trips": self.breaker.trips,
+                "concurrency_limit": round(self.limit.limit, 2),
+                "in_flight": self.in_flight,
+                "retry_after_s": round(max(0.0, self._hold_until - time.monotonic()), 1),
+            }
+
+
+def _wake(fut: "asyncio.Future[None]") -> None:
+    if not fut.done():
+        fut.set_result(None)
@@ -0,0 +1,74 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Read at import time by database.py, services.openrouter and services.passwords,
+# so set before any test module imports them. Never touch the checked-in genreach.db.
+_TMP_DIR = tempfile.mkdtemp(prefix="salesai-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP_DIR, 'test.db')}"
+os.environ["OPENROUTER_API_KEY"] = "test-key"
+os.environ["OPENROUTER_BASE_URL"] = "http://openrouter.test/api/v1"
+os.environ["GENERATE_CACHE_DB"] = ""
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+MESSAGE = "Hi Sam, loved your post on payments infra. Open to a 10 min chat next week?"
+
+
+@pytest.fixture
+def completion():
+    """Build an OpenRouter chat/completions response body."""
+    def body(content: str = MESSAGE) -> dict:
+        return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+    return body
+
+
+@pytest.fixture
+def profile():
+    return (
+        {"name": "Sam Lee", "title": "VP Payments", "company": "Acme"},
+        {"about": "Payments infrastructure.", "experiences": [{"title": "VP Payments", "company": "Acme"}]},
+    )
+
+
+@pytest.fixture(autouse=True)
+def fresh_openrouter(monkeypatch):
+    """Give every test its own model rankings and upstream guards, so failures in one cannot trip another."""
+    from services import openrouter
+    from services.model_router import ModelRouter
+
+    for name in ("COMPLETION_ROUTER", "STREAM_ROUTER"):
+        router = getattr(openrouter, name)
+        monkeypatch.setattr(openrouter, name, ModelRouter(router.name, router.models, failure_penalty=router.failure_penalty))
+    monkeypatch.setattr(openrouter, "OPENROUTER_UPSTREAMS", {})
+
+
+@pytest.fixture
+def api():
+    """
+    Start the app with its OpenRouter client replaced by one whose requests
+    are answered by `handler` (an httpx.MockTransport handler).
+    """
+    import httpx
+    from fastapi.testclient import TestClient
+
+    import main
+
+    clients = []
+
+    def start(handler) -> TestClient:
+        upstream = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        main.app.dependency_overrides[main.get_http_client] = lambda: upstream
+        client = TestClient(main.app)
+        client.__enter__()
+        clients.append(client)
+        return client
+
+    yield start
+    for client in clients:
+        client.__exit__(None, None, None)
+    main.app.dependency_overrides.clear()
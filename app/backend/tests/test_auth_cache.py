@@ -0,0 +1,59 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+import auth
+from database import SessionLocal, User
+
+
+@pytest.fixture
+def user():
+    username = f"cached-{uuid.uuid4().hex[:8]}"
+    with SessionLocal() as db:
+        db.add(User(username=username, email=f"{username}@example.com", hashed_password="x"))
+        db.commit()
+    return username
+
+
+def current_user(token: str) -> User:
+    return asyncio.run(auth.get_current_user(token))
+
+
+def test_repeat_lookups_are_served_from_the_cache(user):
+    token = auth.create_access_token({"sub": user})
+    hits, misses = auth.USER_CACHE_HITS.snapshot()["value"], auth.USER_CACHE_MISSES.snapshot()["value"]
+
+    first = current_user(token)
+    second = current_user(token)
+
+    assert first.username == second.username == user
+    assert second is first  # the same detached instance is shared between requests
+    assert (auth.USER_CACHE_HITS.snapshot()["value"] - hits, auth.USER_CACHE_MISSES.snapshot()["value"] - misses) == (1, 1)
+
+
+def test_deactivation_is_seen_on_the_next_request(user):
+    token = auth.create_access_token({"sub": user})
+    assert current_user(token).is_active
+    assert asyncio.run(auth.deactivate_user(user))
+    with pytest.raises(HTTPException) as exc:
+        current_user(token)
+    assert exc.value.status_code == 401
+
+
+def test_invalid_tokens_are_rejected():
+    with pytest.raises(HTTPException):
+        current_user("not-a-jwt")
+    with pytest.raises(HTTPException):
+        current_user(auth.create_access_token({"sub": "nobody"}))
+
+
+def test_lru_cache_holds_any_value():
+    cache = auth.LRUCache(2, 60)
+    marker = object()
+    cache.set("a", marker)
+    cache.set("b", ("tuple", 1))
+    assert cache.get("a") is marker
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("c") == 3
@@ -0,0 +1,32 @@
+import json
+
+import httpx
+
+
+def item(name: str) -> dict:
+    return {"intent": "Intro", "profileInfo": {"name": name}, "extendedProfile": {}}
+
+
+def test_batch_streams_a_line_per_item_even_when_one_fails(api, completion):
+    def handler(request: httpx.Request) -> httpx.Response:
+        if "Broken" in request.content.decode():
+            return httpx.Response(200, content=b"<html>not json</html>")
+        if "Refused" in request.content.decode():
+            return httpx.Response(401, json={"error": {"message": "bad key"}})
+        return httpx.Response(200, json=completion())
+
+    client = api(handler)
+    names = ["Ana", "Broken", "Refused", "Ben"]
+    resp = client.post("/api/generate/batch", json={"items": [item(n) for n in names]})
+    assert resp.status_code == 200
+    lines = {line["index"]: line for line in map(json.loads, resp.text.splitlines())}
+    assert sorted(lines) == [0, 1, 2, 3]
+    assert lines[0]["status"] == lines[3]["status"] == "ok"
+    assert (lines[1]["status"], lines[1]["code"]) == ("error", 500)
+    assert (lines[2]["status"], lines[2]["code"]) == ("error", 401)
+
+
+def test_batch_rejects_empty_and_oversized_requests(api):
+    client = api(lambda request: httpx.Response(500))
+    assert client.post("/api/generate/batch", json={"items": []}).status_code == 422
+    assert client.post("/api/generate/batch", json={"items": [item("x")] * 201}).status_code == 422
@@ -0,0 +1,89 @@
+import asyncio
+
+from services.cache import (
+    CACHE_BYPASS,
+    CACHE_HIT,
+    CACHE_MISS,
+    LRUCache,
+    ResponseCache,
+    SQLiteCache,
+    cache_key,
+)
+
+
+def test_cache_key_is_canonical():
+    info = {"name": "Sam", "title": "PM"}
+    reordered = {"title": "PM", "name": "Sam"}
+    models = ("model-a", "model-b")
+    key = cache_key("Intro", info, {}, models, 0.85)
+    assert key == cache_key("Intro", reordered, {}, list(models), 0.85)
+    assert key != cache_key("Intro", info, {}, ("model-b", "model-a"), 0.85)
+    assert key != cache_key("Intro", info, {}, ("model-a",), 0.85)  # a fallback can answer, so it counts
+    assert key != cache_key("Intro", info, {}, models, 0.5)
+    assert key != cache_key("Other intent", info, {}, models, 0.85)
+
+
+def test_lru_evicts_least_recently_used_and_expires():
+    lru = LRUCache(max_size=2, ttl=60)
+    lru.set("a", "1")
+    lru.set("b", "2")
+    assert lru.get("a") == "1"
+    lru.set("c", "3")
+    assert lru.get("b") is None
+    assert lru.get("a") == "1"
+    lru.set("d", "4", ttl=-1)
+    assert lru.get("d") is None
+
+
+def test_get_or_generate_statuses():
+    calls = []
+
+    async def produce():
+        calls.append(1)
+        return f"message {len(calls)}"
+
+    async def run():
+        cache = ResponseCache(LRUCache(8, 60))
+        first = await cache.get_or_generate("k", produce)
+        second = await cache.get_or_generate("k", produce)
+        fresh = await cache.get_or_generate("k", produce, bypass=True)
+        after = await cache.get_or_generate("k", produce)
+        return first, second, fresh, after
+
+    first, second, fresh, after = asyncio.run(run())
+    assert first == ("message 1", CACHE_MISS)
+    assert second == ("message 1", CACHE_HIT)
+    assert fresh == ("message 2", CACHE_BYPASS)
+    assert after == ("message 2", CACHE_HIT)
+
+
+def test_concurrent_misses_share_one_upstream_call():
+    calls = []
+
+    async def produce():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "shared"
+
+    async def run():
+        cache = ResponseCache(LRUCache(8, 60))
+        return await asyncio.gather(*(cache.get_or_generate("k", produce) for _ in range(10)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert {value for value, _ in results} == {"shared"}
+    assert sorted(status for _, status in results).count(CACHE_MISS) == 1
+
+
+def test_sqlite_tier_survives_a_new_memory_cache(tmp_path):
+    db = str(tmp_path / "cache.db")
+
+    async def produce():
+        return "persisted"
+
+    async def run():
+        await ResponseCache(LRUCache(8, 60), SQLiteCache(db, 60)).get_or_generate("k", produce)
+        restarted = ResponseCache(LRUCache(8, 60), SQLiteCache(db, 60))
+        return await restarted.get_or_generate("k", produce)
+
+    assert asyncio.run(run()) == ("persisted", CACHE_HIT)
@@ -0,0 +1,76 @@
+import os
+import sys
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from bench_profile_compaction import INTENT, synthetic_profile  # noqa: E402
+
+from services.compaction import COMPACTION_LEVELS, clip, compact_profile, estimate_tokens  # noqa: E402
+
+INFO = {"name": "Sam Lee", "title": "VP Payments", "company": "Acme"}
+
+
+def test_estimate_tokens_counts_words_numbers_and_punctuation():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("Hi, Sam!") == 4
+    assert estimate_tokens("infrastructure") == 3  # chunks of up to 6 letters
+    assert estimate_tokens("up 2024") == 2
+
+
+def test_clip_cuts_at_a_word_boundary():
+    assert clip("short", 10) == "short"
+    assert clip("payments platform infrastructure", 20) == "payments platform..."
+    assert clip("pay infrastructure", 12) == "pay infrastr..."  # no space late enough: hard cut
+
+
+def test_profile_within_budget_keeps_its_order():
+    extended = {
+        "about": "  Builds   payments infra. ",
+        "experiences": [
+            {"title": "Engineer", "company": "Old Co", "dateRange": "2010 - 2012"},
+            {"title": "VP Payments", "company": "Acme", "dateRange": "2021 - Present", "description": ""},
+        ],
+        "recentPosts": [{"text": "Hello"}, {"text": "We cut payment latency 40% this quarter across every region."}],
+        "education": [{"school": "Old U", "dateRange": "1998 - 2002"}, {"school": "New U", "dateRange": "2010 - 2012"}],
+    }
+
+    compact = compact_profile(INTENT, INFO, extended, budget=1000)
+
+    assert compact.level == -1
+    assert compact.tokens_after <= 1000
+    assert compact.extended_profile["about"] == "Builds payments infra."
+    assert compact.extended_profile["experiences"] == [
+        {"title": "Engineer", "company": "Old Co", "dateRange": "2010 - 2012"},
+        {"title": "VP Payments", "company": "Acme", "dateRange": "2021 - Present"},
+    ]
+    assert compact.extended_profile["recentPosts"] == extended["recentPosts"]
+    assert [e["school"] for e in compact.extended_profile["education"]] == ["Old U", "New U"]
+
+
+def test_over_budget_profile_is_ranked_and_truncated():
+    info, extended = synthetic_profile(20, seed=7)
+
+    compact = compact_profile(INTENT, info, extended, budget=600)
+
+    assert compact.level >= 0
+    assert compact.tokens_after < compact.tokens_before
+    experiences = compact.extended_profile["experiences"]
+    assert len(experiences) <= COMPACTION_LEVELS[compact.level][0]
+    assert experiences[0]["dateRange"] == "Jan 2021 - Present"  # the current role leads
+    education = compact.extended_profile["education"]
+    assert education[0] == extended["education"][0]  # most recent school
+
+
+def test_tightest_level_is_used_even_if_it_does_not_fit():
+    info, extended = synthetic_profile(50, seed=7)
+    compact = compact_profile(INTENT, info, extended, budget=10)
+    assert compact.level == len(COMPACTION_LEVELS) - 1
+    assert compact.tokens_after > 10
+
+
+def test_zero_budget_disables_compaction():
+    info, extended = synthetic_profile(20, seed=7)
+    compact = compact_profile(INTENT, info, extended, budget=0)
+    assert compact.level == -1
+    assert compact.extended_profile["experiences"] == extended["experiences"]
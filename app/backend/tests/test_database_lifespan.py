@@ -0,0 +1,35 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import main
+from auth import create_access_token
+from database import SessionLocal, User, run_in_session, shutdown_db
+
+
+def add_user(username: str) -> None:
+    with SessionLocal() as db:
+        db.add(User(username=username, email=f"{username}@example.com", hashed_password="x"))
+        db.commit()
+
+
+def count_users(db) -> int:
+    return db.query(User).count()
+
+
+def test_run_in_session_works_again_after_shutdown():
+    before = asyncio.run(run_in_session(count_users))
+    shutdown_db()
+    add_user("after-shutdown")
+    assert asyncio.run(run_in_session(count_users)) == before + 1
+
+
+def test_database_survives_successive_lifespans():
+    for n in range(2):
+        username = f"lifespan-{n}"
+        add_user(username)
+        token = create_access_token({"sub": username})
+        with TestClient(main.app) as client:
+            resp = client.get("/me", headers={"Authorization": f"Bearer {token}"})
+        assert resp.status_code == 200, resp.text
+        assert resp.json()["username"] == username
@@ -0,0 +1,50 @@
+from services.metrics import REGISTRY, Counter, Gauge, Histogram, render_prometheus
+
+
+def test_labeled_children_keep_type_and_buckets():
+    hist = Histogram("test_child_seconds", "h", (0.1, 1.0), labelnames=("route",), register=False)
+    counter = Counter("test_child_total", "c", labelnames=("status",), register=False)
+    gauge = Gauge("test_child_depth", "g", labelnames=("queue",), register=False)
+
+    assert type(hist.labels("/a")) is Histogram and hist.labels("/a").buckets == (0.1, 1.0)
+    assert type(counter.labels(status=200)) is Counter
+    assert type(gauge.labels("q")) is Gauge
+    assert hist.labels("/a") is hist.labels(route="/a")
+    assert not any(m.name.startswith("test_child") for m in REGISTRY)
+
+
+def test_prometheus_text_format():
+    hist = Histogram("test_render_seconds", "Render test", (0.1, 1.0), labelnames=("route",))
+    counter = Counter("test_render_total", "Render test")
+    try:
+        hist.labels("/a").observe(0.05)
+        hist.labels("/a").observe(0.5)
+        counter.inc(3)
+        text = render_prometheus()
+    finally:
+        REGISTRY.remove(hist)
+        REGISTRY.remove(counter)
+
+    assert "# TYPE test_render_seconds histogram" in text
+    assert 'test_render_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'test_render_seconds_bucket{route="/a",le="+Inf"} 2' in text
+    assert 'test_render_seconds_count{route="/a"} 2' in text
+    assert "test_render_total 3" in text
+
+
+def test_metrics_endpoint_and_server_timing(api, completion, profile):
+    import httpx
+
+    client = api(lambda request: httpx.Response(200, json=completion()))
+    info, extended = profile
+    resp = client.post("/api/generate", json={"intent": "Intro", "profileInfo": info, "extendedProfile": extended})
+    assert resp.status_code == 200, resp.text
+
+    timing = resp.headers["server-timing"]
+    names = [part.split(";")[0] for part in timing.split(", ")]
+    assert "compact_profile" in names and names[-1] == "app"
+
+    metrics = client.get("/metrics")
+    assert metrics.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_request_duration_seconds_count{method="POST",route="/api/generate",status="200"}' in metrics.text
+    assert 'span_duration_seconds_count{span="compact_profile"}' in metrics.text
@@ -0,0 +1,123 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+from fastapi import HTTPException
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from bench_model_hedging import MESSAGE, PRIMARY, SECONDARY, start_stub_server  # noqa: E402
+from bench_openrouter_client import free_port  # noqa: E402
+
+from services import openrouter  # noqa: E402
+from services.model_router import MODEL_ATTEMPTS, ModelRouter  # noqa: E402
+
+HEDGE_AFTER = 0.2
+SECONDARY_MS = 100.0
+STALL_MS = 3000.0
+PROFILE = ({"name": "Sam Lee", "title": "PM", "company": "Acme"}, {})
+
+
+@pytest.fixture(scope="module")
+def stub():
+    """The benchmark's per-model OpenRouter stub, on a local port for this module."""
+    port = free_port()
+    profiles = {}
+    server, thread, served = start_stub_server(port, profiles, seed=7)
+    yield f"http://127.0.0.1:{port}/api/v1", profiles, served
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+@pytest.fixture
+def models(stub, monkeypatch):
+    """Point openrouter at the stub with [PRIMARY, SECONDARY] hedged after HEDGE_AFTER; returns the profiles."""
+    url, profiles, served = stub
+    profiles.clear()
+    profiles[PRIMARY] = {"ms": 20.0, "stall_ms": STALL_MS, "stall_rate": 0.0, "error_rate": 0.0}
+    profiles[SECONDARY] = {"ms": SECONDARY_MS, "stall_ms": SECONDARY_MS, "stall_rate": 0.0, "error_rate": 0.0}
+    served.clear()
+    monkeypatch.setattr(openrouter, "OPENROUTER_BASE_URL", url)
+    monkeypatch.setattr(openrouter, "HEDGE_AFTER", HEDGE_AFTER)
+    for name in ("COMPLETION_ROUTER", "STREAM_ROUTER"):
+        router = getattr(openrouter, name)
+        monkeypatch.setattr(openrouter, name, ModelRouter(router.name, [PRIMARY, SECONDARY], failure_penalty=HEDGE_AFTER))
+    return profiles, served
+
+
+def cancelled(router: str, model: str) -> float:
+    return MODEL_ATTEMPTS.labels(router, model, "cancelled").snapshot()["value"]
+
+
+async def generate():
+    async with openrouter.create_client() as client:
+        return await openrouter.generate_message("Intro", *PROFILE, client=client)
+
+
+async def first_token():
+    async with openrouter.create_client() as client:
+        t0 = time.perf_counter()
+        events = openrouter.stream_message("Intro", *PROFILE, client)
+        try:
+            first = await events.__anext__()
+            elapsed = time.perf_counter() - t0
+            rest = [e async for e in events]
+        finally:
+            await events.aclose()
+    return elapsed, [first] + rest
+
+
+def test_fast_primary_is_not_hedged(models):
+    profiles, served = models
+    assert asyncio.run(generate()) == MESSAGE
+    assert dict(served) == {PRIMARY: 1}
+
+
+def test_stalled_primary_is_hedged_and_cancelled(models):
+    profiles, served = models
+    profiles[PRIMARY]["stall_rate"] = 1.0
+    before = cancelled("completion", PRIMARY)
+
+    t0 = time.perf_counter()
+    assert asyncio.run(generate()) == MESSAGE
+    elapsed = time.perf_counter() - t0
+
+    assert elapsed < HEDGE_AFTER + SECONDARY_MS / 1000.0 + 0.4  # nowhere near the 3 s stall
+    assert dict(served) == {PRIMARY: 1, SECONDARY: 1}
+    assert cancelled("completion", PRIMARY) == before + 1
+    # The loser only tells the router it took at least as long as it ran
+    assert openrouter.COMPLETION_ROUTER.order() == [SECONDARY, PRIMARY]
+
+
+def test_stalled_stream_is_hedged_on_first_token(models):
+    profiles, served = models
+    profiles[PRIMARY]["stall_rate"] = 1.0
+    before = cancelled("stream", PRIMARY)
+
+    ttft, events = asyncio.run(first_token())
+
+    assert ttft < HEDGE_AFTER + SECONDARY_MS / 1000.0 + 0.4
+    assert events[-1]["message"] == MESSAGE
+    assert cancelled("stream", PRIMARY) == before + 1
+
+
+def test_primary_error_falls_over_without_waiting(models):
+    profiles, served = models
+    profiles[PRIMARY]["error_rate"] = 1.0
+    t0 = time.perf_counter()
+    assert asyncio.run(generate()) == MESSAGE
+    assert time.perf_counter() - t0 < HEDGE_AFTER + SECONDARY_MS / 1000.0  # started on the 503, not the timer
+    assert dict(served) == {PRIMARY: 1, SECONDARY: 1}
+
+
+@pytest.mark.parametrize("status", [401, 403])
+def test_rejected_key_is_not_retried_on_other_models(models, status):
+    profiles, served = models
+    profiles[PRIMARY].update(error_rate=1.0, error_status=status)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(generate())
+    assert exc.value.status_code == status
+    assert dict(served) == {PRIMARY: 1}
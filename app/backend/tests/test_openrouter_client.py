@@ -0,0 +1,37 @@
+import asyncio
+
+import httpx
+
+from services import openrouter
+
+
+def test_create_client_uses_pool_settings():
+    client = openrouter.create_client()
+    try:
+        pool = client._transport._pool
+        assert pool._max_connections == openrouter.MAX_CONNECTIONS
+        assert pool._max_keepalive_connections == openrouter.MAX_KEEPALIVE_CONNECTIONS
+        assert client.timeout.read == openrouter.REQUEST_TIMEOUT
+    finally:
+        asyncio.run(client.aclose())
+
+
+def test_generate_message_reuses_the_given_client(profile, completion):
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return httpx.Response(200, json=completion())
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            first = await openrouter.generate_message("Intro", *profile, client=client)
+            second = await openrouter.generate_message("Intro", *profile, client=client)
+            assert not client.is_closed
+            return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert len(seen) == 2
+    assert all(str(r.url) == f"{openrouter.OPENROUTER_BASE_URL}/chat/completions" for r in seen)
+    assert seen[0].headers["Authorization"] == f"Bearer {openrouter.OPENROUTER_API_KEY}"
@@ -0,0 +1,40 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import main
+from services.passwords import PasswordHasher, pwd_context
+
+
+def test_hasher_works_across_event_loops_and_shutdowns():
+    hasher = PasswordHasher(pwd_context, concurrency=1)
+
+    async def contended():
+        # More callers than slots, so the semaphore really waits on this loop
+        hashes = await asyncio.gather(*(hasher.hash(f"pw-{i}") for i in range(3)))
+        return [await hasher.verify_and_update(f"pw-{i}", h) for i, h in enumerate(hashes)]
+
+    assert [ok for ok, _ in asyncio.run(contended())] == [True] * 3
+    assert [ok for ok, _ in asyncio.run(contended())] == [True] * 3  # a second loop
+    hasher.shutdown()
+    assert [ok for ok, _ in asyncio.run(contended())] == [True] * 3
+    hasher.shutdown()
+
+
+def test_outdated_hash_is_upgraded():
+    hasher = PasswordHasher(pwd_context, concurrency=2)
+    old = pwd_context.handler("bcrypt").using(rounds=5).hash("secret")  # tests run with BCRYPT_ROUNDS=4
+    ok, new_hash = asyncio.run(hasher.verify_and_update("secret", old))
+    assert ok and new_hash and pwd_context.verify("secret", new_hash)
+    hasher.shutdown()
+
+
+def test_register_and_login_across_successive_lifespans():
+    for n in range(2):
+        username = f"register-{n}"
+        with TestClient(main.app) as client:
+            resp = client.post("/register", params={"username": username, "email": f"{username}@example.com", "password": "pw"})
+            assert resp.status_code == 200, resp.text
+            resp = client.post("/token", data={"username": username, "password": "pw"})
+            assert resp.status_code == 200, resp.text
+            assert resp.json()["access_token"]
@@ -0,0 +1,76 @@
+import json
+import random
+
+import httpx
+
+from services.openrouter import StreamNormalizer, normalize_message
+
+SAMPLES = [
+    "Hi Sam,  loved your\n post. Open to a chat?",
+    '"Hi Sam, loved your post."',
+    '  “Hi Sam, congrats on the launch!”  ',
+    '"Move fast" is your motto, and it shows. Coffee next week?',
+    "'Hi Sam, it's been a while'",
+    '"',
+    "`Hi`",
+    "Hi \"Sam\"",
+]
+
+
+def stream_through(text: str, rng: random.Random) -> tuple[str, str]:
+    normalizer = StreamNormalizer()
+    out, i = [], 0
+    while i < len(text):
+        step = rng.randint(1, 5)
+        out.append(normalizer.feed(text[i:i + step]))
+        i += step
+    out.append(normalizer.flush())
+    return "".join(out), normalizer.finish()
+
+
+def test_deltas_add_up_to_the_final_message():
+    rng = random.Random(3)
+    for text in SAMPLES:
+        for _ in range(20):
+            streamed, final = stream_through(text, rng)
+            assert final == normalize_message(text)
+            assert streamed == final, text
+
+
+def test_unquoted_text_streams_without_waiting():
+    normalizer = StreamNormalizer()
+    assert normalizer.feed("  Hi  ") == "Hi"
+    assert normalizer.feed(" Sam") == " Sam"
+    assert normalizer.flush() == ""
+
+
+def sse_events(text: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def upstream_stream(*pieces: str) -> bytes:
+    body = "".join(f"data: {json.dumps({'choices': [{'delta': {'content': p}}]})}\n\n" for p in pieces)
+    return (": OPENROUTER PROCESSING\n\n" + body + "data: [DONE]\n\n").encode()
+
+
+def test_stream_endpoint_sends_deltas_then_done(api, profile):
+    client = api(lambda request: httpx.Response(200, content=upstream_stream('"Hi Sam', ", congrats", '!"')))
+    resp = client.post("/api/generate/stream", json={"profileInfo": profile[0], "extendedProfile": profile[1]})
+    assert resp.status_code == 200
+    events = sse_events(resp.text)
+    assert [name for name, _ in events] == ["delta", "done"]
+    assert events[0][1]["delta"] == events[1][1]["message"] == "Hi Sam, congrats!"
+
+
+def test_transport_error_before_first_event_is_502(api, profile):
+    def refuse(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    client = api(refuse)
+    body = {"profileInfo": profile[0], "extendedProfile": profile[1]}
+    assert client.post("/api/generate/stream", json=body).status_code == 502
+    assert client.post("/api/generate", json=body).status_code == 502
@@ -0,0 +1,118 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from services import openrouter
+from services.model_router import ModelRouter
+from services.upstream import CLOSED, FAILED, OK, OPEN, OVERLOADED, Upstream, UpstreamUnavailable, parse_retry_after
+
+PRIMARY = "primary/model"
+SECONDARY = "secondary/model"
+
+
+def test_parse_retry_after_accepts_seconds_and_dates():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0  # in the past
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_429s_halve_the_limit_once_per_burst():
+    upstream = Upstream("test", initial_limit=8)
+    for _ in range(2):
+        upstream.acquire(max_wait=0)
+    for _ in range(2):
+        upstream.release(OVERLOADED, admitted_at=0.0)
+    assert upstream.limit.limit == 4  # both calls were sent before the first decrease, so it counts once
+    assert upstream.breaker.state == CLOSED
+
+
+def test_failures_open_the_breaker_and_leave_the_limit():
+    upstream = Upstream("test", initial_limit=8, failure_threshold=2, reset_timeout=60)
+    for _ in range(2):
+        upstream.acquire(max_wait=0)
+        upstream.release(FAILED)
+    assert upstream.limit.limit == 8
+    assert upstream.breaker.state == OPEN
+    with pytest.raises(UpstreamUnavailable) as exc:
+        upstream.acquire(max_wait=1, fail_fast=True)
+    assert exc.value.reason == "open"
+    assert exc.value.retry_after > 59
+
+
+def test_success_at_the_limit_grows_it_back():
+    upstream = Upstream("test", initial_limit=1, max_limit=4)
+    upstream.acquire(max_wait=0)
+    upstream.release(OK)
+    assert upstream.limit.limit == 2
+    assert upstream.breaker.state == CLOSED
+
+
+@pytest.fixture
+def two_models(monkeypatch, completion):
+    """PRIMARY answers 503 and SECONDARY answers normally; returns the models each request went to."""
+    monkeypatch.setattr(openrouter, "HEDGE_AFTER", 0)
+    monkeypatch.setattr(openrouter, "BREAKER_FAILURES", 2)
+    monkeypatch.setattr(openrouter, "BREAKER_RESET", 60)
+    # No failure penalty, so PRIMARY keeps its rank and is tried first every time
+    monkeypatch.setattr(openrouter, "COMPLETION_ROUTER", ModelRouter("completion", [PRIMARY, SECONDARY], failure_penalty=0))
+    down = {PRIMARY}
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        model = json.loads(request.content)["model"]
+        seen.append(model)
+        if model in down:
+            return httpx.Response(503, json={"error": {"message": "down"}})
+        return httpx.Response(200, json=completion())
+
+    return down, seen, handler
+
+
+async def generate(handler, times: int):
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        return [await openrouter.generate_message("Intro", {"name": "Sam"}, {}, client=client) for _ in range(times)]
+
+
+def test_open_breaker_on_one_model_falls_over_to_the_next(two_models, completion):
+    down, seen, handler = two_models
+
+    messages = asyncio.run(generate(handler, 4))
+
+    assert messages == [openrouter.normalize_message(completion()["choices"][0]["message"]["content"])] * 4
+    # PRIMARY is called until its breaker opens, then skipped without a request
+    assert seen == [PRIMARY, SECONDARY, PRIMARY, SECONDARY, SECONDARY, SECONDARY]
+    assert openrouter.upstream_for(PRIMARY).breaker.state == OPEN
+    assert openrouter.upstream_for(SECONDARY).breaker.state == CLOSED
+
+
+def test_every_model_refused_is_a_503_with_retry_after(two_models):
+    down, seen, handler = two_models
+    down.add(SECONDARY)
+
+    with pytest.raises(HTTPException) as first:
+        asyncio.run(generate(handler, 1))
+    assert first.value.status_code == 503
+    with pytest.raises(HTTPException):
+        asyncio.run(generate(handler, 1))
+    assert len(seen) == 4
+
+    with pytest.raises(HTTPException) as refused:
+        asyncio.run(generate(handler, 1))
+    assert len(seen) == 4  # both breakers are open: nothing was sent
+    assert refused.value.status_code == 503
+    assert "temporarily unavailable" in refused.value.detail
+    assert int(refused.value.headers["Retry-After"]) >= 59
+
+
+def test_health_reports_each_model(api, completion, profile):
+    info, extended = profile
+    client = api(lambda request: httpx.Response(200, json=completion()))
+    body = {"intent": "Intro", "profileInfo": info, "extendedProfile": extended}
+    assert client.post("/api/generate", json=body).status_code == 200
+    state = client.get("/health/upstream").json()["openrouter"]
+    assert state[openrouter.MODEL]["circuit"] == CLOSED